@@ -1,59 +1,219 @@
-from flask import Flask, jsonify, request, session, g
+import os
+
+# With SERVER_WORKER=gevent every connection runs on a greenlet instead of a thread, so
+# hundreds of idle /events subscribers stay cheap. Patching must precede all other imports.
+if os.environ.get('SERVER_WORKER') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, session, g, stream_with_context
 from flask_cors import CORS
-from flask_session import Session
 import mysql.connector
-from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timedelta, timezone
+import gzip
+import hashlib
+import heapq
+import hmac
+import json
 import logging
+import math
 import re
-import os
+import struct
+import sys
+import zlib
 import argparse
+import csv
+import io
+from array import array
+from auth import LoginBusyError, PasswordHasher, PermissionCache
+from contextlib import nullcontext
+from itertools import chain, groupby, islice, repeat
+from operator import itemgetter
+from cache import TTLCache
+from chunkstore import decode_chunk
+from config import config_from_env, load_secret_key
+from db_pool import ConnectionPool, PoolExhaustedError
+from events import CLOSED, ImportEventBroadcaster
+from metrics import ROW_BUCKETS, SIZE_BUCKETS, Registry, RequestTimings
+from sessions import init_session_backend
 
-# --- Database Configuration ---
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'sensor_user',
-    'password': 'sensor_password',
-    'database':  'sensordb'
-}
+# All endpoints and request hooks are registered on this blueprint; create_app
+# (at the end of the module) builds the application, its connection pool and its
+# import event poller from the configuration.
+api = Blueprint('api', __name__)
+
+
+# --- Caches ---
+# Practice metadata and permission-filtered trees change rarely and simply expire.
+# A practice's sensor list and the raw readings of past days are immutable until the
+# next import of their practice, which bumps its data version (part of the cache key).
+# User permissions are reloaded when the permission tables change (see auth.py).
+practice_cache = TTLCache(
+    maxsize=int(os.environ.get('PRACTICE_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('PRACTICE_CACHE_TTL', 300))
+)
+sensor_cache = TTLCache(
+    maxsize=int(os.environ.get('SENSOR_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('SENSOR_CACHE_TTL', 300))
+)
+tree_cache = TTLCache(
+    maxsize=int(os.environ.get('TREE_CACHE_SIZE', 256)),
+    ttl=int(os.environ.get('TREE_CACHE_TTL', 300))
+)
+day_cache = TTLCache(
+    maxsize=int(os.environ.get('DAY_CACHE_MAX_POINTS', 2000000)),
+    ttl=int(os.environ.get('DAY_CACHE_TTL', 86400)),
+    weigh=lambda chunk: 1 + sum(len(points) for points in chunk.values())
+)
+permission_cache = PermissionCache(
+    maxsize=int(os.environ.get('PERMISSION_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('PERMISSION_CACHE_TTL', 300)),
+    version_ttl=float(os.environ.get('PERMISSION_VERSION_TTL', 5))
+)
+
+
+# --- Instrumentation ---
+# Each request times its phases (db_connect, lookup, hash, query, build, downsample,
+# serialize, compress). The timings are returned in a Server-Timing header (with SERVER_TIMING,
+# on by default in development) and aggregated, with the rows read and the bytes sent, into the
+# histograms of /metrics. Metrics are kept per process: with several workers, each one must be scraped.
+
+metrics = Registry()
+request_duration = metrics.histogram(
+    'sonde_request_duration_seconds', 'Time to handle a request, until its body is sent.', ('endpoint', 'status'))
+request_phase = metrics.histogram(
+    'sonde_request_phase_seconds', 'Time spent by requests in each phase.', ('endpoint', 'phase'))
+response_rows = metrics.histogram(
+    'sonde_response_rows', 'Rows read from the database per request.', ('endpoint',), ROW_BUCKETS)
+response_bytes = metrics.histogram(
+    'sonde_response_bytes', 'Size of non-streamed response bodies, after compression.', ('endpoint',), SIZE_BUCKETS)
+
+CACHES = {"practice": practice_cache, "sensor": sensor_cache, "tree": tree_cache, "day": day_cache,
+          "permission": permission_cache.entries}
+
+
+def _cache_stat(key):
+    return lambda: [((name,), cache.stats()[key]) for name, cache in CACHES.items()]
+
+
+# Scrapes run within a /metrics request, so the callbacks can read the current app's pool
+def _pool_stat(key):
+    return lambda: [((), current_app.extensions['db_pool'].stats()[key])]
 
-app = Flask(__name__)
+
+metrics.callback('sonde_db_pool_connections', 'Open pooled database connections by state.', 'gauge', ('state',),
+                 lambda: [((state,), current_app.extensions['db_pool'].stats()[state]) for state in ('idle', 'in_use')])
+metrics.callback('sonde_db_pool_checkouts_total', 'Connections checked out of the pool.', 'counter', (), _pool_stat('checkouts'))
+metrics.callback('sonde_db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.', 'counter', (), _pool_stat('wait_time_total'))
+metrics.callback('sonde_db_pool_exhausted_total', 'Checkouts that timed out on an exhausted pool.', 'counter', (), _pool_stat('exhausted'))
+metrics.callback('sonde_cache_hits_total', 'Cache hits.', 'counter', ('cache',), _cache_stat('hits'))
+metrics.callback('sonde_cache_misses_total', 'Cache misses.', 'counter', ('cache',), _cache_stat('misses'))
+metrics.callback('sonde_cache_evictions_total', 'Cache evictions.', 'counter', ('cache',), _cache_stat('evictions'))
+metrics.callback('sonde_cache_weight', 'Current weight of each cache (entries, or points for the day cache).', 'gauge', ('cache',), _cache_stat('weight'))
+metrics.callback('sonde_password_hashes_pending', 'Password hashes running or queued.', 'gauge', (),
+                 lambda: [((), current_app.extensions['password_hasher'].stats()['pending'])])
+metrics.callback('sonde_password_hashes_rejected_total', 'Logins rejected because too many hashes were pending.', 'counter', (),
+                 lambda: [((), current_app.extensions['password_hasher'].stats()['rejected'])])
+metrics.callback('sonde_event_subscribers', 'Open /events streams.', 'gauge', (), lambda: [((), current_app.extensions['import_events'].subscriber_count())])
+
+
+def timed(phase):
+    """Context manager adding the time spent in its block to a phase of the current request."""
+    timings = g.get('timings')
+    return timings.phase(phase) if timings is not None else nullcontext()
+
+
+def _count_rows(count):
+    """Adds count to the rows read by the current request."""
+    timings = g.get('timings')
+    if timings is not None:
+        timings.rows += count
+
+
+@api.before_app_request
+def start_timings():
+    g.timings = RequestTimings()
+
+
+# Registered before compress_response, so it runs after it and sees the compressed body
+@api.after_app_request
+def record_timings(response):
+    """Adds the Server-Timing header and records the request in the histograms once its body is sent."""
+    timings = g.get('timings')
+    if timings is None:
+        return response
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = timings.server_timing()
+    if response.mimetype == 'text/event-stream':
+        return response  # Open for as long as the client listens, so its duration means nothing
+
+    endpoint = request.endpoint.rpartition('.')[2] if request.endpoint else 'unmatched'
+    status = str(response.status_code)
+    size = None if response.is_streamed else response.content_length
+
+    def observe():
+        request_duration.observe(timings.elapsed(), endpoint, status)
+        for phase, seconds in timings.phases.items():
+            request_phase.observe(seconds, endpoint, phase)
+        if timings.rows:
+            response_rows.observe(timings.rows, endpoint)
+        if size is not None:
+            response_bytes.observe(size, endpoint)
+
+    response.call_on_close(observe)
+    return response
 
 
 # --- Database Connection Management using Flask Context ---
 def get_db():
-    """Opens a new database connection if there is none yet for the current application context."""
+    """Checks out a pooled database connection if there is none yet for the current application context."""
     if 'db' not in g:
         try:
-            g.db = mysql.connector.connect(**DB_CONFIG)
-            app.logger.debug("Database connection established for this request.")
-        except mysql.connector.Error as err:
-            app.logger.error(f"Critical DB connection error: {err}")
+            with timed('db_connect'):
+                g.db = current_app.extensions['db_pool'].acquire()
+            current_app.logger.debug("Database connection checked out for this request.")
+        except (mysql.connector.Error, PoolExhaustedError) as err:
+            current_app.logger.error(f"Critical DB connection error: {err}")
             g.db = None
     return g.db
 
-@app.teardown_appcontext
+@api.teardown_app_request
 def close_db(e=None):
-    """Closes the database connection at the end of the request."""
+    """Returns the database connection to the pool at the end of the request."""
     db = g.pop('db', None)
     if db is not None:
-        db.close()
-        app.logger.debug("Database connection closed.")
+        current_app.extensions['db_pool'].release(db)
+        current_app.logger.debug("Database connection returned to the pool.")
+
+
+def _current_permissions():
+    """
+    Returns the Permissions of the logged-in user (see auth.PermissionCache), looked up once
+    per request, or None if they cannot be read.
+    """
+    if 'permissions' not in g:
+        with timed('lookup'):
+            g.permissions = permission_cache.get(session['user_id'], get_db)
+    return g.permissions
 
 
 # --- API ENDPOINTS ---
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
-    """Authenticates the user, retrieves permissions, and creates a session."""
+    """
+    Authenticates the user and creates a session. The password hash is checked on the bounded
+    PasswordHasher, without holding a database connection; permissions are not stored in the
+    session but read from the permission cache by each request (see _current_permissions).
+    """
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
     
-    app.logger.debug(f"Login attempt for user: '{username}'")
+    current_app.logger.debug(f"Login attempt for user: '{username}'")
 
     if not username or not password:
-        app.logger.warning("Login attempt with missing username or password.")
+        current_app.logger.warning("Login attempt with missing username or password.")
         return jsonify({"status": "error", "result": "Username and password are required."}), 400
 
     conn = get_db()
@@ -64,58 +224,79 @@ def login():
     
     cursor.execute("SELECT id, username, password_hash FROM users WHERE username = %s", (username,))
     user = cursor.fetchone()
+    cursor.close()
+    # Hashing may wait for a free hasher: give the connection back to the data requests meanwhile
+    close_db()
 
-    if user and check_password_hash(user['password_hash'], password):
-        user_id = user['id']
-        
-        cursor.execute("SELECT macrogroup_id FROM user_macrogroup_permissions WHERE user_id = %s", (user_id,))
-        macro_permissions = cursor.fetchall()
-        accessible_macrogroups = [p['macrogroup_id'] for p in macro_permissions]
-        
-        cursor.execute("SELECT practice_id FROM user_practice_permissions WHERE user_id = %s", (user_id,))
-        practice_permissions = cursor.fetchall()
-        accessible_practices = [p['practice_id'] for p in practice_permissions]
+    try:
+        with timed('hash'):
+            authenticated = user is not None and current_app.extensions['password_hasher'].check(user['password_hash'], password)
+    except LoginBusyError:
+        current_app.logger.warning(f"Login of '{username}' rejected: too many logins in progress.")
+        return jsonify({"status": "error", "result": "Too many logins in progress, please retry."}), 503, {"Retry-After": "1"}
 
+    if authenticated:
         session.clear()
-        session['user_id'] = user_id
+        # Permanent sessions expire after PERMANENT_SESSION_LIFETIME
+        session.permanent = True
+        session['user_id'] = user['id']
         session['username'] = user['username']
-        session['accessible_macrogroups'] = accessible_macrogroups
-        session['accessible_practices'] = accessible_practices
         
-        app.logger.info(f"Authentication successful for '{username}'.")
+        current_app.logger.info(f"Authentication successful for '{username}'.")
         return jsonify({"status": "ok", "result": "Authentication successful."})
     else:
-        app.logger.warning(f"Invalid credentials for login attempt by user: {username}")
+        current_app.logger.warning(f"Invalid credentials for login attempt by user: {username}")
         return jsonify({"status": "error", "result": "Invalid credentials."}), 401
 
-@app.route('/logout', methods=['POST'])
+@api.route('/logout', methods=['POST'])
 def logout():
     """Logs out the user by clearing the session."""
     username = session.get('username', 'unknown')
     session.clear()
-    app.logger.info(f"Logout successful for user: {username}")
+    current_app.logger.info(f"Logout successful for user: {username}")
     return jsonify({"status": "ok", "result": "Logout successful."})
 
-@app.route('/get_tree', methods=['GET'])
+@api.route('/get_tree', methods=['GET'])
 def get_tree():
     """Returns the practice tree by combining permissions."""
     if 'user_id' not in session:
-        app.logger.warning(f"Unauthorized access to /get_tree from IP: {request.remote_addr}")
+        current_app.logger.warning(f"Unauthorized access to /get_tree from IP: {request.remote_addr}")
         return jsonify({"status": "error", "result": "Authorization required."}), 401
 
     username = session['username']
-    accessible_macrogroups = session.get('accessible_macrogroups', [])
-    accessible_practices = session.get('accessible_practices', [])
-    app.logger.info(f"Fetching practice tree for user: {username}")
+    current_app.logger.info(f"Fetching practice tree for user: {username}")
 
-    if not accessible_macrogroups and not accessible_practices:
-        app.logger.debug(f"User {username} has no permissions, returning empty tree.")
+    permissions = _current_permissions()
+    if permissions is None:
+        return jsonify({"status": "error", "result": "Server error."}), 500
+    if permissions.is_empty():
+        current_app.logger.debug(f"User {username} has no permissions, returning empty tree.")
         return jsonify({"status": "ok", "result": []})
 
-    conn = get_db()
-    if not conn:
-        return jsonify({"status": "error", "result": "Server error."}), 500
+    # Users with the same permission set share the same tree
+    cached = tree_cache.get(permissions.key)
+    if cached is not None:
+        formatted_tree, etag = cached
+        current_app.logger.debug(f"Serving cached tree for user {username}.")
+    else:
+        conn = get_db()
+        if not conn:
+            return jsonify({"status": "error", "result": "Server error."}), 500
+
+        formatted_tree = _build_tree(conn, sorted(permissions.macrogroups), sorted(permissions.practices))
+        current_app.logger.debug(f"Built tree with {len(formatted_tree)} macrogroups for user {username}.")
+
+        # The tree does not depend on imported readings, so its ETag is derived from its content
+        etag = hashlib.sha1(json.dumps(formatted_tree, sort_keys=True).encode('utf-8')).hexdigest()
+        tree_cache.set(permissions.key, (formatted_tree, etag))
+
+    if _is_not_modified(etag, None):
+        return _not_modified_response(etag, None)
+    return _with_validators(jsonify({"status": "ok", "result": formatted_tree}), etag, None)
 
+
+def _build_tree(conn, accessible_macrogroups, accessible_practices):
+    """Queries the macrogroup/practice tree visible with the given permissions."""
     cursor = conn.cursor(dictionary=True)
     
     query_parts = []
@@ -172,12 +353,10 @@ def get_tree():
         {"macrogroup_name": name, "probes": probes}
         for name, probes in tree_data.items()
     ]
-    
-    app.logger.debug(f"Built tree with {len(formatted_tree)} macrogroups for user {username}.")
-    return jsonify({"status": "ok", "result": formatted_tree})
+    return formatted_tree
 
 
-@app.route('/get_latest_data', methods=['GET'])
+@api.route('/get_latest_data', methods=['GET'])
 def get_latest_data():
     """
     Returns the latest 15 days of sensor data for a specific practice.
@@ -190,31 +369,67 @@ def get_latest_data():
     if not practice_name:
         return jsonify({"status": "error", "result": "Missing 'practice_id' parameter."}), 400
 
+    max_points, method, error = _parse_downsample_args()
+    if error:
+        return error
+    resolution = request.args.get('resolution', 'auto').lower()
+    fmt, error = _negotiate_format()
+    if error:
+        return error
+
     # Calculate date range: today and the 14 days prior
     end_date = datetime.now()
     start_date = end_date - timedelta(days=14)
-    
+    stream = _wants_stream() and fmt in ('json', 'columnar')
+
     # Reuse the logic from get_data but with a fixed date range
-    data_response = _fetch_sensor_data(practice_name, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+    prepared = _prepare_sensor_query(practice_name, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                                     resolution)
     
-    # Check if _fetch_sensor_data returned an error response
-    if isinstance(data_response, tuple):
-        return data_response # Forward the error response tuple (jsonify_object, status_code)
+    # Check if _prepare_sensor_query returned an error response
+    if isinstance(prepared, tuple):
+        return prepared # Forward the error response tuple (jsonify_object, status_code)
+
+    etag, last_modified = _data_validators(prepared, fmt, explicit_window=False)
+    if _is_not_modified(etag, last_modified):
+        return _not_modified_response(etag, last_modified)
+
+    if stream:
+        prefix = '{"status": "ok", "data": {"startDate": %s, "endDate": %s, "series": ' % (
+            json.dumps(start_date.strftime('%Y-%m-%d')), json.dumps(end_date.strftime('%Y-%m-%d')))
+        response = _streaming_response(_stream_sensor_data(prepared, prefix, '}}', max_points, method, fmt), fmt)
+        return _with_validators(response, etag, last_modified)
+
+    data_response = _fetch_sensor_data(prepared, max_points=max_points, method=method)
+    cursor = _series_cursor(data_response, prepared)
 
     # If successful, wrap it in the format expected by InitialSensorData model
-    return jsonify({
+    response = _series_response(data_response, fmt, lambda series: {
         "status": "ok",
         "data": {
             "startDate": start_date.strftime('%Y-%m-%d'),
             "endDate": end_date.strftime('%Y-%m-%d'),
-            "series": data_response # This is the list of sensor series
-        }
+            "series": series # This is the list of sensor series
+        },
+        "cursor": cursor
+    }, headers={
+        "X-Start-Date": start_date.strftime('%Y-%m-%d'),
+        "X-End-Date": end_date.strftime('%Y-%m-%d'),
+        **({"X-Cursor": cursor} if cursor else {})
     })
+    return _with_validators(response, etag, last_modified)
 
 
-@app.route('/get_data', methods=['GET'])
+@api.route('/get_data', methods=['GET'])
 def get_data_endpoint():
-    """Endpoint for manual data fetching with a custom date range."""
+    """
+    Endpoint for manual data fetching with a custom date range.
+    With 'since' (the cursor returned by a previous response) only the readings newer than
+    the cursor are returned, so polling clients receive a few rows instead of the whole window;
+    'end_date' then defaults to now, and 'start_date' (the start of the client's window, from
+    which the resolution is chosen) is required unless 'resolution' is given.
+    Every response carries the cursor for the next poll.
+    """
     if 'user_id' not in session:
         return jsonify({"status": "error", "result": "Authorization required."}), 401
         
@@ -222,84 +437,1559 @@ def get_data_endpoint():
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
 
-    if not all([practice_name, start_date_str, end_date_str]):
+    since, positions, error = _parse_since()
+    if error:
+        return error
+
+    if not practice_name or not (since is not None or all([start_date_str, end_date_str])):
         return jsonify({"status": "error", "result": "Missing parameters."}), 400
+    # The resolution of a delta must be the one of the series the client holds, chosen from its window
+    if since is not None and not start_date_str and request.args.get('resolution', 'auto').lower() == 'auto':
+        return jsonify({"status": "error", "result": "With 'since', send the window's 'start_date' (or a 'resolution')."}), 400
+
+    max_points, method, error = _parse_downsample_args()
+    if error:
+        return error
+    resolution = request.args.get('resolution', 'auto').lower()
+    fmt, error = _negotiate_format()
+    if error:
+        return error
+
+    # Deltas are small: they are never streamed, so their cursor can go in the envelope
+    stream = _wants_stream() and fmt in ('json', 'columnar') and since is None
+    prepared = _prepare_sensor_query(practice_name, start_date_str, end_date_str, resolution, since=since,
+                                     positions=positions)
+    if isinstance(prepared, tuple):
+        return prepared
+
+    # Without end_date (deltas), the window ends now
+    etag, last_modified = _data_validators(prepared, fmt, explicit_window=end_date_str is not None)
+    if _is_not_modified(etag, last_modified):
+        return _not_modified_response(etag, last_modified)
+
+    if stream:
+        response = _streaming_response(_stream_sensor_data(prepared, '{"status": "ok", "data": ', '}', max_points, method, fmt), fmt)
+        return _with_validators(response, etag, last_modified)
 
     # The actual data fetching is now in a helper function
-    data_response = _fetch_sensor_data(practice_name, start_date_str, end_date_str)
-    
-    if isinstance(data_response, tuple):
-        return data_response
+    data_response = _fetch_sensor_data(prepared, max_points=max_points, method=method)
+    cursor = _series_cursor(data_response, prepared)
 
-    return jsonify({"status": "ok", "data": data_response})
+    response = _series_response(data_response, fmt, lambda series: {"status": "ok", "data": series, "cursor": cursor},
+                                headers={"X-Cursor": cursor} if cursor else None)
+    return _with_validators(response, etag, last_modified)
 
 
-def _fetch_sensor_data(practice_name, start_date_str, end_date_str):
+@api.route('/get_batch_data', methods=['GET'])
+def get_batch_data():
     """
-    A helper function to fetch sensor data. Can be used by multiple endpoints.
-    Returns a list of sensor data or a tuple (error_json, status_code) on failure.
+    Returns the series of several practices in one response, e.g. to compare the probes of a macrogroup.
+    Parameters: 'practice_id' (repeated, one per practice), optional 'sensor' filters written as
+    'practice:sensor' (repeated, split on the first colon; a practice without filters returns all its sensors), and
+    start_date/end_date/resolution/max_points/downsample/format as for /get_data.
+    Permissions are checked once for all practices and the readings are fetched with a single query.
+    The binary format is not offered because it cannot carry the practice of each series.
+    """
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "result": "Authorization required."}), 401
+
+    practice_names = list(dict.fromkeys(request.args.getlist('practice_id')))
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    if not all([practice_names, start_date_str, end_date_str]):
+        return jsonify({"status": "error", "result": "Missing parameters."}), 400
+    if len(practice_names) > BATCH_MAX_PRACTICES:
+        return jsonify({"status": "error", "result": f"At most {BATCH_MAX_PRACTICES} practices per request."}), 400
+
+    sensor_filters, error = _parse_sensor_filters(practice_names)
+    if error:
+        return error
+
+    max_points, method, error = _parse_downsample_args()
+    if error:
+        return error
+    resolution = request.args.get('resolution', 'auto').lower()
+    fmt, error = _negotiate_format(('json', 'columnar', 'msgpack'))
+    if error:
+        return error
+
+    prepared = _prepare_batch_query(practice_names, sensor_filters, start_date_str, end_date_str, resolution)
+    if isinstance(prepared, tuple):
+        return prepared
+
+    etag, last_modified = _data_validators(prepared, fmt)
+    if _is_not_modified(etag, last_modified):
+        return _not_modified_response(etag, last_modified)
+
+    data_response = _fetch_batch_data(prepared, max_points=max_points, method=method)
+
+    response = _series_response(data_response, fmt, lambda series: {"status": "ok", "data": series})
+    return _with_validators(response, etag, last_modified)
+
+
+def _parse_sensor_filters(practice_names):
+    """
+    Parses the repeated 'sensor' parameters ('practice:sensor') into {practice_name: {sensor_name, ...}}.
+    They are split on the first colon, so sensor names (datalogger column names) may contain colons
+    but the names of practices filtered this way cannot.
+    Returns a tuple (filters, error) where error is a response tuple or None.
+    """
+    sensor_filters = {}
+    for item in request.args.getlist('sensor'):
+        practice_name, separator, sensor_name = item.partition(':')
+        if not separator or practice_name not in practice_names:
+            return None, (jsonify({"status": "error", "result": f"Invalid 'sensor' filter '{item}'. Use 'practice:sensor' for a requested practice."}), 400)
+        sensor_filters.setdefault(practice_name, set()).add(sensor_name)
+    return sensor_filters, None
+
+
+def _prepare_batch_query(practice_names, sensor_filters, start_date_str, end_date_str, resolution='auto'):
+    """
+    Batch counterpart of _prepare_sensor_query: validates every practice and the session's permissions
+    on them, resolves the requested sensors and builds one readings query with sensor_id IN (...).
+    Returns a dictionary like _prepare_sensor_query's (with lists of practice IDs and versions,
+    'practice_names', 'sensor_ids' and 'sensors' mapping sensor ID to (practice_name, sensor_name)) or a tuple
+    (error_json, status_code).
+    """
+    if resolution not in RESOLUTIONS:
+        return jsonify({"status": "error", "result": f"Invalid 'resolution'. Use one of: {', '.join(RESOLUTIONS)}."}), 400
+
+    conn = get_db()
+    if not conn:
+        return jsonify({"status": "error", "result": "Server error."}), 500
+
+    practices = _lookup_practices(conn, practice_names)
+    missing = [name for name in practice_names if name not in practices]
+    if missing:
+        return jsonify({"status": "error", "result": f"Practice not found: {', '.join(missing)}."}), 404
+
+    permissions = _current_permissions()
+    if permissions is None:
+        return jsonify({"status": "error", "result": "Server error."}), 500
+    denied = [
+        name for name, practice in practices.items()
+        if not permissions.allows(practice['id'], practice['macrogroup_id'])
+    ]
+    if denied:
+        current_app.logger.warning(f"Permission denied for '{session['username']}' on practices {denied}")
+        return jsonify({"status": "error", "result": f"Permission denied for: {', '.join(denied)}."}), 403
+
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"status": "error", "result": "Invalid date format. Use YYYY-MM-DD."}), 400
+    if start_date > end_date:
+        return jsonify({"status": "error", "result": "'start_date' must not be after 'end_date'."}), 400
+
+    if resolution == 'auto':
+        resolution = _select_resolution(start_date, end_date)
+
+    names_by_id = {practices[name]['id']: name for name in practice_names}
+    practice_ids = list(names_by_id)
+    id_placeholders = ', '.join(['%s'] * len(practice_ids))
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, practice_id, name FROM sensors WHERE practice_id IN ({id_placeholders})", tuple(practice_ids))
+    sensors = {}
+    for sensor_id, practice_id, sensor_name in cursor.fetchall():
+        practice_name = names_by_id[practice_id]
+        wanted = sensor_filters.get(practice_name)
+        if wanted is None or sensor_name in wanted:
+            sensors[sensor_id] = (practice_name, sensor_name)
+
+    cursor.execute(
+        f"SELECT practice_id, version, updated_at FROM practice_data_versions WHERE practice_id IN ({id_placeholders})",
+        tuple(practice_ids)
+    )
+    versions = {practice_id: (version, updated_at) for practice_id, version, updated_at in cursor.fetchall()}
+    cursor.close()
+
+    sensor_ids = sorted(sensors)
+    current_app.logger.debug(f"Fetching '{resolution}' data for {len(sensor_ids)} sensors of {len(practice_ids)} practices from {start_date} to {end_date}.")
+
+    updated = [updated_at for _version, updated_at in versions.values() if updated_at]
+    return {
+        "conn": conn,
+        "practice_id": practice_ids,
+        "version": [versions.get(practice_id, (0, None))[0] for practice_id in practice_ids],
+        "updated_at": max(updated) if updated else None,
+        "query": _readings_query(resolution, len(sensor_ids)) if sensor_ids else None,
+        "params": (*sensor_ids, start_date, end_date),
+        "start_date": start_date,
+        "end_date": end_date,
+        "resolution": resolution,
+        "since": None,
+        "practice_names": practice_names,
+        "sensor_ids": sensor_ids,
+        "sensors": sensors
+    }
+
+
+def _fetch_batch_data(prepared, max_points=None, method='lttb'):
+    """
+    Runs the query built by _prepare_batch_query and returns a list of
+    {"practice", "name", "values"} series, ordered like the requested practices.
+    """
+    if prepared['query'] is None:
+        return []
+
+    sensors = prepared['sensors']
+    values_by_sensor = {}
+    with timed('build'):
+        for reading in _read_rows(prepared, prepared['start_date'], prepared['end_date']):
+            values_by_sensor.setdefault(reading[0], []).append(_format_point(*reading[1:]))
+
+    practice_order = {name: position for position, name in enumerate(prepared['practice_names'])}
+    ordered = sorted(values_by_sensor, key=lambda sensor_id: (practice_order[sensors[sensor_id][0]], sensors[sensor_id][1]))
+    with timed('downsample'):
+        return [
+            {"practice": sensors[sensor_id][0], "name": sensors[sensor_id][1], "values": _downsample(values_by_sensor[sensor_id], max_points, method)}
+            for sensor_id in ordered
+        ]
+
+
+@api.route('/export', methods=['GET'])
+def export_data():
+    """
+    Bulk export of readings as a download. Takes 'practice_id' (repeated), optional 'sensor'
+    filters, start_date/end_date as /get_batch_data, 'resolution' (default 'raw') and
+    'format': 'csv' (default) or 'parquet' (requires pyarrow).
+    The rows are streamed from an unbuffered cursor as they are read, so memory use does not
+    depend on the length of the range and bytes flow from the first rows on.
+    """
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "result": "Authorization required."}), 401
+
+    practice_names = list(dict.fromkeys(request.args.getlist('practice_id')))
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    if not all([practice_names, start_date_str, end_date_str]):
+        return jsonify({"status": "error", "result": "Missing parameters."}), 400
+    if len(practice_names) > BATCH_MAX_PRACTICES:
+        return jsonify({"status": "error", "result": f"At most {BATCH_MAX_PRACTICES} practices per request."}), 400
+
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "result": f"Invalid 'format'. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+    if fmt == 'parquet' and pq is None:
+        return jsonify({"status": "error", "result": "Parquet export is not available on this server."}), 406
+
+    sensor_filters, error = _parse_sensor_filters(practice_names)
+    if error:
+        return error
+
+    resolution = request.args.get('resolution', 'raw').lower()
+    prepared = _prepare_batch_query(practice_names, sensor_filters, start_date_str, end_date_str, resolution)
+    if isinstance(prepared, tuple):
+        return prepared
+
+    current_app.logger.info(f"'{session['username']}' exporting {len(prepared['sensors'])} sensors of {', '.join(practice_names)} "
+                    f"from {start_date_str} to {end_date_str} as {fmt}.")
+    generator = _export_csv(prepared) if fmt == 'csv' else _export_parquet(prepared)
+    name = practice_names[0] if len(practice_names) == 1 else 'practices'
+    filename = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{name}_{start_date_str}_{end_date_str}.{fmt}")
+    return Response(stream_with_context(generator), mimetype=EXPORT_FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Accel-Buffering": "no"
+    })
+
+
+@api.route('/get_stats', methods=['GET'])
+def get_stats():
+    """
+    Per-sensor statistics of a practice over a date range, computed by the database from the raw
+    readings (by the server for ranges with compacted days): count, min, max, mean, standard
+    deviation, last value and percentiles.
+    Optional parameters: 'bucket' ('hour', 'day' or 'week') for one set of statistics per bucket,
+    and 'percentiles' as a comma-separated list (default 5,50,95).
+    """
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "result": "Authorization required."}), 401
+
+    practice_name = request.args.get('practice_id')
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    if not all([practice_name, start_date_str, end_date_str]):
+        return jsonify({"status": "error", "result": "Missing parameters."}), 400
+
+    bucket = request.args.get('bucket')
+    if bucket is not None and bucket not in STATS_BUCKETS:
+        return jsonify({"status": "error", "result": f"Invalid 'bucket'. Use one of: {', '.join(STATS_BUCKETS)}."}), 400
+
+    percentiles, error = _parse_percentiles()
+    if error:
+        return error
+
+    prepared = _prepare_sensor_query(practice_name, start_date_str, end_date_str, 'raw')
+    if isinstance(prepared, tuple):
+        return prepared
+
+    etag, last_modified = _data_validators(prepared, 'stats')
+    if _is_not_modified(etag, last_modified):
+        return _not_modified_response(etag, last_modified)
+
+    stats = _fetch_sensor_stats(prepared, bucket, percentiles)
+    with timed('serialize'):
+        response = jsonify({
+            "status": "ok",
+            "data": {
+                "startDate": start_date_str,
+                "endDate": end_date_str,
+                "bucket": bucket,
+                "percentiles": percentiles,
+                "sensors": stats
+            }
+        })
+    return _with_validators(response, etag, last_modified)
+
+
+def _prepare_sensor_query(practice_name, start_date_str, end_date_str, resolution='auto', since=None, positions=None):
+    """
+    Validates a data request (resolution, practice, permissions, dates), resolves the practice's
+    sensor IDs and builds the readings query on them (see _readings_query).
+    If since is given (with the positions of the lagging sensors, see _parse_since), every series
+    is read from its position in that cursor on (delta_starts); a missing start date then defaults
+    to the oldest position and a missing end date to now.
+    Returns a dictionary {conn, practice_id, version, updated_at, query, params, start_date, end_date,
+    resolution, sensor_ids, sensors, since, positions, delta_starts} where sensors maps sensor ID to
+    name and query is None if the practice has no sensors, or a tuple (error_json, status_code) on failure.
     """
+    if resolution not in RESOLUTIONS:
+        return jsonify({"status": "error", "result": f"Invalid 'resolution'. Use one of: {', '.join(RESOLUTIONS)}."}), 400
+
     username = session['username']
     
     conn = get_db()
     if not conn:
         return jsonify({"status": "error", "result": "Server error."}), 500
 
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id, macrogroup_id FROM practices WHERE name = %s", (practice_name,))
-    practice = cursor.fetchone()
-
+    practice = _lookup_practices(conn, [practice_name]).get(practice_name)
     if not practice:
         return jsonify({"status": "error", "result": "Practice not found."}), 404
 
     practice_id = practice['id']
-    practice_macrogroup_id = practice['macrogroup_id']
-    accessible_macrogroups = session.get('accessible_macrogroups', [])
-    accessible_practices = session.get('accessible_practices', [])
-
-    has_permission = (practice_macrogroup_id in accessible_macrogroups) or \
-                     (practice_id in accessible_practices)
+    permissions = _current_permissions()
+    if permissions is None:
+        return jsonify({"status": "error", "result": "Server error."}), 500
 
-    if not has_permission:
-        app.logger.warning(f"Permission denied for '{username}' on practice '{practice_name}' (ID: {practice_id})")
+    if not permissions.allows(practice_id, practice['macrogroup_id']):
+        current_app.logger.warning(f"Permission denied for '{username}' on practice '{practice_name}' (ID: {practice_id})")
         return jsonify({"status": "error", "result": "Permission denied for this practice."}), 403
     
     try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else min([since, *(positions or {}).values()])
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else datetime.now()
     except ValueError:
         return jsonify({"status": "error", "result": "Invalid date format. Use YYYY-MM-DD."}), 400
+    if start_date > end_date:
+        return jsonify({"status": "error", "result": "'start_date' must not be after 'end_date'."}), 400
+
+    # The resolution follows the client's whole window, so deltas match the series it holds
+    if resolution == 'auto':
+        resolution = _select_resolution(start_date, end_date)
+
+    version, updated_at = _get_data_version(conn, practice_id)
+    sensors = _get_practice_sensors(conn, practice_id, version)
+    sensor_ids = sorted(sensors)
+
+    delta_starts = None
+    if since is not None:
+        # Raw readings strictly after each series' position; rollups from its bucket on,
+        # because the newest bucket keeps changing until its period is over
+        step = timedelta(seconds=1) if resolution == 'raw' else timedelta(0)
+        positions = positions or {}
+        delta_starts = {sensor_id: max(start_date, positions.get(sensor_id, since) + step) for sensor_id in sensor_ids}
+        start_date = min(delta_starts.values(), default=max(start_date, since + step))
+    current_app.logger.debug(f"Fetching '{resolution}' data for practice '{practice_name}' from {start_date} to {end_date}.")
+
+    return {
+        "conn": conn,
+        "practice_id": practice_id,
+        "version": version,
+        "updated_at": updated_at,
+        "query": _readings_query(resolution, len(sensor_ids)) if sensor_ids else None,
+        "params": (*sensor_ids, start_date, end_date),
+        "start_date": start_date,
+        "end_date": end_date,
+        "resolution": resolution,
+        "sensor_ids": sensor_ids,
+        "sensors": sensors,
+        "since": since,
+        "positions": positions or {},
+        "delta_starts": delta_starts
+    }
+
+
+def _readings_query(resolution, sensor_count):
+    """
+    Builds the query for the readings (or rollup buckets) of sensor_count sensors, taking the
+    parameters (*sensor_ids, start, end). Rows are (sensor_id, timestamp, value[, min_value, max_value])
+    in primary-key order, so every sensor is one range scan of its (sensor_id, timestamp) key,
+    limited to the monthly partitions of the range if sensor_readings is partitioned.
+    """
+    placeholders = ', '.join(['%s'] * sensor_count)
+    if resolution == 'raw':
+        return f"""
+            SELECT sensor_id, timestamp, value
+            FROM sensor_readings
+            WHERE sensor_id IN ({placeholders}) AND timestamp BETWEEN %s AND %s
+            ORDER BY sensor_id, timestamp;
+        """
+    return f"""
+        SELECT sensor_id, bucket_start AS timestamp, avg_value AS value, min_value, max_value
+        FROM {ROLLUP_TABLES[resolution]}
+        WHERE sensor_id IN ({placeholders}) AND bucket_start BETWEEN %s AND %s
+        ORDER BY sensor_id, bucket_start;
+    """
+
 
-    query_data = """
-        SELECT s.name AS sensor_name, sr.timestamp, sr.value
-        FROM sensor_readings sr
-        JOIN sensors s ON sr.sensor_id = s.id
-        WHERE s.practice_id = %s AND sr.timestamp BETWEEN %s AND %s
-        ORDER BY sr.timestamp;
+def _get_practice_sensors(conn, practice_id, version):
     """
-    cursor.execute(query_data, (practice_id, start_date, end_date))
-    readings = cursor.fetchall()
+    Returns {sensor_id: sensor_name} for a practice. New sensors are only created by the
+    importer, which bumps the data version, so the result is cached per version.
+    """
+    sensors = sensor_cache.get((practice_id, version))
+    if sensors is None:
+        with timed('lookup'):
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, name FROM sensors WHERE practice_id = %s", (practice_id,))
+            sensors = dict(cursor.fetchall())
+            cursor.close()
+        sensor_cache.set((practice_id, version), sensors)
+    return sensors
+
+
+def _lookup_practices(conn, practice_names):
+    """Returns {name: {"id", "macrogroup_id"}} for the existing practices, querying only those not cached."""
+    practices = {}
+    missing = []
+    for name in practice_names:
+        practice = practice_cache.get(name)
+        if practice is None:
+            missing.append(name)
+        else:
+            practices[name] = practice
+
+    if missing:
+        placeholders = ', '.join(['%s'] * len(missing))
+        with timed('lookup'):
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT name, id, macrogroup_id FROM practices WHERE name IN ({placeholders})", tuple(missing))
+            # Names compare case-insensitively in MySQL, so match the rows back the same way
+            found = {row['name'].casefold(): row for row in cursor.fetchall()}
+            cursor.close()
+        for name in missing:
+            row = found.get(name.casefold())
+            if row:
+                practice = {"id": row['id'], "macrogroup_id": row['macrogroup_id']}
+                practice_cache.set(name, practice)
+                practices[name] = practice
+
+    return practices
+
+
+def _format_point(timestamp, value, min_value=None, max_value=None):
+    """Builds the JSON dict of a single point; rollup points also carry their bucket's min and max."""
+    point = {
+        "timestamp": int(timestamp.timestamp()),
+        "value": float(value)
+    }
+    if min_value is not None:
+        point["min"] = float(min_value)
+        point["max"] = float(max_value)
+    return point
+
+
+def _fetch_sensor_data(prepared, max_points=None, method='lttb'):
+    """
+    A helper function to fetch sensor data. Can be used by multiple endpoints.
+    Runs the query built by _prepare_sensor_query, which reads raw readings or hourly/daily
+    rollups depending on the resolution ('auto' picks by range length). Raw readings of
+    past days are served from the day cache when possible (not for 'since' deltas, which
+    start mid-day), and include compacted days (see _read_rows). If max_points is given,
+    each series is reduced to at most that many points.
+    Returns a list of sensor data.
+    """
+    if prepared['query'] is None:
+        return []
+
+    # Queries run inside 'build' are timed as 'query', so 'build' is the Python work on the rows
+    with timed('build'):
+        if prepared['resolution'] == 'raw' and prepared['since'] is None and day_cache.maxsize > 0:
+            sensor_data_map = _fetch_raw_with_day_cache(prepared)
+        elif prepared['since'] is not None:
+            sensor_data_map = _group_rows(_read_delta_rows(prepared), prepared['sensors'])
+        else:
+            sensor_data_map = _group_rows(_read_rows(prepared, prepared['start_date'], prepared['end_date']), prepared['sensors'])
     
+    with timed('downsample'):
+        formatted_data = [
+            {"name": name, "values": _downsample(values, max_points, method)}
+            for name, values in sensor_data_map.items()
+        ]
+    
+    return formatted_data
+
+
+def _query_rows(conn, query, params):
+    """Runs a readings query and returns all its rows as tuples."""
+    with timed('query'):
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    _count_rows(len(rows))
+    return rows
+
+
+def _read_rows(prepared, start_date, end_date):
+    """
+    Runs a prepared readings query for [start_date, end_date] and returns its rows. Raw reads
+    also return the readings of compacted days, merged in (sensor_id, timestamp) order.
+    """
+    conn = prepared['conn']
+    rows = _query_rows(conn, prepared['query'], (*prepared['sensor_ids'], start_date, end_date))
+    if not _reads_chunks(prepared, start_date):
+        return rows
+    chunks = _query_chunks(conn, prepared['sensor_ids'], start_date, end_date)
+    if not chunks:
+        return rows
+    return list(_merge_chunk_rows(rows, _chunk_rows(chunks, start_date, end_date)))
+
+
+def _group_rows(rows, sensors):
+    """Groups (sensor_id, timestamp, value[, min, max]) rows into a {sensor_name: [point, ...]} map."""
     sensor_data_map = {}
-    for reading in readings:
-        sensor_name = reading['sensor_name']
+    for reading in rows:
+        sensor_name = sensors[reading[0]]
         if sensor_name not in sensor_data_map:
             sensor_data_map[sensor_name] = []
-        
-        sensor_data_map[sensor_name].append({
-            "timestamp": int(reading['timestamp'].timestamp()),
-            "value": float(reading['value'])
-        })
-    
-    formatted_data = [
-        {"name": name, "values": values} 
-        for name, values in sensor_data_map.items()
-    ]
-    
-    return formatted_data
+        sensor_data_map[sensor_name].append(_format_point(*reading[1:]))
+    return sensor_data_map
+
+
+def _fetch_raw_with_day_cache(prepared):
+    """
+    Assembles a raw-resolution range from cached per-day chunks for the days before today,
+    querying only the missing days (one query per contiguous run) and today's readings.
+    Chunks are keyed by the practice's data version, so an import makes them unreachable.
+    """
+    practice_id = prepared['practice_id']
+    version = prepared['version']
+    sensors = prepared['sensors']
+    start_date = prepared['start_date']
+    end_date = prepared['end_date']
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    cacheable_end = min(end_date, today)
+
+    days = []
+    day = start_date
+    while day < cacheable_end:
+        days.append(day)
+        day += timedelta(days=1)
+
+    chunks = {}
+    missing = []
+    for day in days:
+        chunk = day_cache.get((practice_id, version, day))
+        if chunk is None:
+            missing.append(day)
+        else:
+            chunks[day] = chunk
+
+    for run_start, run_end in _contiguous_day_runs(missing):
+        run_chunks = {}
+        day = run_start
+        while day < run_end:
+            run_chunks[day] = {}
+            day += timedelta(days=1)
+
+        for reading in _read_rows(prepared, run_start, run_end - timedelta(seconds=1)):
+            day_map = run_chunks[reading[1].replace(hour=0, minute=0, second=0, microsecond=0)]
+            day_map.setdefault(sensors[reading[0]], []).append(_format_point(*reading[1:]))
+
+        for day, chunk in run_chunks.items():
+            day_cache.set((practice_id, version, day), chunk)
+        chunks.update(run_chunks)
+
+    current_app.logger.debug(f"Day cache: {len(days) - len(missing)} hits, {len(missing)} misses for practice ID {practice_id}.")
+
+    sensor_data_map = {}
+    for day in days:
+        for sensor_name, points in chunks[day].items():
+            sensor_data_map.setdefault(sensor_name, []).extend(points)
+
+    # Readings from today onwards (or just the end instant of a past range) are always fresh
+    fresh_start = max(start_date, cacheable_end)
+    if fresh_start <= end_date:
+        fresh = _group_rows(_read_rows(prepared, fresh_start, end_date), sensors)
+        for sensor_name, points in fresh.items():
+            sensor_data_map.setdefault(sensor_name, []).extend(points)
+
+    return sensor_data_map
+
+
+def _contiguous_day_runs(days):
+    """Groups a sorted list of day starts into [(run_start, run_end_exclusive), ...]."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + timedelta(days=1)
+        else:
+            runs.append([day, day + timedelta(days=1)])
+    return [tuple(run) for run in runs]
+
+
+# --- Compacted Days ---
+# The raw readings of old days may have been moved by script/compact_readings.py into
+# sensor_day_chunks, one compressed blob per sensor and day (see chunkstore.py). Raw reads
+# of ranges before today always look for chunks, so compacted days never go missing; a
+# reading still in sensor_readings (e.g. imported late into a compacted day) takes
+# precedence over the chunk's reading with the same timestamp.
+def _reads_chunks(prepared, start_date):
+    """True if a read of the prepared query from start_date on may cover compacted days."""
+    if prepared['resolution'] != 'raw':
+        return False
+    return start_date < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _has_chunks(conn, sensor_ids, start_date, end_date):
+    """True if any of the sensors has a chunk for a day touching [start_date, end_date]."""
+    placeholders = ', '.join(['%s'] * len(sensor_ids))
+    with timed('query'):
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT 1 FROM sensor_day_chunks
+            WHERE sensor_id IN ({placeholders}) AND day BETWEEN %s AND %s
+            LIMIT 1;
+        """, (*sensor_ids, start_date.date(), end_date.date()))
+        found = cursor.fetchall()
+        cursor.close()
+    return bool(found)
+
+
+def _query_chunks(conn, sensor_ids, start_date, end_date):
+    """Returns the [(sensor_id, day, payload), ...] chunks of the days touching [start_date, end_date], in key order."""
+    placeholders = ', '.join(['%s'] * len(sensor_ids))
+    with timed('query'):
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT sensor_id, day, payload
+            FROM sensor_day_chunks
+            WHERE sensor_id IN ({placeholders}) AND day BETWEEN %s AND %s
+            ORDER BY sensor_id, day;
+        """, (*sensor_ids, start_date.date(), end_date.date()))
+        chunks = cursor.fetchall()
+        cursor.close()
+    return chunks
+
+
+def _chunk_rows(chunks, start_date, end_date):
+    """Generator of the (sensor_id, timestamp, value) readings of chunks within [start_date, end_date], decoding one chunk at a time."""
+    for sensor_id, day, payload in chunks:
+        timestamps, values = decode_chunk(datetime.combine(day, datetime.min.time()), payload)
+        rows = list(zip(repeat(sensor_id), timestamps, values))
+        if timestamps and (timestamps[0] < start_date or timestamps[-1] > end_date):
+            rows = [row for row in rows if start_date <= row[1] <= end_date]
+        _count_rows(len(rows))
+        yield from rows
+
+
+def _merge_chunk_rows(rows, chunk_rows):
+    """
+    Merges readings rows and chunk rows, both sorted by (sensor_id, timestamp), into one generator
+    in the same order. heapq.merge is stable, so on equal keys the readings row comes first and wins.
+    """
+    previous = None
+    for row in heapq.merge(rows, chunk_rows, key=itemgetter(0, 1)):
+        if row[:2] != previous:
+            previous = row[:2]
+            yield row
+
+
+# --- Delta Fetch ---
+# A cursor records, for every series of a practice, the epoch second up to which the client
+# holds it: "<newest>[,<sensor_id>:<epoch>...]", listing only the series behind the newest
+# point (a battery voltage read once per file, a silent probe). Passing it back as ?since=
+# returns each series from its own position on, so a lagging or sparse series neither has
+# readings skipped nor makes the others be sent again; with rollups a series' cursor bucket
+# is sent again and replaces the client's copy. A plain epoch second puts every series there.
+def _parse_since():
+    """
+    Returns a tuple (since, positions, error) from the optional 'since' cursor: since is the newest
+    position (a naive local datetime) or None, positions maps the lagging sensor IDs to theirs.
+    """
+    raw_since = request.args.get('since')
+    if raw_since is None:
+        return None, {}, None
+    try:
+        newest, *lagging = raw_since.split(',')
+        positions = {}
+        for item in lagging:
+            sensor_id, _separator, position = item.partition(':')
+            positions[int(sensor_id)] = datetime.fromtimestamp(int(position))
+        return datetime.fromtimestamp(int(newest)), positions, None
+    except (ValueError, OverflowError, OSError):
+        return None, {}, (jsonify({"status": "error", "result": "'since' must be a cursor returned by a previous response."}), 400)
+
+
+def _read_delta_rows(prepared):
+    """
+    Reads the rows of a delta, each series from its own position on (prepared['delta_starts']).
+    Series at the same position share a query, so a poll usually runs a single one.
+    """
+    groups = {}
+    for sensor_id, start in prepared['delta_starts'].items():
+        groups.setdefault(start, []).append(sensor_id)
+
+    rows = []
+    for start, sensor_ids in groups.items():
+        if start > prepared['end_date']:
+            continue
+        group = {**prepared, "sensor_ids": sensor_ids, "query": _readings_query(prepared['resolution'], len(sensor_ids))}
+        rows.extend(_read_rows(group, start, prepared['end_date']))
+    # Each group is in key order; a stable sort by sensor keeps every series in time order
+    rows.sort(key=lambda row: row[0])
+    return rows
+
 
+def _series_cursor(series_list, prepared):
+    """
+    Returns the cursor for a response (see above): every series is at its last point or, if the
+    response has none of its points, at its position in the incoming cursor. None without positions.
+    """
+    positions = {}
+    if prepared['since'] is not None:
+        since = int(prepared['since'].timestamp())
+        positions = {sensor_id: since for sensor_id in prepared['sensor_ids']}
+        positions.update((sensor_id, int(position.timestamp())) for sensor_id, position in prepared['positions'].items()
+                         if sensor_id in positions)
+
+    sensor_ids = {name: sensor_id for sensor_id, name in prepared['sensors'].items()}
+    for series in series_list:
+        if series['values']:
+            positions[sensor_ids[series['name']]] = series['values'][-1]['timestamp']
+    if not positions:
+        return None
+
+    newest = max(positions.values())
+    lagging = sorted((sensor_id, position) for sensor_id, position in positions.items() if position < newest)
+    return ','.join([str(newest), *(f"{sensor_id}:{position}" for sensor_id, position in lagging)])
+
+
+# --- Conditional Requests ---
+# The importer bumps practice_data_versions.version every time it commits data for
+# a practice. Data responses carry an ETag derived from that version and from the
+# request, so a client that already holds the current response gets a 304 without
+# the readings being queried again.
+def _get_data_version(conn, practice_id):
+    """Returns (version, updated_at) of a practice's data, or (0, None) if it was never imported."""
+    with timed('lookup'):
+        cursor = conn.cursor()
+        cursor.execute("SELECT version, updated_at FROM practice_data_versions WHERE practice_id = %s", (practice_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    return row if row else (0, None)
+
+
+def _data_validators(prepared, fmt, explicit_window=True):
+    """
+    Computes the (etag, last_modified) pair of a data request prepared by _prepare_sensor_query.
+    last_modified is None for windows computed on the server (explicit_window=False): they move
+    forward with the days even when nothing is imported, which a date cannot tell the client.
+    """
+    version, updated_at = prepared['version'], prepared['updated_at']
+    # The request arguments identify the window; the resolved dates only matter for the windows
+    # computed on the server (e.g. the last 14 days), and are taken by the day: an end date
+    # defaulting to now must not change the ETag every second
+    key = json.dumps([
+        prepared['practice_id'],
+        version,
+        prepared['resolution'],
+        [f"{prepared['start_date']:%Y-%m-%d}", f"{prepared['end_date']:%Y-%m-%d}"],
+        sorted(request.args.items(multi=True)),
+        fmt
+    ])
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    # DATETIME values are naive server-local times, like the reading timestamps
+    last_modified = updated_at.astimezone(timezone.utc) if updated_at and explicit_window else None
+    return etag, last_modified
+
+
+def _is_not_modified(etag, last_modified):
+    """True if the client's If-None-Match (or, without it, If-Modified-Since) matches the current data."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _with_validators(response, etag, last_modified):
+    """Adds ETag/Last-Modified to a response and asks clients to revalidate before reusing it."""
+    # Weak, because the same data can be sent with different content encodings
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response
+
+
+def _not_modified_response(etag, last_modified):
+    """Builds an empty 304 response carrying the current validators."""
+    return _with_validators(Response(status=304), etag, last_modified)
+
+
+# --- Streaming ---
+# Large ranges can be streamed instead of built in memory: rows are read in chunks
+# from an unbuffered cursor, in (sensor_id, timestamp) order, and written out as JSON
+# as soon as they arrive.
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 5000))
+
+
+def _wants_stream():
+    """True if the client asked for a streamed response with ?stream=1."""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _stream_sensor_data(prepared, prefix, suffix, max_points=None, method='lttb', fmt='json'):
+    """
+    Generator that yields the JSON document prefix + [series, ...] + suffix piece by piece.
+    Plain JSON series are written point by point, so only one chunk of rows is held in memory;
+    with downsampling or the columnar format, one sensor's series at a time.
+    """
+    if prepared['query'] is None:
+        yield prefix + '[]' + suffix
+        return
+
+    buffered = bool(max_points) or fmt == 'columnar'
+    sensors = prepared['sensors']
+    yield prefix + '['
+
+    current_name = None
+    series_count = 0
+    points_in_series = 0
+    pending = []  # Points of the current series, only kept when buffering
+
+    def close_series():
+        if not buffered:
+            return ']}'
+        series = {"name": current_name, "values": _downsample(pending, max_points, method)}
+        if fmt == 'columnar':
+            series = _to_columnar(series)
+        return (', ' if series_count > 1 else '') + json.dumps(series)
+
+    for rows in _iter_row_chunks(prepared):
+        parts = []
+        for row in rows:
+            sensor_name = sensors[row[0]]
+            point = _format_point(*row[1:])
+
+            if sensor_name != current_name:
+                if current_name is not None:
+                    parts.append(close_series())
+                    pending = []
+                series_count += 1
+                current_name = sensor_name
+                points_in_series = 0
+                if not buffered:
+                    parts.append(('' if series_count == 1 else ', ') + '{"name": ' + json.dumps(sensor_name) + ', "values": [')
+
+            if buffered:
+                pending.append(point)
+            else:
+                parts.append((', ' if points_in_series else '') + json.dumps(point))
+            points_in_series += 1
+
+        yield ''.join(parts)
+
+    if current_name is not None:
+        yield close_series()
+    yield ']' + suffix
+
+
+def _iter_row_chunks(prepared, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Runs a prepared readings query on an unbuffered (server-side) cursor and yields its rows
+    in lists of at most chunk_size, so only one chunk is held in memory at a time.
+    Reads covering compacted days go one sensor at a time: the sensor's chunks are fetched
+    first (the cursor's results must be read before the next query), then decoded one day
+    at a time while merging them into its readings.
+    """
+    if not (_reads_chunks(prepared, prepared['start_date'])
+            and _has_chunks(prepared['conn'], prepared['sensor_ids'], prepared['start_date'], prepared['end_date'])):
+        yield from _iter_cursor_rows(prepared['conn'], prepared['query'], prepared['params'], chunk_size)
+        return
+
+    query = _readings_query('raw', 1)
+    start_date = prepared['start_date']
+    end_date = prepared['end_date']
+    for sensor_id in prepared['sensor_ids']:
+        chunks = _query_chunks(prepared['conn'], [sensor_id], start_date, end_date)
+        row_chunks = _iter_cursor_rows(prepared['conn'], query, (sensor_id, start_date, end_date), chunk_size)
+        try:
+            merged = _merge_chunk_rows(chain.from_iterable(row_chunks), _chunk_rows(chunks, start_date, end_date))
+            while True:
+                rows = list(islice(merged, chunk_size))
+                if not rows:
+                    break
+                yield rows
+        finally:
+            row_chunks.close()
+
+
+def _iter_cursor_rows(conn, query, params, chunk_size):
+    """Yields the rows of a query in lists of at most chunk_size, fetched from an unbuffered cursor."""
+    cursor = conn.cursor(buffered=False)
+    try:
+        with timed('query'):
+            cursor.execute(query, params)
+        while True:
+            with timed('query'):
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            _count_rows(len(rows))
+            yield rows
+    finally:
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+        except mysql.connector.Error as err:
+            current_app.logger.warning(f"Error closing streaming cursor: {err}")
+
+
+def _streaming_response(generator, fmt='json'):
+    """Wraps a JSON generator in a chunked response that keeps the request context (and its DB connection) alive."""
+    return Response(stream_with_context(generator), mimetype=WIRE_FORMATS[fmt])
+
+
+# --- Export ---
+# /export writes one row per reading (practice, sensor, timestamp, value, plus min/max
+# for rollups) as CSV or as Parquet row groups of EXPORT_ROW_GROUP_SIZE rows, reading
+# them in chunks from an unbuffered cursor.
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+EXPORT_ROW_GROUP_SIZE = int(os.environ.get('EXPORT_ROW_GROUP_SIZE', 100000))
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+def _export_columns(prepared):
+    columns = ['practice', 'sensor', 'timestamp', 'value']
+    return columns + ['min', 'max'] if prepared['resolution'] != 'raw' else columns
+
+
+def _export_csv(prepared):
+    """Generator of the CSV export, one chunk of rows at a time."""
+    yield ','.join(_export_columns(prepared)) + '\r\n'
+    if prepared['query'] is None:
+        return
+
+    # The quoted "practice,sensor," prefix of each sensor's lines is built once
+    prefixes = {}
+    for sensor_id, names in prepared['sensors'].items():
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(names + ('',))
+        prefixes[sensor_id] = buffer.getvalue()[:-2]
+
+    for rows in _iter_row_chunks(prepared):
+        yield ''.join(
+            prefixes[row[0]] + row[1].strftime('%Y-%m-%d %H:%M:%S') + ''.join(
+                ',' + ('' if value is None else repr(float(value))) for value in row[2:]
+            ) + '\r\n'
+            for row in rows
+        )
+
+
+class _ChunkSink:
+    """Write-only file object that keeps what pyarrow writes until the generator takes it."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _export_parquet(prepared):
+    """Generator of the Parquet export: each row group is yielded as soon as it is written."""
+    rollup = prepared['resolution'] != 'raw'
+    fields = [('practice', pa.string()), ('sensor', pa.string()), ('timestamp', pa.timestamp('s')), ('value', pa.float64())]
+    if rollup:
+        fields += [('min', pa.float64()), ('max', pa.float64())]
+    schema = pa.schema(fields)
+    sensors = prepared['sensors']
+
+    def to_table(rows):
+        columns = [
+            [sensors[row[0]][0] for row in rows],
+            [sensors[row[0]][1] for row in rows],
+            [row[1] for row in rows],
+        ]
+        columns += [[None if row[i] is None else float(row[i]) for row in rows] for i in range(2, len(fields) - 1)]
+        return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        pending = []
+        if prepared['query'] is not None:
+            for rows in _iter_row_chunks(prepared):
+                pending.extend(rows)
+                while len(pending) >= EXPORT_ROW_GROUP_SIZE:
+                    writer.write_table(to_table(pending[:EXPORT_ROW_GROUP_SIZE]))
+                    pending = pending[EXPORT_ROW_GROUP_SIZE:]
+                    yield sink.take()
+        if pending:
+            writer.write_table(to_table(pending))
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+# --- Wire Formats ---
+# /get_data and /get_latest_data negotiate the series encoding through the 'format'
+# query parameter or the Accept header:
+#   json      {"name", "values": [{"timestamp", "value"}, ...]} (default)
+#   columnar  {"name", "t": [t0, dt1, dt2, ...], "v": [...]} with delta-encoded timestamps
+#   binary    packed little-endian series, see _encode_binary
+#   msgpack   the columnar document encoded with MessagePack (requires the msgpack package)
+WIRE_FORMATS = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.sonde.columnar+json',
+    'binary': 'application/vnd.sonde.series',
+    'msgpack': 'application/msgpack',
+}
+BINARY_MAGIC = b'SND1'
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _negotiate_format(formats=tuple(WIRE_FORMATS)):
+    """
+    Returns a tuple (format, error) with the wire format requested through ?format=
+    or the Accept header, among the given formats; error is a response tuple or None.
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        mimetypes = {WIRE_FORMATS[name]: name for name in formats}
+        best = request.accept_mimetypes.best_match(list(mimetypes), default=WIRE_FORMATS['json'])
+        fmt = mimetypes[best]
+
+    if fmt not in formats:
+        return None, (jsonify({"status": "error", "result": f"Invalid 'format'. Use one of: {', '.join(formats)}."}), 400)
+    if fmt == 'msgpack' and msgpack is None:
+        return None, (jsonify({"status": "error", "result": "MessagePack is not available on this server."}), 406)
+    return fmt, None
+
+
+def _to_columnar(series):
+    """Converts a {"name", "values"} series to the columnar form with delta-encoded timestamps."""
+    values = series['values']
+    timestamps = [p['timestamp'] for p in values]
+    columnar = {
+        **({"practice": series['practice']} if 'practice' in series else {}),
+        "name": series['name'],
+        "t": timestamps[:1] + [b - a for a, b in zip(timestamps, timestamps[1:])],
+        "v": [p['value'] for p in values]
+    }
+    if values and 'min' in values[0]:
+        columnar["min"] = [p['min'] for p in values]
+        columnar["max"] = [p['max'] for p in values]
+    return columnar
+
+
+def _encode_binary(series_list):
+    """
+    Packs the series into the binary wire format (all integers little-endian):
+        b'SND1', uint32 series count, then for each series:
+        uint16 name length, UTF-8 name, uint32 point count,
+        int32[count] epoch seconds, float32[count] values.
+    """
+    parts = [BINARY_MAGIC, struct.pack('<I', len(series_list))]
+    for series in series_list:
+        name = series['name'].encode('utf-8')
+        timestamps = array('i', (p['timestamp'] for p in series['values']))
+        values = array('f', (p['value'] for p in series['values']))
+        if sys.byteorder == 'big':
+            timestamps.byteswap()
+            values.byteswap()
+        parts.append(struct.pack('<H', len(name)))
+        parts.append(name)
+        parts.append(struct.pack('<I', len(timestamps)))
+        parts.append(timestamps.tobytes())
+        parts.append(values.tobytes())
+    return b''.join(parts)
+
+
+def _series_response(series_list, fmt, wrap, headers=None):
+    """
+    Renders a list of {"name", "values"} series in the negotiated format.
+    wrap builds the response envelope around the (encoded) series list; the binary
+    format has no envelope, so any metadata must be passed in headers.
+    """
+    with timed('serialize'):
+        if fmt == 'binary':
+            return Response(_encode_binary(series_list), mimetype=WIRE_FORMATS['binary'], headers=headers)
+        if fmt in ('columnar', 'msgpack'):
+            series_list = [_to_columnar(series) for series in series_list]
+        payload = wrap(series_list)
+        if fmt == 'msgpack':
+            return Response(msgpack.packb(payload), mimetype=WIRE_FORMATS['msgpack'], headers=headers)
+        if fmt == 'columnar':
+            return Response(json.dumps(payload), mimetype=WIRE_FORMATS['columnar'], headers=headers)
+        response = jsonify(payload)
+        if headers:
+            response.headers.extend(headers)
+        return response
+
+
+# --- Response Compression ---
+# Responses above COMPRESSION_MIN_SIZE are compressed with brotli (if installed)
+# or gzip, depending on the client's Accept-Encoding. Streamed responses are
+# compressed chunk by chunk.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSIBLE_MIMETYPES = set(WIRE_FORMATS.values()) | {EXPORT_FORMATS['csv']}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _choose_encoding():
+    """Returns 'br', 'gzip' or None according to the request's Accept-Encoding."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress_stream(chunks, encoding):
+    """Compresses an iterable of str/bytes chunks incrementally."""
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+        compress, flush = compressor.compress, compressor.flush
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk)
+        if data:
+            yield data
+    yield flush()
+
+
+@api.after_app_request
+def compress_response(response):
+    """Compresses data responses when the client accepts it."""
+    if response.status_code != 200 or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        with timed('compress'):
+            if encoding == 'br':
+                response.set_data(brotli.compress(data))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# --- Resolution Selection ---
+# Ranges up to RAW_MAX_RANGE are served from sensor_readings, ranges up to
+# HOURLY_MAX_RANGE from the hourly rollups, anything longer from the daily ones.
+RESOLUTIONS = ('auto', 'raw', 'hourly', 'daily')
+ROLLUP_TABLES = {
+    'hourly': 'sensor_readings_hourly',
+    'daily': 'sensor_readings_daily',
+}
+RAW_MAX_RANGE = timedelta(days=int(os.environ.get('RAW_MAX_RANGE_DAYS', 31)))
+HOURLY_MAX_RANGE = timedelta(days=int(os.environ.get('HOURLY_MAX_RANGE_DAYS', 366)))
+
+
+def _select_resolution(start_date, end_date):
+    """Picks the coarsest table that still gives enough points for the requested range."""
+    span = end_date - start_date
+    if span <= RAW_MAX_RANGE:
+        return 'raw'
+    if span <= HOURLY_MAX_RANGE:
+        return 'hourly'
+    return 'daily'
+
+
+# --- Batch Queries ---
+# Upper bound on the practices of one /get_batch_data request, which keeps the
+# IN (...) lists and the response size reasonable.
+BATCH_MAX_PRACTICES = int(os.environ.get('BATCH_MAX_PRACTICES', 50))
+
+
+# --- Statistics ---
+# /get_stats aggregates the raw readings in a single query. Window functions rank the
+# readings of each sensor (and bucket) by value and by time, so percentiles (nearest-rank
+# method) and the last value are picked in the same pass as the plain aggregates.
+STATS_BUCKETS = {
+    'hour': "TIMESTAMP(DATE(timestamp), MAKETIME(HOUR(timestamp), 0, 0))",
+    'day': "TIMESTAMP(DATE(timestamp))",
+    'week': "TIMESTAMP(DATE(timestamp) - INTERVAL WEEKDAY(timestamp) DAY)",  # Weeks start on Monday
+}
+# Python equivalents of STATS_BUCKETS, for ranges with compacted days (see _stats_from_rows)
+STATS_BUCKET_STARTS = {
+    'hour': lambda timestamp: timestamp.replace(minute=0, second=0, microsecond=0),
+    'day': lambda timestamp: timestamp.replace(hour=0, minute=0, second=0, microsecond=0),
+    'week': lambda timestamp: timestamp.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=timestamp.weekday()),
+}
+STATS_DEFAULT_PERCENTILES = (5, 50, 95)
+STATS_MAX_PERCENTILES = 10
+
+
+def _parse_percentiles():
+    """Returns a tuple (percentiles, error) from the 'percentiles' parameter; error is a response tuple or None."""
+    value = request.args.get('percentiles')
+    if value is None:
+        return list(STATS_DEFAULT_PERCENTILES), None
+    try:
+        percentiles = sorted({float(item) for item in value.split(',') if item.strip()})
+    except ValueError:
+        percentiles = None
+    if percentiles is None or len(percentiles) > STATS_MAX_PERCENTILES or any(not 0 < p <= 100 for p in percentiles):
+        return None, (jsonify({"status": "error", "result": f"Invalid 'percentiles'. Use up to {STATS_MAX_PERCENTILES} comma-separated values in (0, 100]."}), 400)
+    return [int(p) if p.is_integer() else p for p in percentiles], None
+
+
+def _stats_query(sensor_count, bucket, percentiles):
+    """
+    Builds the statistics query for sensor_count sensors, taking the parameters
+    (*sensor_ids, start, end, *percentile fractions). Rows are (sensor_id, bucket, count, min,
+    max, mean, stddev, last_value, last_timestamp, *percentile values), bucket being NULL
+    without bucketing.
+    """
+    placeholders = ', '.join(['%s'] * sensor_count)
+    bucket_expr = STATS_BUCKETS[bucket] if bucket else "NULL"
+    partition = f"sensor_id, {bucket_expr}" if bucket else "sensor_id"
+    percentile_columns = ''.join(
+        ",\n               MAX(CASE WHEN value_rank = GREATEST(1, CEIL(%s * n)) THEN value END)" for _ in percentiles
+    )
+    return f"""
+        WITH ranked AS (
+            SELECT sensor_id, {bucket_expr} AS bucket, timestamp, value,
+                   ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY value) AS value_rank,
+                   ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY timestamp DESC) AS recency,
+                   COUNT(*) OVER (PARTITION BY {partition}) AS n
+            FROM sensor_readings
+            WHERE sensor_id IN ({placeholders}) AND timestamp BETWEEN %s AND %s
+        )
+        SELECT sensor_id, bucket, COUNT(*), MIN(value), MAX(value), AVG(value), STDDEV_SAMP(value),
+               MAX(CASE WHEN recency = 1 THEN value END),
+               MAX(CASE WHEN recency = 1 THEN timestamp END){percentile_columns}
+        FROM ranked
+        GROUP BY sensor_id, bucket
+        ORDER BY sensor_id, bucket;
+    """
+
+
+def _fetch_sensor_stats(prepared, bucket, percentiles):
+    """
+    Runs the statistics query on the sensors of a practice prepared by _prepare_sensor_query.
+    Returns [{"name", **stats}, ...] without bucketing, or [{"name", "buckets": [{"start", **stats}, ...]}, ...],
+    sorted by sensor name; sensors without readings in the range are left out.
+    """
+    sensor_ids = prepared['sensor_ids']
+    if not sensor_ids:
+        return []
+
+    conn = prepared['conn']
+    start_date = prepared['start_date']
+    end_date = prepared['end_date']
+    chunks = _query_chunks(conn, sensor_ids, start_date, end_date) if _reads_chunks(prepared, start_date) else None
+    if chunks:
+        # The database cannot see inside the chunks, so these statistics are computed here
+        readings = _merge_chunk_rows(_query_rows(conn, prepared['query'], prepared['params']), _chunk_rows(chunks, start_date, end_date))
+        with timed('build'):
+            rows = _stats_from_rows(readings, bucket, percentiles)
+    else:
+        query = _stats_query(len(sensor_ids), bucket, percentiles)
+        params = (*sensor_ids, start_date, end_date, *(p / 100 for p in percentiles))
+        rows = _query_rows(conn, query, params)
+
+    def optional_float(value):
+        return None if value is None else float(value)
+
+    sensors = {}
+    for sensor_id, bucket_start, count, minimum, maximum, mean, stddev, last_value, last_timestamp, *values in rows:
+        stats = {
+            "count": count,
+            "min": float(minimum),
+            "max": float(maximum),
+            "mean": float(mean),
+            "stddev": optional_float(stddev),  # NULL for a single reading
+            "last": float(last_value),
+            "lastTimestamp": int(last_timestamp.timestamp()),
+            **{f"p{p}": optional_float(value) for p, value in zip(percentiles, values)}
+        }
+        name = prepared['sensors'][sensor_id]
+        if bucket:
+            sensors.setdefault(name, []).append({"start": int(bucket_start.timestamp()), **stats})
+        else:
+            sensors[name] = stats
+
+    if bucket:
+        return [{"name": name, "buckets": sensors[name]} for name in sorted(sensors)]
+    return [{"name": name, **sensors[name]} for name in sorted(sensors)]
+
+
+def _stats_from_rows(readings, bucket, percentiles):
+    """
+    Aggregates (sensor_id, timestamp, value) readings, sorted by sensor and time, into the same
+    rows as the statistics query (see _stats_query), with the same definitions: sample standard
+    deviation and nearest-rank percentiles.
+    """
+    bucket_start = STATS_BUCKET_STARTS[bucket] if bucket else (lambda timestamp: None)
+    rows = []
+    for (sensor_id, start), group in groupby(readings, key=lambda row: (row[0], bucket_start(row[1]))):
+        group = list(group)
+        values = sorted(row[2] for row in group)
+        count = len(values)
+        mean = math.fsum(values) / count
+        stddev = math.sqrt(math.fsum((value - mean) ** 2 for value in values) / (count - 1)) if count > 1 else None
+        ranks = (max(1, math.ceil(p / 100 * count)) for p in percentiles)
+        rows.append((sensor_id, start, count, values[0], values[-1], mean, stddev, group[-1][2], group[-1][1],
+                     *(values[rank - 1] for rank in ranks)))
+    return rows
+
+
+# --- Downsampling ---
+# Charts cannot draw more points than they have pixels, so long ranges are
+# reduced on the server before serialization.
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def _parse_downsample_args():
+    """
+    Reads the optional 'max_points' (or 'width', in pixels) and 'downsample' query parameters.
+    Returns a tuple (max_points, method, error) where error is a response tuple or None.
+    """
+    raw_points = request.args.get('max_points') or request.args.get('width')
+    method = request.args.get('downsample', 'lttb').lower()
+
+    if method not in DOWNSAMPLE_METHODS:
+        return None, None, (jsonify({"status": "error", "result": f"Invalid 'downsample' method. Use one of: {', '.join(DOWNSAMPLE_METHODS)}."}), 400)
+
+    if raw_points is None:
+        return None, method, None
+
+    try:
+        max_points = int(raw_points)
+    except ValueError:
+        return None, None, (jsonify({"status": "error", "result": "'max_points' must be an integer."}), 400)
+
+    if max_points < 3:
+        return None, None, (jsonify({"status": "error", "result": "'max_points' must be at least 3."}), 400)
+
+    return max_points, method, None
+
+
+def _downsample(values, max_points, method='lttb'):
+    """Reduces a time-ordered list of points to at most max_points using the given method."""
+    if not max_points or len(values) <= max_points:
+        return values
+    if method == 'minmax':
+        return _downsample_minmax(values, max_points)
+    return _downsample_lttb(values, max_points)
+
+
+def _downsample_lttb(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, for every bucket in between,
+    the point forming the largest triangle with the previously selected point and the next bucket's average.
+    """
+    n = len(values)
+    bucket_size = (n - 2) / (threshold - 2)
+    sampled = [values[0]]
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        avg_start = int((i + 1) * bucket_size) + 1
+        avg_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_range = values[avg_start:avg_end]
+        avg_x = sum(p['timestamp'] for p in avg_range) / len(avg_range)
+        avg_y = sum(p['value'] for p in avg_range) / len(avg_range)
+
+        # Point of the current bucket with the largest triangle area
+        range_start = int(i * bucket_size) + 1
+        range_end = int((i + 1) * bucket_size) + 1
+        point_ax = values[a]['timestamp']
+        point_ay = values[a]['value']
+
+        max_area = -1.0
+        next_a = range_start
+        for j in range(range_start, range_end):
+            area = abs(
+                (point_ax - avg_x) * (values[j]['value'] - point_ay)
+                - (point_ax - values[j]['timestamp']) * (avg_y - point_ay)
+            )
+            if area > max_area:
+                max_area = area
+                next_a = j
+
+        sampled.append(values[next_a])
+        a = next_a
+
+    sampled.append(values[-1])
+    return sampled
+
+
+def _downsample_minmax(values, max_points):
+    """Splits the series into max_points // 2 buckets and keeps the minimum and maximum of each, in time order."""
+    n = len(values)
+    buckets = max(1, max_points // 2)
+    bucket_size = n / buckets
+    sampled = []
+
+    for i in range(buckets):
+        bucket = values[int(i * bucket_size):int((i + 1) * bucket_size)]
+        if not bucket:
+            continue
+        low = min(range(len(bucket)), key=lambda k: bucket[k]['value'])
+        high = max(range(len(bucket)), key=lambda k: bucket[k]['value'])
+        for k in sorted({low, high}):
+            sampled.append(bucket[k])
+
+    return sampled
+
+
+@api.route('/events', methods=['GET'])
+def events():
+    """
+    Server-Sent Events stream of new imports for the practices the user can see,
+    optionally restricted to the practice names given as 'practice_id' parameters.
+    Each event carries the practice, its new data version and the imported time span;
+    clients then fetch the new readings (e.g. with /get_data?since=). The stream holds
+    no database connection: a shared poller feeds all subscribers.
+    """
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "result": "Authorization required."}), 401
+
+    # Checked against the permissions at subscription time; a revoked user keeps the stream until it reconnects
+    permissions = _current_permissions()
+    if permissions is None:
+        return jsonify({"status": "error", "result": "Server error."}), 500
+    wanted = set(request.args.getlist('practice_id'))
+
+    def accept(event):
+        if wanted and event['practice'] not in wanted:
+            return False
+        return permissions.allows(event['practice_id'], event['macrogroup_id'])
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    # The stream outlives the request context, so it keeps its own references
+    import_events = current_app.extensions['import_events']
+    heartbeat = current_app.config['EVENTS_HEARTBEAT']
+    subscription = import_events.subscribe(accept, last_event_id)
+    current_app.logger.debug(f"'{session['username']}' subscribed to import events ({import_events.subscriber_count()} subscribers).")
 
-@app.route('/create_user', methods=['POST'])
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                if event is CLOSED:
+                    break
+                if event is None:
+                    # Keeps proxies from closing the idle connection and detects gone clients
+                    yield ": keep-alive\n\n"
+                    continue
+                data = json.dumps({
+                    "practice": event['practice'],
+                    "version": event['version'],
+                    "readings": event['reading_count'],
+                    "firstTimestamp": int(event['first_timestamp'].timestamp()),
+                    "lastTimestamp": int(event['last_timestamp'].timestamp())
+                })
+                yield f"id: {event['id']}\nevent: import\ndata: {data}\n\n"
+        finally:
+            import_events.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Request, pool and cache metrics of this process in the Prometheus text format.
+    If METRICS_TOKEN is set, scrapers must send it as a bearer token; without it the
+    endpoint only exists in development.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        if not current_app.config['DEVELOPMENT']:
+            return jsonify({"status": "error", "result": "Not found."}), 404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({"status": "error", "result": "Authorization required."}), 401
+    return Response(metrics.render(), content_type=Registry.CONTENT_TYPE)
+
+
+@api.route('/create_user', methods=['POST'])
 def create_user():
     """Utility endpoint to create a new user with a hashed password."""
     data = request.get_json()
@@ -309,7 +1999,10 @@ def create_user():
     if not username or not password:
         return jsonify({"status": "error", "message": "Username and password required"}), 400
 
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = current_app.extensions['password_hasher'].generate(password)
+    except LoginBusyError:
+        return jsonify({"status": "error", "message": "Server busy, please retry."}), 503, {"Retry-After": "1"}
 
     conn = get_db()
     if not conn:
@@ -319,72 +2012,124 @@ def create_user():
     try:
         cursor.execute("INSERT INTO users (username, password_hash) VALUES (%s, %s)", (username, hashed_password))
         conn.commit()
-        app.logger.info(f"New user '{username}' created successfully.")
+        current_app.logger.info(f"New user '{username}' created successfully.")
         return jsonify({"status": "ok", "message": f"User {username} created"}), 201
     except mysql.connector.Error as err:
-        app.logger.error(f"Error creating user '{username}': {err}")
+        current_app.logger.error(f"Error creating user '{username}': {err}")
         return jsonify({"status": "error", "message": "This username already exists."}), 409
 
-# --- Application Startup ---
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Sensor Data REST Server')
-    parser.add_argument(
-        '--loglevel',
-        type=str.upper,
-        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
-        default='INFO',
-        help='Set the logging level.'
-    )
-    args = parser.parse_args()
-    log_level = getattr(logging, args.loglevel, logging.INFO)
-    
+# --- Application Factory ---
+CORS_EXPOSE_HEADERS = ["X-Start-Date", "X-End-Date", "X-Cursor", "Content-Disposition"]
+
+
+def create_app(config=None):
+    """
+    Builds the application from the environment (see config.py), updated with the optional
+    config mapping: logging, cookie security, CORS, sessions, the connection pool, the
+    import event poller and the password hasher. Every worker process must build its own application (no preloading
+    before the fork), so that pooled connections and background threads are never shared.
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(logging.Formatter(
         '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
     ))
     app.logger.handlers.clear()
     app.logger.addHandler(console_handler)
-    app.logger.setLevel(log_level)
-    
-    app.logger.info('--- Starting Sensor Server ---')
-    app.logger.info(f'Log level set to: {args.loglevel}')
-
-    debug_mode = (args.loglevel == 'DEBUG')
+    app.logger.setLevel(getattr(logging, app.config['LOG_LEVEL'], logging.INFO))
+    app.logger.info(f"Log level set to: {app.config['LOG_LEVEL']}")
 
-    if debug_mode:
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    if app.config['DEVELOPMENT']:
         app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
         app.config['SESSION_COOKIE_SECURE'] = False
-        app.config['SESSION_COOKIE_HTTPONLY'] = True
         app.logger.info('DEVELOPMENT MODE: Cookie Security disabled for HTTP')
+        origins = re.compile(r"http://(localhost|127\.0\.0\.1):\d+")
+        app.logger.info('CORS enabled for localhost (any port)')
     else:
         app.config['SESSION_COOKIE_SAMESITE'] = 'None'
         app.config['SESSION_COOKIE_SECURE'] = True
-        app.config['SESSION_COOKIE_HTTPONLY'] = True
         app.logger.info('PRODUCTION MODE: Cookie Security enabled for HTTPS')
-    
-    if debug_mode:
-        origin_regex = re.compile(r"http://(localhost|127\.0\.0\.1):\d+")
-        CORS(
-            app,
-            resources={r"/*": {"origins": origin_regex}},
-            supports_credentials=True,
-            allow_headers=["Content-Type"]
-        )
-        app.logger.info('CORS enabled for localhost (any port)')
-    else:
-        allowed_origins = os.environ.get('ALLOWED_ORIGINS', '').split(',')
-        CORS(
-            app,
-            resources={r"/*": {"origins": allowed_origins}},
-            supports_credentials=True,
-            allow_headers=["Content-Type"]
+        origins = app.config['ALLOWED_ORIGINS']
+        app.logger.info(f'CORS enabled for: {origins}')
+    CORS(
+        app,
+        resources={r"/*": {"origins": origins}},
+        supports_credentials=True,
+        allow_headers=["Content-Type"],
+        expose_headers=CORS_EXPOSE_HEADERS
+    )
+
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = load_secret_key(
+            app.config['SECRET_KEY_FILE'] or os.path.join(app.instance_path, 'secret_key'), app.logger
         )
-        app.logger.info(f'CORS enabled for: {allowed_origins}')
-    
-    app.config["SECRET_KEY"] = os.environ.get('FLASK_SECRET_KEY', os.urandom(24))
-    app.config["SESSION_TYPE"] = "filesystem"
-    
-    Session(app)
-    
-    app.run(debug=debug_mode, port=5000)
+    init_session_backend(app, app.config['SESSION_BACKEND'])
+
+    # One pool per process, shared by all request threads. Under gevent the C extension of
+    # mysql.connector would block the event loop on every query: the pure-Python protocol
+    # uses the patched sockets and yields to the other greenlets while waiting for MySQL.
+    db_pool = ConnectionPool(
+        {
+            'host': app.config['DB_HOST'],
+            'port': app.config['DB_PORT'],
+            'user': app.config['DB_USER'],
+            'password': app.config['DB_PASSWORD'],
+            'database': app.config['DB_NAME'],
+            'use_pure': app.config['SERVER_WORKER'] == 'gevent'
+        },
+        size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_POOL_MAX_OVERFLOW'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        recycle=app.config['DB_POOL_RECYCLE'],
+        pre_ping=app.config['DB_POOL_PRE_PING'],
+        logger=app.logger
+    )
+    app.extensions['db_pool'] = db_pool
+    # New imports are pushed to the dashboards subscribed to /events
+    app.extensions['import_events'] = ImportEventBroadcaster(
+        db_pool,
+        poll_interval=app.config['EVENTS_POLL_INTERVAL'],
+        logger=app.logger
+    )
+
+    # Password hashes run on their own bounded thread pool, see auth.PasswordHasher
+    app.extensions['password_hasher'] = PasswordHasher(
+        workers=app.config['LOGIN_HASH_WORKERS'],
+        max_pending=app.config['LOGIN_MAX_PENDING']
+    )
+
+    app.register_blueprint(api)
+    return app
 
+
+# --- Application Startup ---
+# Development server. In production, run several workers with gunicorn instead:
+#     gunicorn -c gunicorn.conf.py wsgi:app
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sensor Data REST Server')
+    parser.add_argument(
+        '--loglevel',
+        type=str.upper,
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        help='Set the logging level (default: LOG_LEVEL). DEBUG also enables development mode.'
+    )
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.loglevel:
+        overrides['LOG_LEVEL'] = args.loglevel
+        overrides['DEVELOPMENT'] = args.loglevel == 'DEBUG'
+    app = create_app(overrides)
+    app.logger.info('--- Starting Sensor Server ---')
+
+    if os.environ.get('SERVER_WORKER') == 'gevent':
+        from gevent.pywsgi import WSGIServer
+        app.logger.info(f'Serving with gevent on port {args.port}')
+        WSGIServer(('', args.port), app).serve_forever()
+    else:
+        app.run(debug=app.config['DEVELOPMENT'], port=args.port)
@@ -0,0 +1,167 @@
+import concurrent.futures
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from cache import TTLCache
+
+
+class LoginBusyError(Exception):
+    """Raised when more password hashes are pending than the hasher admits."""
+
+
+def _native_thread_pool(workers):
+    """
+    An executor running on real OS threads. Under gevent, the threading module is patched to
+    use greenlets, which would run the hashes on the event loop; gevent's executor uses its
+    native thread pool instead and waits for the results cooperatively.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor
+            return ThreadPoolExecutor(max_workers=workers)
+    except ImportError:
+        pass
+    return concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's deliberately slow password hashing on at most `workers` threads, so that
+    a burst of logins cannot take every CPU (or, with gevent, the event loop) away from the
+    data requests. At most `max_pending` hashes are admitted, running or queued; beyond that,
+    calls fail at once with LoginBusyError instead of piling up request threads.
+    """
+
+    def __init__(self, workers=2, max_pending=32):
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._executor = None  # Created on first use, in the process that serves requests
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+
+    def _run(self, function, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise LoginBusyError(f"{self._pending} password hashes already pending.")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = _native_thread_pool(self.workers)
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": self._pending, "rejected": self.rejected}
+
+
+class Permissions:
+    """The macrogroups and practices a user can read, at a given version of the permission tables."""
+
+    def __init__(self, user_id, macrogroups, practices, version):
+        self.user_id = user_id
+        self.macrogroups = frozenset(macrogroups)
+        self.practices = frozenset(practices)
+        self.version = version
+        # Users with the same permissions share the cached tree built from them
+        self.key = (tuple(sorted(self.macrogroups)), tuple(sorted(self.practices)))
+
+    def is_empty(self):
+        return not self.macrogroups and not self.practices
+
+    def allows(self, practice_id, macrogroup_id):
+        return macrogroup_id in self.macrogroups or practice_id in self.practices
+
+
+def load_permissions(conn, user_id):
+    """Reads a user's permissions and the current permission version in a single query."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 'version', version FROM permission_versions WHERE id = 1
+        UNION ALL
+        SELECT 'macrogroup', macrogroup_id FROM user_macrogroup_permissions WHERE user_id = %s
+        UNION ALL
+        SELECT 'practice', practice_id FROM user_practice_permissions WHERE user_id = %s
+    """, (user_id, user_id))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    version = next((value for kind, value in rows if kind == 'version'), 0)
+    return Permissions(
+        user_id,
+        [value for kind, value in rows if kind == 'macrogroup'],
+        [value for kind, value in rows if kind == 'practice'],
+        version
+    )
+
+
+class PermissionCache:
+    """
+    Per-user Permissions shared by all requests of the process.
+
+    Triggers on the permission tables bump the counter in permission_versions on every
+    change (migration 0008). The counter is read at most every `version_ttl` seconds and
+    entries loaded at an older version are reloaded, so a change reaches every worker
+    within that delay, without a re-login. Entries also expire after `ttl` seconds, for
+    the changes triggers do not see (rows deleted by a foreign key cascade).
+    """
+
+    def __init__(self, maxsize=10000, ttl=300, version_ttl=5):
+        self.entries = TTLCache(maxsize, ttl)
+        self.version_ttl = version_ttl
+
+        self._version = None
+        self._version_read_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self, connect):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_read_at < self.version_ttl:
+                return self._version
+
+        conn = connect()
+        if conn is None:
+            return None
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM permission_versions WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+
+        with self._lock:
+            self._version = row[0] if row else 0
+            self._version_read_at = now
+            return self._version
+
+    def get(self, user_id, connect):
+        """
+        Returns the Permissions of a user, or None if the database is unavailable. connect is called
+        for a connection (or None) only when the version or the permissions have to be read.
+        """
+        version = self._current_version(connect)
+        if version is None:
+            return None
+
+        permissions = self.entries.get(user_id)
+        if permissions is None or permissions.version < version:
+            conn = connect()
+            if conn is None:
+                return None
+            permissions = load_permissions(conn, user_id)
+            self.entries.set(user_id, permissions)
+        return permissions
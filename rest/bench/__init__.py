@@ -0,0 +1,7 @@
+"""
+Reproducible benchmarks for the REST server and the importer.
+
+Run the modules from the rest/ directory, e.g. `python -m bench.load --help`;
+see bench/README.md. Every benchmark can save its results as JSON, and
+`python -m bench.compare` compares two saved runs.
+"""
@@ -0,0 +1,70 @@
+import argparse
+import json
+
+# Metrics compared between runs, and whether a higher value is better
+METRICS = {
+    "throughput_per_s": True,
+    "rows_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "client_peak_rss_mb": False,
+    "server_peak_rss_mb": False,
+}
+
+
+def flatten(results, prefix=''):
+    """Returns {'path.to.metric': value} for every known metric found in a results tree."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in METRICS and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline, candidate, threshold=0.05):
+    """
+    Returns [(metric, baseline_value, candidate_value, change, verdict), ...] for the metrics of both runs;
+    verdict is 'better', 'worse' or '' when the relative change is within threshold.
+    """
+    base = flatten(baseline["results"])
+    new = flatten(candidate["results"])
+    rows = []
+    for metric in sorted(base.keys() & new.keys()):
+        old_value, new_value = base[metric], new[metric]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        higher_is_better = METRICS[metric.rsplit('.', 1)[-1]]
+        verdict = ''
+        if abs(change) > threshold:
+            verdict = 'better' if (change > 0) == higher_is_better else 'worse'
+        rows.append((metric, old_value, new_value, change, verdict))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two saved benchmark runs.")
+    parser.add_argument("baseline", help="JSON results of the reference run.")
+    parser.add_argument("candidate", help="JSON results of the run to evaluate.")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Relative change below which results are considered equal.")
+
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline["benchmark"] != candidate["benchmark"]:
+        raise SystemExit(f"Cannot compare a '{baseline['benchmark']}' run with a '{candidate['benchmark']}' run.")
+
+    print(f"baseline:  {baseline['metadata']['commit']} {baseline['metadata']['timestamp']}")
+    print(f"candidate: {candidate['metadata']['commit']} {candidate['metadata']['timestamp']}")
+    worse = 0
+    for metric, old_value, new_value, change, verdict in compare(baseline, candidate, args.threshold):
+        worse += verdict == 'worse'
+        print(f"{metric:<55} {old_value:>12.2f} {new_value:>12.2f} {change:>+8.1%}  {verdict}")
+    raise SystemExit(1 if worse else 0)
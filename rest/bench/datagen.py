@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+# Column names seen in real datalogger exports: strain gauges (FESS*), then temperature
+DEFAULT_SENSORS = ['FESS1', 'FESS2', 'FESS3', 'FESS4', 'TEMP']
+
+
+def sensor_names(count):
+    """Returns `count` column names: FESS1..FESS(count-1) and TEMP."""
+    return [f"FESS{i + 1}" for i in range(count - 1)] + ['TEMP']
+
+
+def write_datalogger_file(path, rows, sensors=DEFAULT_SENSORS, start=datetime(2018, 7, 17, 10, 25),
+                          interval_minutes=10, missing_ratio=0.01, seed=0):
+    """
+    Writes a synthetic datalogger TXT file in the [INIZIO VBATT]/[INIZIO DATI] format read by otr.py,
+    with `rows` readings per sensor taken every interval_minutes. Values follow slow random walks,
+    and about missing_ratio of the cells are left empty, like in real exports. The same seed always
+    produces the same file.
+    """
+    rng = random.Random(seed)
+    levels = {sensor: rng.uniform(-50, 50) for sensor in sensors}
+    step = timedelta(minutes=interval_minutes)
+
+    with open(path, 'w') as f:
+        f.write(f"Stazione di monitoraggio sintetica\n[INIZIO VBATT]{rng.uniform(11.5, 13.5):.2f}[FINE VBATT]\n")
+        f.write("[INIZIO DATI]\n")
+        f.write(','.join(['DATE'] + list(sensors)) + '\n')
+        timestamp = start
+        for _ in range(rows):
+            cells = [timestamp.strftime('%d/%m/%Y %H.%M')]
+            for sensor in sensors:
+                levels[sensor] += rng.gauss(0, 0.2)
+                cells.append('' if rng.random() < missing_ratio else f"{levels[sensor]:.3f}")
+            f.write(','.join(cells) + '\n')
+            timestamp += step
+        f.write("[FINE DATI]\n")
+    return path
+
+
+def generate_files(directory, count, rows, sensors=DEFAULT_SENSORS, interval_minutes=10, seed=0,
+                   start=datetime(2018, 1, 1)):
+    """
+    Writes `count` consecutive files (each continuing where the previous one ends) into directory
+    and returns their paths. File names follow the stazione_DD_MM_YYYY_HH_MM_SS.TXT convention.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        file_start = start + timedelta(minutes=interval_minutes * rows * index)
+        name = f"stazione_{file_start.strftime('%d_%m_%Y_%H_%M_%S')}.TXT"
+        paths.append(write_datalogger_file(
+            os.path.join(directory, name), rows, sensors, file_start, interval_minutes, seed=seed + index
+        ))
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic datalogger TXT files.")
+    parser.add_argument("directory", help="Output directory.")
+    parser.add_argument("--files", type=int, default=1, help="Number of consecutive files.")
+    parser.add_argument("--rows", type=int, default=4320, help="Rows per file (4320 = 30 days at 10 minutes).")
+    parser.add_argument("--sensors", type=int, default=len(DEFAULT_SENSORS), help="Number of sensor columns.")
+    parser.add_argument("--interval", type=int, default=10, help="Minutes between rows.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible files.")
+
+    args = parser.parse_args()
+
+    for file_path in generate_files(args.directory, args.files, args.rows, sensor_names(args.sensors), args.interval, args.seed):
+        print(file_path)
@@ -0,0 +1,117 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench.datagen import DEFAULT_SENSORS, sensor_names, write_datalogger_file
+from bench.stats import peak_rss_mb, save_results, summarize_latencies
+
+# The importer lives in rest/script and is imported the way its own scripts do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'script'))
+import otr  # noqa: E402
+
+
+def time_call(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def _legacy_rows(path, sensor_ids):
+    return otr.build_reading_rows(otr.parse_datalogger_file(path)['readings'], sensor_ids)
+
+
+def _columnar_rows(path, sensor_ids):
+    data = otr.parse_datalogger_columns(path)
+    return otr.build_reading_rows_from_columns(data['timestamps'], data['channels'], sensor_ids)
+
+
+def bench_parsing(path, rows, sensors, repeat):
+    """
+    Times both parsers on the same file, alone and followed by the conversion to reading rows.
+    parse_datalogger_file leaves every cell as a string, so only the second measurement
+    compares the two paths on equal terms.
+    """
+    sensor_ids = {name: index for index, name in enumerate(sensors)}
+    candidates = (
+        ("parse_datalogger_file", lambda: otr.parse_datalogger_file(path)),
+        ("parse_datalogger_columns", lambda: otr.parse_datalogger_columns(path)),
+        ("parse_datalogger_file+build_rows", lambda: _legacy_rows(path, sensor_ids)),
+        ("parse_datalogger_columns+build_rows", lambda: _columnar_rows(path, sensor_ids)),
+    )
+    results = {}
+    for name, function in candidates:
+        durations = [time_call(function)[0] for _ in range(repeat)]
+        summary = summarize_latencies(durations)
+        summary["rows_per_s"] = rows / (sum(durations) / len(durations))
+        results[name] = summary
+    return results
+
+
+def bench_insert(workdir, rows, sensors, repeat, practice_name, batch_size, use_load_data):
+    """
+    Times insert_data_into_db on `repeat` files covering consecutive, not yet imported periods,
+    so every run writes new readings rather than updating existing ones. The summary also
+    breaks the mean duration down by import phase (see otr.ImportTimer).
+    """
+    durations = []
+    phases = {}
+    start = datetime(2001, 1, 1) + timedelta(days=int(time.time()) % 3650)
+    for index in range(repeat):
+        path = write_datalogger_file(
+            os.path.join(workdir, f"insert_{index}.TXT"), rows, sensors,
+            start=start + timedelta(minutes=10 * rows * index), seed=index
+        )
+        data = otr.parse_datalogger_columns(path)
+        timer = otr.ImportTimer()
+        duration, committed = time_call(otr.insert_data_into_db, data, practice_name,
+                                        batch_size=batch_size, use_load_data=use_load_data, timer=timer)
+        if not committed:
+            raise RuntimeError("insert_data_into_db failed; check the database and the practice name.")
+        durations.append(duration)
+        for name, seconds in timer.phases.items():
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    summary = summarize_latencies(durations)
+    summary["phases_mean_ms"] = {name: seconds * 1000 / repeat for name, seconds in phases.items()}
+    summary["rows_per_s"] = rows * len(sensors) / (sum(durations) / len(durations))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the datalogger parser and the database import.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[4320, 43200], help="File sizes to test, in rows.")
+    parser.add_argument("--sensors", type=int, default=len(DEFAULT_SENSORS), help="Sensor columns per file.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement.")
+    parser.add_argument("--practice", help="Practice to import into (must exist). Without it, only parsing is timed.")
+    parser.add_argument("--batch-size", type=int, default=otr.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--load-data", action="store_true", help="Import with LOAD DATA LOCAL INFILE.")
+    parser.add_argument("--output", default=f"bench/results/importer_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    sensors = sensor_names(args.sensors)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            path = write_datalogger_file(os.path.join(workdir, f"parse_{rows}.TXT"), rows, sensors)
+            entry = {"file_bytes": os.path.getsize(path), "parse": bench_parsing(path, rows, sensors, args.repeat)}
+            if args.practice:
+                entry["insert"] = bench_insert(workdir, rows, sensors, args.repeat, args.practice,
+                                               args.batch_size, args.load_data)
+            results[str(rows)] = entry
+
+            print(f"{rows} rows ({entry['file_bytes'] / 1e6:.1f} MB):")
+            for name, summary in entry["parse"].items():
+                print(f"  {name:<36} p50 {summary['p50_ms']:9.1f} ms  {summary['rows_per_s']:12.0f} rows/s")
+            if "insert" in entry:
+                print(f"  {'insert_data_into_db':<36} p50 {entry['insert']['p50_ms']:9.1f} ms  {entry['insert']['rows_per_s']:12.0f} readings/s")
+                print("    " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in entry['insert']['phases_mean_ms'].items()))
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    save_results(args.output, "importer", vars(args), results)
+    print(f"Peak RSS {results['peak_rss_mb']:.1f} MiB. Results saved to {args.output}")
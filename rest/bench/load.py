@@ -0,0 +1,182 @@
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+
+from bench.stats import peak_rss_mb, process_peak_rss_mb, save_results, summarize_latencies
+
+# Relative frequency of each endpoint in the request mix, after a client has logged in
+DEFAULT_MIX = {"get_tree": 1, "get_latest_data": 4, "get_data": 5}
+
+
+class Client:
+    """One simulated dashboard user with its own session cookie."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, params=None, body=None):
+        """Performs a request and returns (status, response_bytes); the body is read fully, as a browser would."""
+        url = f"{self.base_url}{path}"
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as err:
+            return err.code, len(err.read())
+
+
+class LoadTest:
+    """
+    Drives the REST server with `clients` concurrent users for `duration` seconds. Each user
+    logs in once, then issues requests drawn from the endpoint mix, back to back (closed loop).
+    """
+
+    def __init__(self, base_url, username, password, practices, clients, duration, mix, max_points, days, timeout):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.practices = practices
+        self.clients = clients
+        self.duration = duration
+        self.mix = mix
+        self.max_points = max_points
+        self.days = days
+        self.timeout = timeout
+
+        self.latencies = {}
+        self.errors = {}
+        self.bytes = {}
+        self._lock = threading.Lock()
+
+    def _record(self, endpoint, latency, status, size):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + size
+            if status >= 400:
+                self.errors.setdefault(endpoint, {}).setdefault(str(status), 0)
+                self.errors[endpoint][str(status)] += 1
+
+    def _timed(self, client, endpoint, path, params=None, body=None):
+        started = time.perf_counter()
+        try:
+            status, size = client.request(path, params, body)
+        except OSError:
+            status, size = 599, 0  # Connection error or timeout
+        self._record(endpoint, time.perf_counter() - started, status, size)
+        return status
+
+    def _request_params(self, endpoint, rng):
+        practice = rng.choice(self.practices)
+        params = {"practice_id": practice}
+        if self.max_points:
+            params["max_points"] = self.max_points
+        if endpoint == "get_data":
+            end = date.today() - timedelta(days=rng.randrange(0, 365))
+            params["start_date"] = (end - timedelta(days=self.days)).isoformat()
+            params["end_date"] = end.isoformat()
+        return params
+
+    def _user(self, index, deadline):
+        rng = random.Random(index)
+        client = Client(self.base_url, self.timeout)
+        if self._timed(client, "login", "/login", body={"username": self.username, "password": self.password}) != 200:
+            return
+
+        endpoints = list(self.mix)
+        weights = [self.mix[endpoint] for endpoint in endpoints]
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            if endpoint == "get_tree":
+                self._timed(client, endpoint, "/get_tree")
+            else:
+                self._timed(client, endpoint, f"/{endpoint}", self._request_params(endpoint, rng))
+
+    def run(self):
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [threading.Thread(target=self._user, args=(i, deadline)) for i in range(self.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        endpoints = {
+            endpoint: {
+                **summarize_latencies(latencies, elapsed),
+                "errors": self.errors.get(endpoint, {}),
+                "bytes_total": self.bytes.get(endpoint, 0),
+            }
+            for endpoint, latencies in sorted(self.latencies.items())
+        }
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "elapsed_s": elapsed,
+            "overall": summarize_latencies(all_latencies, elapsed),
+            "endpoints": endpoints,
+        }
+
+
+def _parse_mix(value):
+    """Parses 'get_tree=1,get_data=5' into a dict."""
+    mix = {}
+    for item in value.split(','):
+        endpoint, _, weight = item.partition('=')
+        if endpoint not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{endpoint}'. Use: {', '.join(DEFAULT_MIX)}.")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the REST server with concurrent simulated users.")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the server.")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--practice", action="append", required=True, help="Practice name to query (repeat for several).")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50], help="Concurrency levels to run, one after the other.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level.")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX, help="Endpoint weights, e.g. 'get_tree=1,get_latest_data=4,get_data=5'.")
+    parser.add_argument("--max-points", type=int, default=500, help="max_points sent with data requests (0 for none).")
+    parser.add_argument("--days", type=int, default=30, help="Length of the /get_data ranges, in days.")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--server-pid", type=int, help="PID of the server, to report its peak RSS (Linux only).")
+    parser.add_argument("--output", default=f"bench/results/load_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    args = parser.parse_args()
+
+    results = {}
+    for clients in args.clients:
+        test = LoadTest(args.url, args.username, args.password, args.practice, clients, args.duration,
+                        args.mix, args.max_points, args.days, args.timeout)
+        level = test.run()
+        results[str(clients)] = level
+
+        overall = level["overall"]
+        print(f"{clients} clients: {overall['throughput_per_s']:.1f} req/s, "
+              f"p50 {overall['p50_ms']:.1f} ms, p95 {overall['p95_ms']:.1f} ms, p99 {overall['p99_ms']:.1f} ms")
+        for endpoint, summary in level["endpoints"].items():
+            errors = sum(summary["errors"].values())
+            print(f"  {endpoint:<16} {summary['count']:>7} req  p50 {summary['p50_ms']:8.1f}  p95 {summary['p95_ms']:8.1f}  "
+                  f"p99 {summary['p99_ms']:8.1f} ms  {errors} errors")
+
+    results["client_peak_rss_mb"] = peak_rss_mb()
+    if args.server_pid:
+        results["server_peak_rss_mb"] = process_peak_rss_mb(args.server_pid)
+        print(f"Server peak RSS: {results['server_peak_rss_mb']} MiB")
+
+    parameters = {key: value for key, value in vars(args).items() if key != "password"}
+    save_results(args.output, "load", parameters, results)
+    print(f"Results saved to {args.output}")
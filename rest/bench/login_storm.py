@@ -0,0 +1,110 @@
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from bench.load import Client, LoadTest
+from bench.stats import save_results, summarize_latencies
+
+# The dashboard users only fetch data: what is measured is how their latency changes
+# while other users log in
+DATA_MIX = {"get_latest_data": 1, "get_data": 1}
+
+
+class LoginStorm:
+    """
+    `clients` users logging in back to back (closed loop) for `duration` seconds, each login
+    from a new cookie jar, as at a shift change when everyone opens the dashboard at once.
+    """
+
+    def __init__(self, base_url, username, password, clients, duration, timeout):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.clients = clients
+        self.duration = duration
+        self.timeout = timeout
+
+        self.latencies = []
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def _user(self, deadline):
+        body = {"username": self.username, "password": self.password}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _size = Client(self.base_url, self.timeout).request("/login", body=body)
+            except OSError:
+                status = 599
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+                self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def run(self):
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [threading.Thread(target=self._user, args=(deadline,)) for _ in range(self.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {**summarize_latencies(self.latencies, time.monotonic() - started), "statuses": self.statuses}
+
+
+def run_phase(args, storm_clients):
+    """Runs the data users for args.duration seconds, alongside storm_clients logging-in users if any."""
+    data = LoadTest(args.url, args.username, args.password, args.practice, args.clients, args.duration,
+                    DATA_MIX, args.max_points, args.days, args.timeout)
+    storm = LoginStorm(args.url, args.username, args.password, storm_clients, args.duration, args.timeout)
+    storm_result = {}
+    storm_thread = threading.Thread(target=lambda: storm_result.update(storm.run()))
+    if storm_clients:
+        storm_thread.start()
+    level = data.run()
+    if storm_clients:
+        storm_thread.join()
+
+    # The data users' own logins happen once, at the start, and are left out
+    return {
+        "data": {endpoint: summary for endpoint, summary in level["endpoints"].items() if endpoint in DATA_MIX},
+        "login": storm_result or None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure data endpoint latency during a storm of logins.")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the server.")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--practice", action="append", required=True, help="Practice name to query (repeat for several).")
+    parser.add_argument("--clients", type=int, default=10, help="Dashboard users fetching data.")
+    parser.add_argument("--storm", type=int, nargs="+", default=[50], help="Users logging in during the storm, one run per value.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per run.")
+    parser.add_argument("--max-points", type=int, default=500, help="max_points sent with data requests (0 for none).")
+    parser.add_argument("--days", type=int, default=30, help="Length of the /get_data ranges, in days.")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", default=f"bench/results/login_storm_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    args = parser.parse_args()
+
+    results = {"baseline": run_phase(args, 0)}
+    for storm_clients in args.storm:
+        results[f"storm_{storm_clients}"] = run_phase(args, storm_clients)
+
+    baseline = results["baseline"]["data"]
+    for name, phase in results.items():
+        print(f"{name}:")
+        for endpoint, summary in phase["data"].items():
+            reference = baseline.get(endpoint, {}).get("p95_ms")
+            change = f"  ({summary['p95_ms'] / reference:.2f}x baseline p95)" if reference and name != "baseline" else ""
+            print(f"  {endpoint:<16} {summary['count']:>7} req  p50 {summary['p50_ms']:8.1f}  p95 {summary['p95_ms']:8.1f}  "
+                  f"p99 {summary['p99_ms']:8.1f} ms{change}")
+        if phase["login"]:
+            login = phase["login"]
+            print(f"  {'login':<16} {login['count']:>7} req  p50 {login['p50_ms']:8.1f}  p95 {login['p95_ms']:8.1f} ms  "
+                  f"{login['throughput_per_s']:.1f}/s  statuses {login['statuses']}")
+
+    parameters = {key: value for key, value in vars(args).items() if key != "password"}
+    save_results(args.output, "login_storm", parameters, results)
+    print(f"Results saved to {args.output}")
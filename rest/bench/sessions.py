@@ -0,0 +1,87 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from flask import Flask, jsonify, session
+
+from bench.stats import save_results, summarize_latencies
+from sessions import SESSION_BACKENDS, init_session_backend
+
+
+def build_app(backend, workdir, practices):
+    """Builds a minimal app whose routes touch the session the same way /login and /get_data do."""
+    app = Flask(__name__, instance_path=workdir)
+    app.config["SECRET_KEY"] = "benchmark"
+    app.config["SESSION_FILE_DIR"] = os.path.join(workdir, "flask_session")
+    app.config["SESSION_SQLITE_PATH"] = os.path.join(workdir, "sessions.sqlite3")
+    app.config["SESSION_GC_INTERVAL"] = 0
+    init_session_backend(app, backend)
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session.clear()
+        session.permanent = True
+        session['user_id'] = 1
+        session['username'] = 'benchmark'
+        session['accessible_macrogroups'] = list(range(1, 4))
+        session['accessible_practices'] = list(range(1, practices + 1))
+        return jsonify({"message": "Login successful"})
+
+    @app.route('/read')
+    def read():
+        if 'user_id' not in session:
+            return jsonify({"error": "Unauthorized"}), 401
+        return jsonify({"practices": len(session.get('accessible_practices', []))})
+
+    return app
+
+
+def time_requests(call, requests):
+    """Runs call() `requests` times and returns the per-request latencies in seconds."""
+    latencies = []
+    started_all = time.perf_counter()
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = call()
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"Unexpected status {response.status_code}")
+    return summarize_latencies(latencies, time.perf_counter() - started_all)
+
+
+def run(backends, requests, practices):
+    results = {}
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as workdir:
+            app = build_app(backend, workdir, practices)
+            client = app.test_client()
+
+            client.post('/login')
+            results[backend] = {
+                "read": time_requests(lambda: client.get('/read'), requests),
+                "login": time_requests(lambda: client.post('/login'), requests),
+            }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the latency the session backends add to authenticated requests.")
+    parser.add_argument("--backends", nargs="+", choices=SESSION_BACKENDS, default=list(SESSION_BACKENDS))
+    parser.add_argument("--requests", type=int, default=2000, help="Requests timed per backend and route.")
+    parser.add_argument("--practices", type=int, default=50, help="Number of practice IDs stored in the session.")
+    parser.add_argument("--output", default=f"bench/results/sessions_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    args = parser.parse_args()
+
+    results = run(args.backends, args.requests, args.practices)
+
+    print(f"{'backend':<12}{'route':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for backend, routes in results.items():
+        for route, stats in routes.items():
+            print(f"{backend:<12}{route:<8}{stats['throughput_per_s']:>10.0f}{stats['p50_ms']:>10.3f}"
+                  f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+    save_results(args.output, "sessions", vars(args), results)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,91 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+
+
+def percentile(ordered, fraction):
+    """Returns the value at the given fraction (0-1) of an already sorted list, by nearest rank."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies, duration=None):
+    """
+    Summarizes a list of latencies in seconds: count, mean/p50/p95/p99/max in milliseconds
+    and, if the wall-clock duration is given, the throughput in operations per second.
+    """
+    ordered = sorted(latencies)
+    summary = {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else None,
+        "p50_ms": _ms(percentile(ordered, 0.50)),
+        "p95_ms": _ms(percentile(ordered, 0.95)),
+        "p99_ms": _ms(percentile(ordered, 0.99)),
+        "max_ms": _ms(ordered[-1] if ordered else None),
+    }
+    if duration:
+        summary["throughput_per_s"] = len(ordered) / duration
+    return summary
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def process_peak_rss_mb(pid):
+    """Peak resident set size of another process (e.g. the server), in MiB, or None if unavailable."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_metadata():
+    """Describes the environment of a run, so saved results can be compared meaningfully."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(path, benchmark, parameters, results):
+    """Writes a benchmark run (metadata, parameters and results) to a JSON file."""
+    document = {
+        "benchmark": benchmark,
+        "metadata": run_metadata(),
+        "parameters": parameters,
+        "results": results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    return document
@@ -0,0 +1,122 @@
+import struct
+import sys
+import zlib
+from array import array
+from datetime import timedelta
+from itertools import accumulate, repeat
+from operator import xor
+
+# A chunk holds the raw readings of one sensor on one day as a single compressed blob:
+#
+#   header: format version (1 byte), value encoding (1 byte), number of points (4 bytes)
+#   zlib(timestamps + values), each column byte-shuffled
+#
+# Timestamps are seconds since midnight, stored as the first one followed by the deltas
+# between consecutive readings, so a steady 10-minute logger becomes a run of identical
+# values. Values are either the XOR of each double with the previous one (lossless; slowly
+# changing readings leave mostly zero bytes) or plain float32 (lossy, about 7 significant
+# digits). Shuffling groups the n-th byte of every item together, which is what lets zlib
+# squeeze the runs of zero and repeated bytes.
+FORMAT_VERSION = 1
+ENCODING_XOR = 1
+ENCODING_FLOAT32 = 2
+ENCODINGS = {'xor': ENCODING_XOR, 'float32': ENCODING_FLOAT32}
+
+HEADER = struct.Struct('<BBI')
+SECONDS_PER_DAY = 86400
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class ChunkError(ValueError):
+    """Raised for readings that cannot be stored in a chunk and for corrupt chunks."""
+
+
+def _typed(typecode, items):
+    values = array(typecode, items)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _from_bytes(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _shuffle(data, itemsize):
+    return b''.join(data[i::itemsize] for i in range(itemsize))
+
+
+def _unshuffle(data, itemsize):
+    count = len(data) // itemsize
+    result = bytearray(len(data))
+    for i in range(itemsize):
+        result[i::itemsize] = data[i * count:(i + 1) * count]
+    return bytes(result)
+
+
+def encode_chunk(day, points, encoding='xor', level=6):
+    """
+    Packs the readings of one day, [(timestamp, value), ...] sorted by timestamp with naive
+    datetimes on `day` (a datetime at midnight), into a chunk blob.
+    """
+    if encoding not in ENCODINGS:
+        raise ChunkError(f"Unknown chunk encoding '{encoding}'. Use one of: {', '.join(ENCODINGS)}.")
+
+    offsets = [int((timestamp - day).total_seconds()) for timestamp, _value in points]
+    if offsets and (offsets[0] < 0 or offsets[-1] >= SECONDS_PER_DAY):
+        raise ChunkError(f"Readings outside of {day:%Y-%m-%d} cannot be stored in its chunk.")
+    deltas = offsets[:1] + [current - previous for previous, current in zip(offsets, offsets[1:])]
+    if any(delta <= 0 for delta in deltas[1:]):
+        raise ChunkError("Chunk readings must have increasing timestamps.")
+
+    values = [float(value) for _timestamp, value in points]
+    if encoding == 'xor':
+        bits = array('Q', array('d', values).tobytes())  # Reinterpreted, in native byte order
+        packed = _typed('Q', bits[:1].tolist() + list(map(xor, bits[1:], bits[:-1]))).tobytes()
+        value_size = 8
+    else:
+        packed = _typed('f', values).tobytes()
+        value_size = 4
+
+    body = _shuffle(_typed('I', deltas).tobytes(), 4) + _shuffle(packed, value_size)
+    return HEADER.pack(FORMAT_VERSION, ENCODINGS[encoding], len(points)) + zlib.compress(body, level)
+
+
+def decode_chunk(day, blob):
+    """Unpacks a chunk of `day` (a datetime at midnight) into ([timestamp, ...], [value, ...])."""
+    try:
+        version, encoding, count = HEADER.unpack_from(blob)
+        body = zlib.decompress(blob[HEADER.size:])
+    except (struct.error, zlib.error) as e:
+        raise ChunkError(f"Corrupt chunk for {day:%Y-%m-%d}: {e}") from e
+    if version != FORMAT_VERSION or encoding not in ENCODINGS.values():
+        raise ChunkError(f"Unsupported chunk format {version}/{encoding} for {day:%Y-%m-%d}.")
+
+    value_size = 8 if encoding == ENCODING_XOR else 4
+    if len(body) != count * (4 + value_size):
+        raise ChunkError(f"Corrupt chunk for {day:%Y-%m-%d}: expected {count} points.")
+
+    offsets = accumulate(_from_bytes('I', _unshuffle(body[:count * 4], 4)))
+    # timedelta(0, seconds) through map: about twice as fast as a comprehension with keywords
+    timestamps = list(map(day.__add__, map(timedelta, repeat(0), offsets)))
+
+    packed = _unshuffle(body[count * 4:], value_size)
+    if encoding == ENCODING_XOR:
+        bits = array('Q', accumulate(_from_bytes('Q', packed), xor))
+        values = array('d', bits.tobytes()).tolist()
+    else:
+        values = _from_bytes('f', packed).tolist()
+    return timestamps, values
+
+
+def split_days(points):
+    """Groups [(timestamp, value), ...] sorted by timestamp into {day: [(timestamp, value), ...]}."""
+    days = {}
+    for point in points:
+        day = point[0].replace(hour=0, minute=0, second=0, microsecond=0)
+        days.setdefault(day, []).append(point)
+    return days
@@ -0,0 +1,85 @@
+import logging
+import os
+import time
+from datetime import timedelta
+
+
+def _flag(environ, name, default):
+    return environ.get(name, '1' if default else '0').lower() in ('1', 'true', 'yes')
+
+
+def config_from_env(environ=None):
+    """
+    Builds the server configuration from environment variables. create_app applies it
+    to app.config, then any mapping passed by the caller on top of it.
+    """
+    environ = os.environ if environ is None else environ
+    development = _flag(environ, 'DEVELOPMENT', False)
+    return {
+        # Database, with the same variables as the import scripts in rest/script
+        'DB_HOST': environ.get('DB_HOST', 'localhost'),
+        'DB_PORT': int(environ.get('DB_PORT', 3306)),
+        'DB_USER': environ.get('DB_USER', 'sensor_user'),
+        'DB_PASSWORD': environ.get('DB_PASSWORD', 'sensor_password'),
+        'DB_NAME': environ.get('DB_NAME', 'sensordb'),
+        'DB_POOL_SIZE': int(environ.get('DB_POOL_SIZE', 5)),
+        'DB_POOL_MAX_OVERFLOW': int(environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+        'DB_POOL_TIMEOUT': float(environ.get('DB_POOL_TIMEOUT', 10)),
+        'DB_POOL_RECYCLE': int(environ.get('DB_POOL_RECYCLE', 3600)),
+        'DB_POOL_PRE_PING': _flag(environ, 'DB_POOL_PRE_PING', True),
+
+        # Worker class picked by gunicorn.conf.py; app.py patches the standard library for gevent on import
+        'SERVER_WORKER': environ.get('SERVER_WORKER', 'gthread'),
+
+        # Development mode relaxes cookie security for plain HTTP and allows any localhost origin
+        'DEVELOPMENT': development,
+        'LOG_LEVEL': environ.get('LOG_LEVEL', 'DEBUG' if development else 'INFO').upper(),
+        'ALLOWED_ORIGINS': [origin for origin in environ.get('ALLOWED_ORIGINS', '').split(',') if origin],
+
+        # Sessions. Without FLASK_SECRET_KEY the key is read from (or created in) SECRET_KEY_FILE,
+        # so that every worker and every restart signs cookies with the same key.
+        'SECRET_KEY': environ.get('FLASK_SECRET_KEY'),
+        'SECRET_KEY_FILE': environ.get('SECRET_KEY_FILE'),
+        'PERMANENT_SESSION_LIFETIME': timedelta(hours=int(environ.get('SESSION_LIFETIME_HOURS', 12))),
+        'SESSION_BACKEND': environ.get('SESSION_BACKEND', 'cookie'),
+        'SESSION_SQLITE_PATH': environ.get('SESSION_SQLITE_PATH'),
+        'SESSION_GC_INTERVAL': int(environ.get('SESSION_GC_INTERVAL', 300)),
+
+        # Password hashing: concurrent hashes, and hashes admitted (running or queued) before logins get a 503
+        'LOGIN_HASH_WORKERS': int(environ.get('LOGIN_HASH_WORKERS', 2)),
+        'LOGIN_MAX_PENDING': int(environ.get('LOGIN_MAX_PENDING', 32)),
+
+        # Instrumentation: the Server-Timing header, and the bearer token /metrics requires
+        # (without one, /metrics is only served in development)
+        'SERVER_TIMING': _flag(environ, 'SERVER_TIMING', development),
+        'METRICS_TOKEN': environ.get('METRICS_TOKEN'),
+
+        # Import notifications
+        'EVENTS_POLL_INTERVAL': float(environ.get('EVENTS_POLL_INTERVAL', 2)),
+        'EVENTS_HEARTBEAT': float(environ.get('EVENTS_HEARTBEAT', 15)),
+    }
+
+
+def load_secret_key(path, logger=None):
+    """
+    Returns the secret key stored in path, creating it with a random key if it does not exist.
+    The file is created exclusively, so concurrently starting workers all end up with the key
+    written by the first one.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker may still be writing it
+        for _ in range(50):
+            with open(path, 'rb') as f:
+                key = f.read()
+            if key:
+                return key
+            time.sleep(0.1)
+        raise RuntimeError(f"Secret key file {path} is empty.")
+    key = os.urandom(32)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    (logger or logging.getLogger(__name__)).warning(f"Generated a new secret key in {path}; set FLASK_SECRET_KEY to manage it explicitly.")
+    return key
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available before the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of MySQL connections shared by all requests.
+
+    Keeps up to `size` idle connections and opens up to `max_overflow` extra ones under load,
+    which are closed again when returned. Connections are pinged on checkout and replaced
+    once they are older than `recycle` seconds, so stale sockets never reach a request.
+    """
+
+    def __init__(self, connect_args, size=5, max_overflow=5, timeout=10.0, recycle=3600, pre_ping=True,
+                 slow_checkout=0.1, logger=None):
+        self.connect_args = dict(connect_args)
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.slow_checkout = slow_checkout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._idle = deque()
+        self._created_at = {}
+        self._open = 0
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_pings": 0,
+        }
+
+    # --- Checkout / Return ---
+
+    def acquire(self):
+        """
+        Returns a healthy connection, waiting up to `timeout` seconds for one to be returned
+        when the pool and its overflow are fully in use. Raises PoolExhaustedError on timeout.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        must_create = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    must_create = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["exhausted"] += 1
+                    self.logger.error(f"Connection pool exhausted after {self.timeout}s wait. Stats: {self._snapshot()}")
+                    raise PoolExhaustedError("No database connection available.")
+                self._cond.wait(remaining)
+
+        try:
+            if must_create:
+                conn = self._create()
+            else:
+                conn = self._check(conn)
+        except mysql.connector.Error:
+            self._discard()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        if waited > self.slow_checkout:
+            self.logger.warning(f"Slow connection checkout: waited {waited * 1000:.1f} ms.")
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, closing it if the pool already holds `size` idle ones."""
+        try:
+            # Discard any uncommitted work and end the read snapshot of the previous request.
+            conn.rollback()
+        except mysql.connector.Error as err:
+            self.logger.warning(f"Dropping connection that failed to reset: {err}")
+            self._close(conn)
+            self._discard()
+            return
+
+        with self._cond:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+
+        self._close(conn)
+        self._discard()
+
+    def close_all(self):
+        """Closes every idle connection. Checked-out connections are closed when returned."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    # --- Statistics ---
+
+    def stats(self):
+        """Returns a snapshot of the pool counters, including checkout wait times and exhaustion events."""
+        with self._cond:
+            return self._snapshot()
+
+    def _snapshot(self):
+        snapshot = dict(self._stats)
+        snapshot["open"] = self._open
+        snapshot["idle"] = len(self._idle)
+        snapshot["in_use"] = self._open - len(self._idle)
+        snapshot["wait_time_avg"] = (
+            snapshot["wait_time_total"] / snapshot["checkouts"] if snapshot["checkouts"] else 0.0
+        )
+        return snapshot
+
+    # --- Internals ---
+
+    def _create(self):
+        conn = mysql.connector.connect(**self.connect_args)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        self.logger.debug("New pooled database connection established.")
+        return conn
+
+    def _check(self, conn):
+        """Replaces a connection that is past its recycle age or fails the health check."""
+        created_at = self._created_at.get(id(conn), 0.0)
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            self._close(conn)
+            return self._create()
+
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error as err:
+                with self._cond:
+                    self._stats["failed_pings"] += 1
+                self.logger.warning(f"Pooled connection failed health check, reconnecting: {err}")
+                self._close(conn)
+                return self._create()
+
+        return conn
+
+    def _close(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _discard(self):
+        """Gives back the slot of a connection that was closed or never opened."""
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
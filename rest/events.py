@@ -0,0 +1,141 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+from db_pool import PoolExhaustedError
+
+# Returned by Subscription.get when the subscription was dropped (e.g. its queue overflowed)
+CLOSED = object()
+
+
+class Subscription:
+    """A subscriber's queue of import events, filtered by `accept(event)`."""
+
+    def __init__(self, accept, maxsize=100):
+        self.accept = accept
+        self.closed = False
+        self._queue = queue.Queue(maxsize)
+
+    def get(self, timeout):
+        """Returns the next event, None if none arrived within timeout, or CLOSED."""
+        if self.closed:
+            return CLOSED
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return CLOSED if self.closed else None
+
+    def _offer(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A client this far behind is dropped at its next heartbeat; it reconnects
+            # with Last-Event-ID and catches up from the history
+            self.closed = True
+
+
+class ImportEventBroadcaster:
+    """
+    Fans the rows of the import_events change feed out to the subscribed clients.
+
+    A single background thread per process, started with the first subscription, polls
+    the table every `poll_interval` seconds, so the database load does not grow with
+    the number of open dashboards. The last `history` events are kept in memory
+    to replay them to clients that reconnect with a Last-Event-ID.
+    """
+
+    def __init__(self, pool, poll_interval=2.0, history=1000, logger=None):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._last_id = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, accept, last_event_id=None):
+        """
+        Registers a subscriber and returns its Subscription. Events newer than
+        last_event_id that are still in the history are queued immediately.
+        """
+        subscription = Subscription(accept)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event['id'] > last_event_id and accept(event):
+                        subscription._offer(event)
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='import-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    # --- Internals ---
+
+    def _run(self):
+        while True:
+            try:
+                if self._last_id is None:
+                    self._last_id = self._query_last_id()
+                else:
+                    self._publish(self._query_events(self._last_id))
+            except (mysql.connector.Error, PoolExhaustedError) as err:
+                self.logger.warning(f"Polling import events failed: {err}")
+            time.sleep(self.poll_interval)
+
+    def _publish(self, events):
+        if not events:
+            return
+        with self._lock:
+            for event in events:
+                self._history.append(event)
+                for subscription in list(self._subscribers):
+                    if subscription.accept(event):
+                        subscription._offer(event)
+            self._last_id = events[-1]['id']
+            subscribers = len(self._subscribers)
+        self.logger.debug(f"Published {len(events)} import events to {subscribers} subscribers.")
+
+    def _query_last_id(self):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM import_events")
+            last_id = cursor.fetchone()[0]
+            cursor.close()
+            return last_id
+        finally:
+            self.pool.release(conn)
+
+    def _query_events(self, after_id):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT e.id, e.practice_id, p.name AS practice, p.macrogroup_id, e.version,
+                       e.reading_count, e.first_timestamp, e.last_timestamp
+                FROM import_events e
+                JOIN practices p ON e.practice_id = p.id
+                WHERE e.id > %s
+                ORDER BY e.id
+                LIMIT 1000
+            """, (after_id,))
+            events = cursor.fetchall()
+            cursor.close()
+            return events
+        finally:
+            self.pool.release(conn)
@@ -0,0 +1,46 @@
+# Gunicorn settings for the REST server, run from rest/ with:
+#     gunicorn -c gunicorn.conf.py wsgi:app
+# Every setting can be overridden from the environment. Send SIGHUP to the master
+# process to reload code and configuration gracefully: new workers are started and
+# the old ones finish their requests (within graceful_timeout) before exiting.
+#
+# Each worker holds its own connection pool (up to DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW
+# connections), caches and /events poller, so size MySQL's max_connections and the
+# cache limits for workers times that.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# gthread workers serve `threads` requests at a time each. Every open /events stream
+# holds one of them, so deployments with many live dashboards should use gevent
+# (SERVER_WORKER=gevent), where idle streams cost a greenlet instead of a thread.
+# With gevent the server talks to MySQL through mysql.connector's pure-Python protocol,
+# since its C extension would block every greenlet of the worker during each query.
+if os.environ.get('SERVER_WORKER') == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Applications are built in each worker after the fork (see wsgi.py); preloading would
+# share the pool's sockets and the background threads' state between processes.
+preload_app = False
+
+# Worker heartbeat timeout; long streamed exports keep the worker alive and are not affected
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers after a number of requests to bound memory growth (0 disables it)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Behind a reverse proxy, trust its X-Forwarded-* headers
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
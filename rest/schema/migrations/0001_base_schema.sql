@@ -0,0 +1,65 @@
+-- Base tables of the sensor database, as used by the REST server (rest/app.py)
+-- and the importer (rest/script/otr.py). Readings are keyed by (sensor_id, timestamp),
+-- so a sensor's readings over a date range are one contiguous range of the primary key.
+-- sensor_readings has no foreign keys, which would prevent partitioning it by month
+-- (see rest/script/partitions.py).
+
+CREATE TABLE IF NOT EXISTS macrogroups (
+    id   INT          NOT NULL AUTO_INCREMENT,
+    name VARCHAR(255) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_macrogroups_name (name)
+);
+
+CREATE TABLE IF NOT EXISTS practices (
+    id            INT           NOT NULL AUTO_INCREMENT,
+    macrogroup_id INT           NOT NULL,
+    name          VARCHAR(255)  NOT NULL,
+    description   TEXT          NULL,
+    latitude      DECIMAL(9, 6) NOT NULL,
+    longitude     DECIMAL(9, 6) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_practices_name (name),
+    KEY idx_practices_macrogroup (macrogroup_id),
+    CONSTRAINT fk_practices_macrogroup FOREIGN KEY (macrogroup_id) REFERENCES macrogroups (id)
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id            INT          NOT NULL AUTO_INCREMENT,
+    username      VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_users_username (username)
+);
+
+CREATE TABLE IF NOT EXISTS user_macrogroup_permissions (
+    user_id       INT NOT NULL,
+    macrogroup_id INT NOT NULL,
+    PRIMARY KEY (user_id, macrogroup_id),
+    CONSTRAINT fk_ump_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+    CONSTRAINT fk_ump_macrogroup FOREIGN KEY (macrogroup_id) REFERENCES macrogroups (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_practice_permissions (
+    user_id     INT NOT NULL,
+    practice_id INT NOT NULL,
+    PRIMARY KEY (user_id, practice_id),
+    CONSTRAINT fk_upp_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+    CONSTRAINT fk_upp_practice FOREIGN KEY (practice_id) REFERENCES practices (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS sensors (
+    id          INT         NOT NULL AUTO_INCREMENT,
+    practice_id INT         NOT NULL,
+    name        VARCHAR(64) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_sensors_practice_name (practice_id, name),
+    CONSTRAINT fk_sensors_practice FOREIGN KEY (practice_id) REFERENCES practices (id)
+);
+
+CREATE TABLE IF NOT EXISTS sensor_readings (
+    sensor_id INT      NOT NULL,
+    timestamp DATETIME NOT NULL,
+    value     DOUBLE   NOT NULL,
+    PRIMARY KEY (sensor_id, timestamp)
+);
@@ -0,0 +1,58 @@
+"""
+Brings databases created before the migrations existed to the layout of 0001:
+sensor_readings keyed by (sensor_id, timestamp) and an index on sensors(practice_id, name).
+Databases created by 0001 already match, so this migration changes nothing on them.
+
+Rebuilding sensor_readings copies every reading (duplicates collapse to the last value)
+into a new table and swaps it in; the previous table is kept as sensor_readings_old
+until it is dropped by hand.
+"""
+import logging
+
+
+def _primary_key_columns(cursor, table):
+    cursor.execute("""
+        SELECT column_name FROM information_schema.key_column_usage
+        WHERE table_schema = DATABASE() AND table_name = %s AND constraint_name = 'PRIMARY'
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0].lower() for row in cursor.fetchall()]
+
+
+def _has_index_prefix(cursor, table, columns):
+    """True if some index of table starts with the given columns, in order."""
+    cursor.execute("""
+        SELECT index_name, column_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name.lower())
+    return any(index_columns[:len(columns)] == columns for index_columns in indexes.values())
+
+
+def upgrade(cursor):
+    if _primary_key_columns(cursor, 'sensor_readings') != ['sensor_id', 'timestamp']:
+        logging.info("Rebuilding sensor_readings with a (sensor_id, timestamp) primary key...")
+        cursor.execute("DROP TABLE IF EXISTS sensor_readings_rebuild")
+        cursor.execute("""
+            CREATE TABLE sensor_readings_rebuild (
+                sensor_id INT      NOT NULL,
+                timestamp DATETIME NOT NULL,
+                value     DOUBLE   NOT NULL,
+                PRIMARY KEY (sensor_id, timestamp)
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO sensor_readings_rebuild (sensor_id, timestamp, value)
+            SELECT sensor_id, timestamp, value FROM sensor_readings
+            ORDER BY sensor_id, timestamp
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+        """)
+        cursor.execute("RENAME TABLE sensor_readings TO sensor_readings_old, sensor_readings_rebuild TO sensor_readings")
+        logging.info("sensor_readings rebuilt. Drop sensor_readings_old once the data has been checked.")
+
+    if not _has_index_prefix(cursor, 'sensors', ['practice_id', 'name']):
+        logging.info("Adding index sensors(practice_id, name)...")
+        cursor.execute("CREATE INDEX idx_sensors_practice_name ON sensors (practice_id, name)")
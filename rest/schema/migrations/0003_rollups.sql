@@ -0,0 +1,23 @@
+-- Pre-aggregated rollups of sensor_readings, one row per sensor and bucket.
+-- Maintained by the importer (rest/script/otr.py) and rebuilt by
+-- rest/script/backfill_rollups.py. The REST server reads them for long ranges.
+
+CREATE TABLE IF NOT EXISTS sensor_readings_hourly (
+    sensor_id     INT      NOT NULL,
+    bucket_start  DATETIME NOT NULL,
+    min_value     DOUBLE   NOT NULL,
+    max_value     DOUBLE   NOT NULL,
+    avg_value     DOUBLE   NOT NULL,
+    reading_count INT      NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS sensor_readings_daily (
+    sensor_id     INT      NOT NULL,
+    bucket_start  DATETIME NOT NULL,
+    min_value     DOUBLE   NOT NULL,
+    max_value     DOUBLE   NOT NULL,
+    avg_value     DOUBLE   NOT NULL,
+    reading_count INT      NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start)
+);
@@ -0,0 +1,14 @@
+-- Idempotent imports rely on readings being unique per (sensor_id, timestamp), which
+-- the primary key of sensor_readings guarantees (see 0001 and 0002): a file that is
+-- imported again (or a retried batch) updates rows instead of duplicating them.
+
+-- Manifest of imported datalogger files, keyed by the SHA-256 of their content.
+-- Written by rest/script/otr.py in the same transaction as the readings.
+CREATE TABLE IF NOT EXISTS imported_files (
+    content_hash  CHAR(64)     NOT NULL,
+    filename      VARCHAR(512) NOT NULL,
+    practice_id   INT          NOT NULL,
+    reading_count INT          NOT NULL,
+    imported_at   DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash)
+);
@@ -0,0 +1,10 @@
+-- Per-practice data version, bumped by the importer (rest/script/otr.py) in the
+-- same transaction as the readings it writes. The REST server derives the ETag
+-- and Last-Modified headers of /get_data and /get_latest_data from it.
+
+CREATE TABLE IF NOT EXISTS practice_data_versions (
+    practice_id INT             NOT NULL,
+    version     BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at  DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (practice_id)
+);
@@ -0,0 +1,15 @@
+-- Change feed written by the importer (rest/script/otr.py) in the same transaction
+-- as the readings it imports. Each REST server process polls it once per interval
+-- and pushes new rows to the dashboards subscribed to /events.
+
+CREATE TABLE IF NOT EXISTS import_events (
+    id              BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    practice_id     INT             NOT NULL,
+    version         BIGINT UNSIGNED NOT NULL,
+    reading_count   INT             NOT NULL,
+    first_timestamp DATETIME        NOT NULL,
+    last_timestamp  DATETIME        NOT NULL,
+    created_at      DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    KEY idx_import_events_created_at (created_at)
+);
@@ -0,0 +1,13 @@
+-- Compressed storage for old raw readings: one row per sensor and day whose readings
+-- were moved out of sensor_readings by rest/script/compact_readings.py. payload is the
+-- blob built by rest/chunkstore.py. The REST server reads it together with sensor_readings,
+-- so compacted days look the same to clients.
+
+CREATE TABLE IF NOT EXISTS sensor_day_chunks (
+    sensor_id    INT        NOT NULL,
+    day          DATE       NOT NULL,
+    point_count  INT        NOT NULL,
+    payload      MEDIUMBLOB NOT NULL,
+    compacted_at DATETIME   NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sensor_id, day)
+);
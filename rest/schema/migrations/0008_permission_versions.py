@@ -0,0 +1,37 @@
+"""
+A single permission version, incremented by triggers on every change to
+user_macrogroup_permissions and user_practice_permissions. The REST server caches each
+user's permissions with the version they were read at and reloads them once it moves.
+
+With binary logging enabled, creating triggers requires the SUPER privilege or
+log_bin_trust_function_creators = 1.
+"""
+import logging
+
+PERMISSION_TABLES = ('user_macrogroup_permissions', 'user_practice_permissions')
+EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS permission_versions (
+            id         TINYINT         NOT NULL,
+            version    BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            updated_at DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id)
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO permission_versions (id, version) VALUES (1, 0)")
+
+    cursor.execute("SELECT trigger_name FROM information_schema.triggers WHERE trigger_schema = DATABASE()")
+    existing = {row[0].lower() for row in cursor.fetchall()}
+    for table in PERMISSION_TABLES:
+        for event in EVENTS:
+            name = f"trg_{table}_{event.lower()}"
+            if name in existing:
+                continue
+            logging.info(f"Creating trigger {name}...")
+            cursor.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW
+                UPDATE permission_versions SET version = version + 1, updated_at = NOW() WHERE id = 1
+            """)
@@ -0,0 +1,83 @@
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+from otr import bump_data_version, get_db_connection, refresh_rollups
+
+# Readings are re-aggregated in windows of this size, one transaction per window,
+# to keep lock times and undo logs small on large tables.
+BACKFILL_WINDOW = timedelta(days=31)
+
+
+def get_sensor_spans(cursor, practice_name=None):
+    """
+    Returns a list of (sensor_id, practice_id, first_timestamp, last_timestamp) for every sensor
+    that has readings, optionally restricted to a single practice.
+    """
+    query = """
+        SELECT sr.sensor_id, s.practice_id, MIN(sr.timestamp), MAX(sr.timestamp)
+        FROM sensor_readings sr
+        JOIN sensors s ON sr.sensor_id = s.id
+    """
+    params = ()
+    if practice_name:
+        query += " JOIN practices p ON s.practice_id = p.id WHERE p.name = %s"
+        params = (practice_name,)
+    query += " GROUP BY sr.sensor_id, s.practice_id"
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def backfill_rollups(practice_name=None, start_dt=None, end_dt=None):
+    """Rebuilds the hourly and daily rollups from the existing raw readings."""
+    conn = get_db_connection()
+    if not conn:
+        return
+
+    try:
+        cursor = conn.cursor()
+        spans = get_sensor_spans(cursor, practice_name)
+        logging.info(f"Backfilling rollups for {len(spans)} sensors.")
+
+        for sensor_id, practice_id, first_dt, last_dt in spans:
+            window_start = max(first_dt, start_dt) if start_dt else first_dt
+            window_end = min(last_dt, end_dt) if end_dt else last_dt
+
+            while window_start <= window_end:
+                window_stop = min(window_start + BACKFILL_WINDOW, window_end)
+                refresh_rollups(cursor, [sensor_id], window_start, window_stop)
+                conn.commit()
+                window_start = window_stop + timedelta(seconds=1)
+
+            logging.info(f"Rollups rebuilt for sensor ID {sensor_id} ({first_dt} - {last_dt}).")
+
+        # Rollup-based responses may have changed: invalidate their ETags
+        bump_data_version(cursor, [span[1] for span in spans])
+        conn.commit()
+
+        logging.info("Rollup backfill completed successfully.")
+    except Error as e:
+        logging.error(f"A database error occurred during the backfill: {e}")
+        conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+            logging.info("Database connection closed.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the hourly and daily rollup tables from existing sensor readings.")
+    parser.add_argument("--practice", type=str, help="Only backfill the sensors of this practice.")
+    parser.add_argument("--start-date", type=str, help="Only backfill readings from this date (YYYY-MM-DD).")
+    parser.add_argument("--end-date", type=str, help="Only backfill readings up to this date (YYYY-MM-DD).")
+
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start_date, '%Y-%m-%d') if args.start_date else None
+    end = datetime.strptime(args.end_date, '%Y-%m-%d') + timedelta(days=1) - timedelta(seconds=1) if args.end_date else None
+
+    backfill_rollups(args.practice, start, end)
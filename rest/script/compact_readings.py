@@ -0,0 +1,157 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+from otr import bump_data_version, get_db_connection, rewrite_rollups
+
+# The chunk format is shared with the REST server, which lives one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chunkstore import ENCODINGS, decode_chunk, encode_chunk, split_days  # noqa: E402
+
+# Raw readings older than this many days are moved from sensor_readings into
+# sensor_day_chunks, one compressed blob per sensor and day. Each sensor is compacted
+# in windows of COMPACTION_WINDOW, one transaction per window, so that locks and undo
+# logs stay small; the REST server reads the chunks of every raw read of past days.
+DEFAULT_AGE_DAYS = int(os.environ.get('CHUNK_STORAGE_AGE_DAYS', 90))
+COMPACTION_WINDOW = timedelta(days=31)
+
+
+def get_sensors(cursor, practice_name=None):
+    """Returns [(sensor_id, practice_id, oldest_timestamp), ...] for every sensor that has readings."""
+    query = """
+        SELECT s.id, s.practice_id, (SELECT MIN(sr.timestamp) FROM sensor_readings sr WHERE sr.sensor_id = s.id)
+        FROM sensors s
+    """
+    params = ()
+    if practice_name:
+        query += " JOIN practices p ON s.practice_id = p.id WHERE p.name = %s"
+        params = (practice_name,)
+    query += " ORDER BY s.id"
+
+    cursor.execute(query, params)
+    return [row for row in cursor.fetchall() if row[2] is not None]
+
+
+def compact_window(cursor, sensor_id, window_start, window_end, encoding):
+    """
+    Moves the readings of a sensor in [window_start, window_end) (whole days) into chunks.
+    Readings of days that already have a chunk are merged into it, the readings winning on equal
+    timestamps, and those days' rollups are rebuilt.
+    Returns a tuple (readings moved, chunk bytes written, days merged into existing chunks).
+    """
+    # FOR UPDATE locks the range, so an import cannot add readings between the read and the delete
+    cursor.execute("""
+        SELECT timestamp, value FROM sensor_readings
+        WHERE sensor_id = %s AND timestamp >= %s AND timestamp < %s
+        ORDER BY timestamp
+        FOR UPDATE
+    """, (sensor_id, window_start, window_end))
+    readings = cursor.fetchall()
+    if not readings:
+        return 0, 0, 0
+
+    cursor.execute("""
+        SELECT day, payload FROM sensor_day_chunks
+        WHERE sensor_id = %s AND day >= %s AND day < %s
+        FOR UPDATE
+    """, (sensor_id, window_start.date(), window_end.date()))
+    existing = {datetime.combine(day, datetime.min.time()): payload for day, payload in cursor.fetchall()}
+
+    chunk_rows = []
+    merged_days = []
+    for day, points in split_days(readings).items():
+        if day in existing:
+            timestamps, values = decode_chunk(day, existing[day])
+            combined = dict(zip(timestamps, values))
+            combined.update(points)
+            points = sorted(combined.items())
+            merged_days.append((day, points))
+        chunk_rows.append((sensor_id, day.date(), len(points), encode_chunk(day, points, encoding)))
+
+    cursor.executemany("""
+        INSERT INTO sensor_day_chunks (sensor_id, day, point_count, payload)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            point_count = VALUES(point_count),
+            payload = VALUES(payload),
+            compacted_at = CURRENT_TIMESTAMP
+    """, chunk_rows)
+    cursor.execute("DELETE FROM sensor_readings WHERE sensor_id = %s AND timestamp >= %s AND timestamp < %s",
+                   (sensor_id, window_start, window_end))
+    if merged_days:
+        rewrite_rollups(cursor, sensor_id, merged_days)
+
+    return len(readings), sum(len(row[3]) for row in chunk_rows), len(merged_days)
+
+
+def compact_readings(age_days=DEFAULT_AGE_DAYS, practice_name=None, encoding='xor', dry_run=False):
+    """Compacts the readings of the days that ended more than age_days ago."""
+    conn = get_db_connection()
+    if not conn:
+        return
+
+    cutoff = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=age_days)
+    try:
+        cursor = conn.cursor()
+        sensors = [sensor for sensor in get_sensors(cursor, practice_name) if sensor[2] < cutoff]
+        logging.info(f"Compacting readings before {cutoff:%Y-%m-%d} of {len(sensors)} sensors ({encoding} values).")
+
+        total_readings = total_bytes = 0
+        changed_practices = set()
+        for sensor_id, practice_id, oldest in sensors:
+            window_start = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+            sensor_readings = sensor_bytes = 0
+            while window_start < cutoff:
+                window_end = min(window_start + COMPACTION_WINDOW, cutoff)
+                moved, written, merged = compact_window(cursor, sensor_id, window_start, window_end, encoding)
+                if dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                sensor_readings += moved
+                sensor_bytes += written
+                # float32 chunks read back slightly different values, and merged days have new rollups
+                if merged or (moved and encoding == 'float32'):
+                    changed_practices.add(practice_id)
+                window_start = window_end
+
+            total_readings += sensor_readings
+            total_bytes += sensor_bytes
+            logging.info(f"Sensor ID {sensor_id}: {sensor_readings} readings into {sensor_bytes} bytes of chunks.")
+
+        # Invalidate the responses built from the data that changed
+        if changed_practices and not dry_run:
+            bump_data_version(cursor, changed_practices)
+            conn.commit()
+
+        per_reading = total_bytes / total_readings if total_readings else 0
+        logging.info(f"{'Dry run: would compact' if dry_run else 'Compacted'} {total_readings} readings "
+                     f"into {total_bytes} bytes ({per_reading:.2f} bytes per reading).")
+    except Error as e:
+        logging.error(f"A database error occurred during the compaction: {e}")
+        conn.rollback()
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+            logging.info("Database connection closed.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Move old raw readings into compressed per-sensor, per-day chunks.")
+    parser.add_argument("--older-than", type=int, default=DEFAULT_AGE_DAYS,
+                        help="Compact the days that ended more than this many days ago (default: CHUNK_STORAGE_AGE_DAYS or 90).")
+    parser.add_argument("--practice", type=str, help="Only compact the sensors of this practice.")
+    parser.add_argument("--encoding", choices=list(ENCODINGS), default='xor',
+                        help="xor keeps the values exactly; float32 is smaller but keeps about 7 significant digits.")
+    parser.add_argument("--dry-run", action="store_true", help="Compact and report the sizes, then roll everything back.")
+
+    args = parser.parse_args()
+    if args.older_than < 1:
+        parser.error("--older-than must be at least 1 day: today's readings are never compacted.")
+
+    compact_readings(args.older_than, args.practice, args.encoding, args.dry_run)
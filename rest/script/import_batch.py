@@ -0,0 +1,215 @@
+import argparse
+import fnmatch
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from otr import (
+    DEFAULT_BATCH_SIZE,
+    ImportTimer,
+    file_content_hash,
+    get_imported_hashes,
+    insert_data_into_db,
+    parse_datalogger_columns,
+)
+
+
+def load_practice_mapping(mapping_path):
+    """
+    Loads the file-to-practice mapping: a JSON object whose keys are filename patterns
+    (shell-style, matched against the file's base name) and whose values are practice names.
+    Patterns are tried in file order and the first match wins.
+    """
+    with open(mapping_path, 'r') as f:
+        mapping = json.load(f)
+    if not isinstance(mapping, dict):
+        raise ValueError("The practice mapping must be a JSON object of {pattern: practice_name}.")
+    return list(mapping.items())
+
+
+def match_practice(filepath, mapping):
+    """Returns the practice name for a file, or None if no pattern matches."""
+    filename = os.path.basename(filepath)
+    for pattern, practice_name in mapping:
+        if fnmatch.fnmatch(filename, pattern):
+            return practice_name
+    return None
+
+
+def collect_files(source, recursive=False):
+    """Expands a directory (all .TXT files in it) or a glob pattern into a sorted list of file paths."""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '**', '*') if recursive else os.path.join(source, '*')
+        candidates = glob.glob(pattern, recursive=recursive)
+        return sorted(p for p in candidates if os.path.isfile(p) and p.lower().endswith('.txt'))
+    return sorted(p for p in glob.glob(source, recursive=recursive) if os.path.isfile(p))
+
+
+def _hash_job(filepath):
+    """Worker: returns (filepath, content_hash), with content_hash None if the file cannot be read."""
+    try:
+        return filepath, file_content_hash(filepath)
+    except OSError as e:
+        logging.error(f"Could not read {filepath}: {e}")
+        return filepath, None
+
+
+def _parse_job(filepath):
+    """Worker: returns (filepath, parsed_data, parse_seconds)."""
+    started = time.perf_counter()
+    parsed_data = parse_datalogger_columns(filepath)
+    return filepath, parsed_data, time.perf_counter() - started
+
+
+def import_directory(source, mapping, parse_workers=None, db_writers=2, batch_size=DEFAULT_BATCH_SIZE,
+                     use_load_data=False, retries=2, retry_delay=1.0, recursive=False, force=False):
+    """
+    Imports every datalogger file matched by source. Files are hashed and parsed in a process pool;
+    at most db_writers files are written to the database concurrently. Files already listed in the
+    import manifest are skipped unless force is set. A failed file is retried up to `retries` times,
+    waiting retry_delay seconds before the first retry and twice as long before each following one.
+    Returns a summary dictionary with the number of imported, skipped and failed files.
+    """
+    summary = {"imported": 0, "skipped": 0, "unmapped": 0, "failed": 0}
+
+    # 1. Map each file to its practice
+    jobs = {}
+    for filepath in collect_files(source, recursive):
+        practice_name = match_practice(filepath, mapping)
+        if practice_name is None:
+            logging.warning(f"No practice mapping for {filepath}. Skipping.")
+            summary["unmapped"] += 1
+            continue
+        jobs[filepath] = practice_name
+    logging.info(f"Found {len(jobs)} files to consider in {source}.")
+
+    if not jobs:
+        return summary
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=db_writers) as write_pool:
+
+        # 2. Hash all files and drop the ones already in the manifest
+        hashes = {}
+        for filepath, content_hash in parse_pool.map(_hash_job, jobs, chunksize=16):
+            if content_hash is None:
+                # Unreadable, or gone since it was listed: the other files are still imported
+                summary["failed"] += 1
+                continue
+            hashes[filepath] = content_hash
+        imported_hashes = set() if force else get_imported_hashes(hashes.values())
+        if imported_hashes is None:
+            logging.error("Cannot reach the database to read the import manifest. Aborting.")
+            summary["failed"] = len(jobs)
+            return summary
+
+        pending = []
+        seen_hashes = set()
+        for filepath, content_hash in hashes.items():
+            if content_hash in imported_hashes or content_hash in seen_hashes:
+                logging.info(f"Skipping {filepath}: already imported.")
+                summary["skipped"] += 1
+                continue
+            seen_hashes.add(content_hash)
+            pending.append(filepath)
+
+        # 3. Parse in the process pool and hand parsed files to the writers. The semaphore
+        # bounds the number of parsed files held in memory while waiting for a writer.
+        in_flight = threading.BoundedSemaphore(max(1, db_writers) * 2)
+        summary_lock = threading.Lock()
+
+        def write_job(filepath, parsed_data, parse_seconds):
+            try:
+                practice_name = jobs[filepath]
+                for attempt in range(1, retries + 2):
+                    timer = ImportTimer()
+                    timer.add('parse', parse_seconds)
+                    if insert_data_into_db(parsed_data, practice_name, batch_size=batch_size,
+                                           use_load_data=use_load_data,
+                                           source_file=(filepath, hashes[filepath]), timer=timer):
+                        with summary_lock:
+                            summary["imported"] += 1
+                        return
+                    if attempt > retries:
+                        logging.warning(f"Import of {filepath} failed (attempt {attempt}/{retries + 1}).")
+                        break
+                    # Back off, so that a database restarting or failing over is not hammered
+                    delay = retry_delay * 2 ** (attempt - 1)
+                    logging.warning(f"Import of {filepath} failed (attempt {attempt}/{retries + 1}); retrying in {delay:.1f}s.")
+                    time.sleep(delay)
+                with summary_lock:
+                    summary["failed"] += 1
+            finally:
+                in_flight.release()
+
+        write_futures = []
+
+        def on_parsed(parse_future):
+            write_futures.append(_dispatch(parse_future, write_pool, write_job, in_flight, summary, summary_lock))
+
+        for filepath in pending:
+            in_flight.acquire()
+            parse_pool.submit(_parse_job, filepath).add_done_callback(on_parsed)
+
+        # Wait for the parsers (and their callbacks) before the writer pool is shut down
+        parse_pool.shutdown(wait=True)
+        for future in write_futures:
+            if future is not None:
+                future.result()
+
+    logging.info(f"Batch import finished: {summary}")
+    return summary
+
+
+def _dispatch(parse_future, write_pool, write_job, in_flight, summary, summary_lock):
+    """Submits a parsed file to the writer pool, or records it as failed if parsing failed."""
+    try:
+        filepath, parsed_data, parse_seconds = parse_future.result()
+    except Exception as e:
+        logging.error(f"Parsing failed: {e}")
+        parsed_data = None
+        filepath = None
+
+    if not parsed_data:
+        if filepath:
+            logging.error(f"Could not parse {filepath}. Skipping.")
+        with summary_lock:
+            summary["failed"] += 1
+        in_flight.release()
+        return None
+    return write_pool.submit(write_job, filepath, parsed_data, parse_seconds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import a directory (or glob) of datalogger files into the sensor database.")
+    parser.add_argument("source", type=str, help="A directory containing datalogger TXT files, or a glob pattern such as 'data/**/*.TXT'.")
+    parser.add_argument("mapping", type=str, help="JSON file mapping filename patterns to practice names, e.g. {\"stazione1_*.TXT\": \"Sonda-LU-01\"}.")
+    parser.add_argument("--recursive", action="store_true", help="Descend into subdirectories (and allow '**' in glob patterns).")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Number of parser processes (default: number of CPUs).")
+    parser.add_argument("--db-writers", type=int, default=2, help="Maximum number of files written to the database concurrently.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Number of readings per multi-row INSERT statement.")
+    parser.add_argument("--load-data", action="store_true", help="Write readings with LOAD DATA LOCAL INFILE instead of batched INSERTs.")
+    parser.add_argument("--retries", type=int, default=2, help="How many times a failed file import is retried.")
+    parser.add_argument("--retry-delay", type=float, default=1.0,
+                        help="Seconds to wait before the first retry, doubled before each following one.")
+    parser.add_argument("--force", action="store_true", help="Import files even if the manifest says they were already imported.")
+
+    args = parser.parse_args()
+
+    result = import_directory(
+        args.source,
+        load_practice_mapping(args.mapping),
+        parse_workers=args.parse_workers,
+        db_writers=args.db_writers,
+        batch_size=args.batch_size,
+        use_load_data=args.load_data,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        recursive=args.recursive,
+        force=args.force
+    )
+    raise SystemExit(1 if result["failed"] else 0)
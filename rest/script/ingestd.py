@@ -0,0 +1,356 @@
+import argparse
+import logging
+import os
+import queue
+import shutil
+import signal
+import threading
+import time
+
+from import_batch import load_practice_mapping, match_practice
+from otr import (
+    DEFAULT_BATCH_SIZE,
+    IMPORT_METRICS_DIR,
+    ImportTimer,
+    file_content_hash,
+    get_imported_hashes,
+    insert_data_into_db,
+    parse_datalogger_columns,
+    write_metrics_file,
+)
+
+# inotify is optional: without the inotify_simple package (or off Linux) the
+# directories are polled instead
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# Seconds between attempts to move pending files into a full queue
+DISPATCH_INTERVAL = 0.5
+
+
+class IngestService:
+    """
+    Watches drop directories and imports every datalogger file that lands in them.
+
+    A watcher thread discovers files, through inotify (IN_CLOSE_WRITE/IN_MOVED_TO) or by
+    polling, and keeps them in a pending list; it moves them into a bounded queue only as
+    fast as the workers drain it, so a burst of files waits on disk instead of piling up in
+    memory or overloading the database. Workers parse and import one file at a time. While
+    the database is unreachable they back off exponentially and retry indefinitely; a file
+    whose import keeps failing with the database up is given up after max_attempts.
+    Imported files are recorded in the import manifest, so restarts never import twice.
+    """
+
+    def __init__(self, directories, mapping, workers=2, queue_size=16, poll_interval=5.0, settle=5.0,
+                 rescan_interval=300.0, max_attempts=3, backoff_max=60.0, batch_size=DEFAULT_BATCH_SIZE,
+                 use_load_data=False, archive_dir=None, failed_dir=None, use_inotify=True):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.mapping = mapping
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.rescan_interval = rescan_interval
+        self.max_attempts = max_attempts
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.use_load_data = use_load_data
+        self.archive_dir = archive_dir
+        self.failed_dir = failed_dir
+        self.use_inotify = use_inotify and INotify is not None
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self._known = {}    # path -> (size, mtime) of files already handed to the workers
+        self._pending = {}  # path -> discovery time, waiting for room in the queue
+        self._waiting = {}  # path -> discovery time, for every file not yet finished
+        self._in_flight = 0
+        self.counts = {"imported": 0, "skipped": 0, "unmapped": 0, "failed": 0}
+        self.last_lag = None
+        self.db_available = True
+
+    # --- Lifecycle ---
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._watch, name="ingest-watcher", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"Watching {', '.join(self.directories)} with {'inotify' if self.use_inotify else 'polling'}, "
+                     f"{self.workers} workers.")
+
+    def stop(self, timeout=None):
+        """Stops discovering files and waits for the workers to finish the file they are importing."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        """Returns a snapshot of the queue depth, the lag of the oldest unfinished file and the counters."""
+        now = time.time()
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "oldest_waiting_s": now - min(self._waiting.values()) if self._waiting else 0.0,
+                "last_lag_s": self.last_lag,
+                "db_available": self.db_available,
+                **self.counts,
+            }
+
+    # --- Discovery ---
+
+    def _watch(self):
+        inotify = self._open_inotify() if self.use_inotify else None
+        next_scan = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_scan:
+                    self._scan()
+                    next_scan = time.monotonic() + (self.rescan_interval if inotify else self.poll_interval)
+
+                # Wake up sooner while files are waiting for room in the queue
+                timeout = min(self.poll_interval, DISPATCH_INTERVAL) if self._pending else self.poll_interval
+                if inotify:
+                    for event in inotify.read(timeout=int(timeout * 1000)):
+                        if event.mask & flags.Q_OVERFLOW:
+                            logging.warning("inotify queue overflow; rescanning the directories.")
+                            next_scan = 0.0
+                        elif event.name:
+                            self._discover(os.path.join(self._watch_dirs[event.wd], event.name), settled=True)
+                else:
+                    self._stop.wait(min(timeout, max(0.0, next_scan - time.monotonic())))
+                self._dispatch()
+        finally:
+            if inotify:
+                inotify.close()
+
+    def _open_inotify(self):
+        inotify = INotify()
+        self._watch_dirs = {
+            inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO): directory
+            for directory in self.directories
+        }
+        return inotify
+
+    def _scan(self):
+        """Discovers the files already present, and forgets those that were moved away."""
+        present = set()
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                logging.error(f"Cannot read {directory}: {e}")
+                continue
+            for entry in entries:
+                present.add(entry.path)
+                self._discover(entry.path)
+        with self._lock:
+            for path in [path for path in self._known if path not in present and path not in self._waiting]:
+                del self._known[path]
+
+    def _discover(self, path, settled=False):
+        """
+        Adds a datalogger file to the pending list, unless it was already handed to the workers
+        with the same size and modification time. A polled file must also be unmodified for
+        `settle` seconds, so a file still being copied is not read half-written.
+        """
+        if not path.lower().endswith('.txt'):
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if not settled and time.time() - stat.st_mtime < self.settle:
+            return
+        signature = (stat.st_size, stat.st_mtime)
+        with self._lock:
+            if self._known.get(path) == signature or path in self._waiting:
+                return
+            self._known[path] = signature
+            self._pending[path] = self._waiting[path] = time.time()
+
+    def _dispatch(self):
+        """Moves pending files into the work queue while it has room."""
+        with self._lock:
+            while self._pending:
+                path = next(iter(self._pending))
+                try:
+                    self._queue.put_nowait(path)
+                except queue.Full:
+                    break
+                del self._pending[path]
+
+    # --- Import ---
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._in_flight += 1
+            try:
+                outcome = self._ingest(path)
+            except Exception:
+                logging.exception(f"Unexpected error importing {path}.")
+                outcome = "failed"
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+            self._finish(path, outcome)
+
+    def _ingest(self, path):
+        """Imports one file and returns its outcome: 'imported', 'skipped', 'unmapped', 'failed' or None if stopped."""
+        practice_name = match_practice(path, self.mapping)
+        if practice_name is None:
+            logging.warning(f"No practice mapping for {path}. Skipping.")
+            return "unmapped"
+
+        try:
+            content_hash = file_content_hash(path)
+        except FileNotFoundError:
+            return None  # Moved away before its turn
+
+        parsed_data = None
+        attempts = 0
+        delay = 1.0
+        while not self._stop.is_set():
+            imported_hashes = get_imported_hashes([content_hash])
+            self.db_available = imported_hashes is not None
+            if imported_hashes is not None:
+                if content_hash in imported_hashes:
+                    logging.info(f"Skipping {path}: already imported.")
+                    return "skipped"
+
+                # Parsed once, after the manifest check, so restarts do not re-parse imported files
+                if parsed_data is None:
+                    parse_started = time.perf_counter()
+                    parsed_data = parse_datalogger_columns(path)
+                    parse_seconds = time.perf_counter() - parse_started
+                    if not parsed_data:
+                        logging.error(f"Could not parse {path}.")
+                        return "failed"
+
+                timer = ImportTimer()
+                timer.add('parse', parse_seconds)
+                if insert_data_into_db(parsed_data, practice_name, batch_size=self.batch_size,
+                                       use_load_data=self.use_load_data,
+                                       source_file=(path, content_hash), timer=timer):
+                    return "imported"
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    return "failed"
+                logging.warning(f"Import of {path} failed (attempt {attempts}/{self.max_attempts}); retrying in {delay:.0f}s.")
+            else:
+                logging.warning(f"Database unavailable; retrying {path} in {delay:.0f}s.")
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.backoff_max)
+        return None
+
+    def _finish(self, path, outcome):
+        with self._lock:
+            discovered = self._waiting.pop(path, None)
+            if outcome is None:
+                # Interrupted: forget the file so it is picked up again on the next start or scan
+                self._known.pop(path, None)
+                return
+            self.counts[outcome] += 1
+            if outcome == "imported" and discovered is not None:
+                self.last_lag = time.time() - discovered
+
+        target = self.archive_dir if outcome in ("imported", "skipped") else self.failed_dir if outcome == "failed" else None
+        if target:
+            try:
+                os.makedirs(target, exist_ok=True)
+                shutil.move(path, os.path.join(target, os.path.basename(path)))
+            except OSError as e:
+                logging.error(f"Could not move {path} to {target}: {e}")
+
+    # --- Reporting ---
+
+    def report(self):
+        """Logs the current queue depth and lag and, if IMPORT_METRICS_DIR is set, writes them as Prometheus metrics."""
+        stats = self.stats()
+        last_lag = f"{stats['last_lag_s']:.1f}s" if stats['last_lag_s'] is not None else "n/a"
+        logging.info(f"Ingest: {stats['pending']} pending, {stats['queued']} queued, {stats['in_flight']} in flight, "
+                     f"oldest waiting {stats['oldest_waiting_s']:.1f}s, last lag {last_lag}; "
+                     f"{stats['imported']} imported, {stats['skipped']} skipped, {stats['failed']} failed, "
+                     f"{stats['unmapped']} unmapped{'' if stats['db_available'] else '; database unavailable'}.")
+
+        if not IMPORT_METRICS_DIR:
+            return
+        lines = [
+            "# HELP sonde_ingest_queue_depth Files waiting to be imported, by stage.",
+            "# TYPE sonde_ingest_queue_depth gauge",
+            *(f'sonde_ingest_queue_depth{{stage="{stage}"}} {stats[stage]}' for stage in ("pending", "queued", "in_flight")),
+            "# HELP sonde_ingest_oldest_waiting_seconds Time since the oldest unfinished file was discovered.",
+            "# TYPE sonde_ingest_oldest_waiting_seconds gauge",
+            f"sonde_ingest_oldest_waiting_seconds {stats['oldest_waiting_s']:.3f}",
+            "# HELP sonde_ingest_lag_seconds Time from discovery to commit of the last imported file.",
+            "# TYPE sonde_ingest_lag_seconds gauge",
+            f"sonde_ingest_lag_seconds {stats['last_lag_s'] or 0:.3f}",
+            "# HELP sonde_ingest_files_total Files handled since the service started, by outcome.",
+            "# TYPE sonde_ingest_files_total counter",
+            *(f'sonde_ingest_files_total{{outcome="{outcome}"}} {stats[outcome]}' for outcome in self.counts),
+            "# HELP sonde_ingest_db_available Whether the last database check succeeded.",
+            "# TYPE sonde_ingest_db_available gauge",
+            f"sonde_ingest_db_available {int(stats['db_available'])}",
+        ]
+        write_metrics_file("sonde_ingest.prom", lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Watch drop directories and import new datalogger files as they arrive.")
+    parser.add_argument("mapping", type=str, help="JSON file mapping filename patterns to practice names (as for import_batch.py).")
+    parser.add_argument("directories", nargs="+", help="Directories to watch.")
+    parser.add_argument("--workers", type=int, default=2, help="Files imported concurrently.")
+    parser.add_argument("--queue-size", type=int, default=16, help="Files queued for the workers; the rest wait on disk.")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between directory scans when polling.")
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds a polled file must be unmodified before it is imported.")
+    parser.add_argument("--rescan-interval", type=float, default=300.0, help="Seconds between safety rescans when using inotify.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Import attempts per file while the database is reachable.")
+    parser.add_argument("--backoff-max", type=float, default=60.0, help="Longest wait between retries, in seconds.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Number of readings per multi-row INSERT statement.")
+    parser.add_argument("--load-data", action="store_true", help="Write readings with LOAD DATA LOCAL INFILE instead of batched INSERTs.")
+    parser.add_argument("--archive-dir", help="Move imported (and already imported) files here.")
+    parser.add_argument("--failed-dir", help="Move files that could not be imported here.")
+    parser.add_argument("--poll", action="store_true", help="Poll the directories even if inotify is available.")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between status reports.")
+
+    args = parser.parse_args()
+
+    service = IngestService(
+        args.directories,
+        load_practice_mapping(args.mapping),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        poll_interval=args.poll_interval,
+        settle=args.settle,
+        rescan_interval=args.rescan_interval,
+        max_attempts=args.max_attempts,
+        backoff_max=args.backoff_max,
+        batch_size=args.batch_size,
+        use_load_data=args.load_data,
+        archive_dir=args.archive_dir,
+        failed_dir=args.failed_dir,
+        use_inotify=not args.poll
+    )
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    service.start()
+    while not stopping.wait(args.report_interval):
+        service.report()
+    logging.info("Stopping: waiting for the files being imported.")
+    service.stop()
+    service.report()
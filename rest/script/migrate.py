@@ -0,0 +1,113 @@
+import argparse
+import importlib.util
+import logging
+import os
+import re
+
+from mysql.connector import Error
+
+from otr import get_db_connection
+
+# Migrations are applied in the order of their numeric prefix (0001_*.sql, 0002_*.py, ...).
+# .sql files hold plain statements separated by ';'; .py files define upgrade(cursor).
+# Every migration must be idempotent: databases that predate this runner already
+# have some of them applied by hand, so all of them are run once against such databases.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'schema', 'migrations')
+MIGRATION_PATTERN = re.compile(r'^(\d{4})_[\w-]+\.(sql|py)$')
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Returns [(version, filename, path), ...] sorted by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_PATTERN.match(filename)
+        if match:
+            migrations.append((match.group(1), filename, os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [version for version, _filename, _path in migrations]
+    duplicates = sorted({version for version in versions if versions.count(version) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate migration numbers: {', '.join(duplicates)}")
+    return migrations
+
+
+def split_sql_statements(sql):
+    """Splits a migration script into statements, dropping '--' comment lines."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+
+def get_applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    CHAR(4)      NOT NULL,
+            filename   VARCHAR(255) NOT NULL,
+            applied_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version)
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migration(cursor, filename, path):
+    if filename.endswith('.sql'):
+        with open(path, 'r') as f:
+            for statement in split_sql_statements(f.read()):
+                cursor.execute(statement)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{filename[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+
+
+def migrate(dry_run=False):
+    """
+    Applies the pending migrations in order and records each one in schema_migrations.
+    MySQL commits DDL implicitly, so a failed migration stops the run and is retried,
+    in full, the next time. Returns True if the schema is up to date.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        applied = get_applied_versions(cursor)
+        pending = [m for m in list_migrations() if m[0] not in applied]
+
+        if not pending:
+            logging.info("The schema is up to date.")
+            return True
+
+        for version, filename, path in pending:
+            if dry_run:
+                logging.info(f"Pending: {filename}")
+                continue
+            logging.info(f"Applying {filename}...")
+            apply_migration(cursor, filename, path)
+            cursor.execute("INSERT INTO schema_migrations (version, filename) VALUES (%s, %s)", (version, filename))
+            conn.commit()
+
+        if not dry_run:
+            logging.info(f"Applied {len(pending)} migrations.")
+        return True
+    except Error as e:
+        logging.error(f"Migration failed: {e}")
+        conn.rollback()
+        return False
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Create or upgrade the sensor database schema.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the migrations that would be applied.")
+
+    args = parser.parse_args()
+
+    raise SystemExit(0 if migrate(args.dry_run) else 1)
@@ -2,8 +2,21 @@ import mysql.connector
 from mysql.connector import Error
 import argparse
 import os
-from datetime import datetime
+import sys
+from datetime import datetime, timedelta
 import logging
+import hashlib
+import math
+import re
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager
+import numpy as np
+
+# The chunk format of compacted days is shared with the REST server, which lives one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chunkstore import decode_chunk, split_days  # noqa: E402
 
 # --- Database Configuration ---
 # It's recommended to use environment variables for security.
@@ -17,58 +30,219 @@ DB_CONFIG = {
 # --- Logging Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def get_db_connection():
+def get_db_connection(allow_local_infile=False):
     """Establishes and returns a database connection."""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=allow_local_infile)
         logging.info("Successfully connected to the database.")
         return conn
     except Error as e:
         logging.error(f"Error connecting to MySQL database: {e}")
         return None
 
+# --- Parsing ---
+DATE_COLUMN = 'DATE'
+DATE_FORMAT = '%d/%m/%Y %H.%M'
+
+def _read_datalogger_sections(filepath, start_rows):
+    """
+    Streams a datalogger file line by line, without loading it whole. Once the header of the
+    [INIZIO DATI] section is read, start_rows(header) is called; it returns the function that
+    then receives every data line (stripped, not split), so callers keep only what they need.
+    Returns a tuple (vbatt_str, header): vbatt_str is None if there is no VBATT section and
+    header is None if there is no data section.
+    """
+    vbatt_parts = None
+    header = None
+    add_row = None
+    section = None
+
+    with open(filepath, 'r') as f:
+        for line in f:
+            stripped = line.strip()
+
+            if section is None and '[INIZIO VBATT]' in stripped and vbatt_parts is None:
+                vbatt_parts = []
+                section = 'vbatt'
+                stripped = stripped.split('[INIZIO VBATT]', 1)[1]
+            if section == 'vbatt':
+                if '[FINE VBATT]' in stripped:
+                    vbatt_parts.append(stripped.split('[FINE VBATT]', 1)[0])
+                    section = None
+                else:
+                    vbatt_parts.append(stripped)
+                continue
+
+            if section is None and stripped == '[INIZIO DATI]' and header is None:
+                section = 'data'
+                continue
+            if section == 'data':
+                if stripped == '[FINE DATI]':
+                    section = 'done'
+                elif not stripped:
+                    continue
+                elif header is None:
+                    header = [h.strip() for h in stripped.split(',') if h.strip()]
+                    add_row = start_rows(header)
+                else:
+                    add_row(stripped)
+
+    vbatt_str = ''.join(vbatt_parts).strip() if vbatt_parts is not None else None
+    return vbatt_str, header
+
+def _parse_vbatt(vbatt_str):
+    """Converts the raw VBATT section into a float, or None if it is missing or malformed."""
+    try:
+        if vbatt_str is None:
+            raise ValueError("section not found")
+        # Remove comma and convert to float
+        vbatt_value = float(vbatt_str.replace(',', ''))
+        logging.info(f"Parsed VBATT value: {vbatt_value}")
+        return vbatt_value
+    except ValueError as e:
+        logging.warning(f"Could not parse VBATT section. It might be missing or malformed. Error: {e}")
+        return None
+
 def parse_datalogger_file(filepath):
     """
     Parses the specific datalogger text file format to extract sensor data and VBATT.
-    Returns a dictionary containing the readings and the vbatt value.
+    Returns a dictionary containing the readings (one {column: value} dict per row) and the vbatt value.
+    See parse_datalogger_columns for the faster columnar variant.
     """
+    readings = []
+
+    def start_rows(header):
+        return lambda line: readings.append(dict(zip(header, (value.strip() for value in line.split(',')))))
+
     try:
-        with open(filepath, 'r') as f:
-            content = f.read()
+        vbatt_str, header = _read_datalogger_sections(filepath, start_rows)
     except FileNotFoundError:
         logging.error(f"File not found: {filepath}")
         return None
 
-    # --- Parse VBATT section ---
-    vbatt_value = None
-    try:
-        vbatt_str = content.split('[INIZIO VBATT]')[1].split('[FINE VBATT]')[0].strip()
-        # Remove comma and convert to float
-        vbatt_value = float(vbatt_str.replace(',', ''))
-        logging.info(f"Parsed VBATT value: {vbatt_value}")
-    except (IndexError, ValueError) as e:
-        logging.warning(f"Could not parse VBATT section. It might be missing or malformed. Error: {e}")
+    vbatt_value = _parse_vbatt(vbatt_str)
+
+    if header is None:
+        logging.error("Could not find [INIZIO DATI] or [FINE DATI] section. Cannot parse readings.")
+        return None
+
+    logging.info(f"Successfully parsed {len(readings)} data rows from {filepath}.")
+    return {"vbatt": vbatt_value, "readings": readings}
+
+class _ColumnBuilder:
+    """
+    Parses the data lines of a datalogger file as they are read, straight into compact buffers:
+    each date as 16 bytes of ISO 8601 text, converted to datetime64[m] in one step at the end, and
+    the values of every line as float64. No line or cell is kept as a Python string, so the
+    memory used while parsing stays close to the size of the resulting arrays.
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.width = len(header)
+        self.date_index = header.index(DATE_COLUMN) if DATE_COLUMN in header else None
+        self.names = [name for name in header if name != DATE_COLUMN]
+        self.dates = bytearray()
+        self.values = array('d')
+        self.rows = 0
+
+    def add_line(self, line):
+        if self.date_index is None:
+            return
+        cells = line.split(',')
+        if len(cells) != self.width:
+            # Pad or truncate every row to the header width
+            cells = cells[:self.width] + [''] * (self.width - len(cells))
+        self.dates += self._iso_date(cells.pop(self.date_index).strip())
+        row_start = len(self.values)
+        try:
+            self.values.extend(map(float, cells))
+        except ValueError:
+            # Empty or non-numeric cells, converted one at a time (extend kept the cells before the bad one)
+            del self.values[row_start:]
+            self.values.extend(self._float(cell.strip(), name) for cell, name in zip(cells, self.names))
+        self.rows += 1
+
+    def _iso_date(self, date_str):
+        """Rearranges 'dd/mm/YYYY HH.MM' into 'YYYY-mm-ddTHH:MM' (b'NaT' for invalid dates) without strptime."""
+        if len(date_str) == 16 and date_str[2] == '/' and date_str[5] == '/' and date_str[10] == ' ' and date_str[13] == '.':
+            iso = f"{date_str[6:10]}-{date_str[3:5]}-{date_str[0:2]}T{date_str[11:13]}:{date_str[14:16]}"
+        else:
+            try:
+                iso = datetime.strptime(date_str, DATE_FORMAT).strftime('%Y-%m-%dT%H:%M')
+            except ValueError:
+                logging.warning(f"Invalid date '{date_str}' in row {self.rows + 1}. The row will be skipped.")
+                return _NAT_DATE
+        encoded = iso.encode('ascii', 'replace')
+        return encoded if len(encoded) == 16 else _NAT_DATE
+
+    @staticmethod
+    def _float(value_str, sensor_name):
+        if not value_str:
+            return math.nan
+        try:
+            return float(value_str)
+        except ValueError:
+            logging.warning(f"Could not convert value '{value_str}' to float for sensor '{sensor_name}'. Skipping.")
+            return math.nan
+
+    def timestamps(self):
+        dates = np.frombuffer(self.dates, dtype='S16')
+        try:
+            return dates.astype('datetime64[m]')
+        except ValueError:
+            # At least one impossible date (e.g. month 13): convert them one at a time
+            timestamps = np.full(len(dates), np.datetime64('NaT'), dtype='datetime64[m]')
+            for i, date in enumerate(dates):
+                try:
+                    timestamps[i] = np.datetime64(date.decode('ascii'), 'm')
+                except ValueError:
+                    logging.warning(f"Invalid date '{date.decode('ascii')}' in row {i + 1}. The row will be skipped.")
+            return timestamps
+
+    def channels(self):
+        # Rows of the transposed copy are the contiguous columns
+        columns = np.frombuffer(self.values, dtype=np.float64).reshape(self.rows, len(self.names)).T.copy()
+        self.values = array('d')
+        return dict(zip(self.names, columns))
+
+
+_NAT_DATE = b'NaT'.ljust(16, b'\0')
+
+def parse_datalogger_columns(filepath):
+    """
+    Parses a datalogger file into columnar arrays, streaming the file line by line.
+    Returns a dictionary {"vbatt", "timestamps", "channels"} where timestamps is a
+    datetime64[m] array (NaT for invalid dates) and channels maps each sensor name to
+    a float64 array of the same length (NaN for empty cells).
+    """
+    builders = []
+
+    def start_rows(header):
+        builders.append(_ColumnBuilder(header))
+        return builders[0].add_line
 
-    # --- Parse DATA section ---
     try:
-        data_section = content.split('[INIZIO DATI]')[1].split('[FINE DATI]')[0].strip()
-        lines = data_section.splitlines()
-        
-        header = [h.strip() for h in lines[0].split(',') if h.strip()]
-        
-        readings = []
-        for line in lines[1:]:
-            if not line.strip():
-                continue
-            values = [v.strip() for v in line.split(',')]
-            row_data = dict(zip(header, values))
-            readings.append(row_data)
-            
-        logging.info(f"Successfully parsed {len(readings)} data rows from {filepath}.")
-        return {"vbatt": vbatt_value, "readings": readings}
-    except IndexError:
+        vbatt_str, header = _read_datalogger_sections(filepath, start_rows)
+    except FileNotFoundError:
+        logging.error(f"File not found: {filepath}")
+        return None
+
+    vbatt_value = _parse_vbatt(vbatt_str)
+
+    if header is None:
         logging.error("Could not find [INIZIO DATI] or [FINE DATI] section. Cannot parse readings.")
         return None
+    if DATE_COLUMN not in header:
+        logging.error(f"The data section has no {DATE_COLUMN} column. Cannot parse readings.")
+        return None
+
+    builder = builders[0]
+    timestamps = builder.timestamps()
+    channels = builder.channels()
+
+    logging.info(f"Successfully parsed {builder.rows} data rows from {filepath}.")
+    return {"vbatt": vbatt_value, "timestamps": timestamps, "channels": channels}
 
 
 def get_or_create_sensor(cursor, practice_id, sensor_name):
@@ -88,96 +262,498 @@ def get_or_create_sensor(cursor, practice_id, sensor_name):
         logging.info(f"Created new sensor '{sensor_name}' for practice ID {practice_id}.")
         return cursor.lastrowid
 
-def insert_data_into_db(data, practice_name):
+# --- Rollups ---
+# Each entry is (table, DATE_FORMAT pattern that truncates a timestamp to the bucket start).
+ROLLUP_TABLES = [
+    ("sensor_readings_hourly", "%%Y-%%m-%%d %%H:00:00"),
+    ("sensor_readings_daily", "%%Y-%%m-%%d 00:00:00"),
+]
+
+def refresh_rollups(cursor, sensor_ids, start_dt, end_dt):
     """
-    Inserts the parsed data, including VBATT, into the database.
+    Recomputes the hourly and daily rollups of the given sensors for every bucket
+    touching the [start_dt, end_dt] interval. Buckets are rebuilt from sensor_readings,
+    then those of compacted days from their chunk and readings together, so running it
+    again over the same interval is safe.
+    """
+    if not sensor_ids:
+        return
+
+    sensor_ids = sorted(sensor_ids)
+    placeholders = ', '.join(['%s'] * len(sensor_ids))
+    hour_start = start_dt.replace(minute=0, second=0, microsecond=0)
+    bounds = {
+        "sensor_readings_hourly": (hour_start, end_dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)),
+        "sensor_readings_daily": (hour_start.replace(hour=0), end_dt.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)),
+    }
+
+    for table, bucket_format in ROLLUP_TABLES:
+        bucket_from, bucket_to = bounds[table]
+        cursor.execute(f"""
+            INSERT INTO {table} (sensor_id, bucket_start, min_value, max_value, avg_value, reading_count)
+            SELECT sensor_id, DATE_FORMAT(timestamp, '{bucket_format}') AS bucket,
+                   MIN(value), MAX(value), AVG(value), COUNT(*)
+            FROM sensor_readings
+            WHERE sensor_id IN ({placeholders}) AND timestamp >= %s AND timestamp < %s
+            GROUP BY sensor_id, bucket
+            ON DUPLICATE KEY UPDATE
+                min_value = VALUES(min_value),
+                max_value = VALUES(max_value),
+                avg_value = VALUES(avg_value),
+                reading_count = VALUES(reading_count)
+        """, (*sensor_ids, bucket_from, bucket_to))
+        logging.debug(f"Refreshed {cursor.rowcount} rows in {table} from {bucket_from} to {bucket_to}.")
+
+    refresh_compacted_rollups(cursor, sensor_ids, *bounds["sensor_readings_daily"])
+
+
+def _rollup_row(sensor_id, bucket_start, values):
+    return (sensor_id, bucket_start, min(values), max(values), sum(values) / len(values), len(values))
+
+
+def rewrite_rollups(cursor, sensor_id, days):
+    """Recomputes the hourly and daily rollups of whole days from their points, [(day, points), ...]."""
+    rows = {"sensor_readings_hourly": [], "sensor_readings_daily": []}
+    for day, points in days:
+        hours = {}
+        for timestamp, value in points:
+            hours.setdefault(timestamp.replace(minute=0, second=0, microsecond=0), []).append(value)
+        rows["sensor_readings_hourly"].extend(_rollup_row(sensor_id, hour, values) for hour, values in hours.items())
+        rows["sensor_readings_daily"].append(_rollup_row(sensor_id, day, [value for _timestamp, value in points]))
+
+    for table, table_rows in rows.items():
+        cursor.executemany(f"""
+            INSERT INTO {table} (sensor_id, bucket_start, min_value, max_value, avg_value, reading_count)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                min_value = VALUES(min_value),
+                max_value = VALUES(max_value),
+                avg_value = VALUES(avg_value),
+                reading_count = VALUES(reading_count)
+        """, table_rows)
+
+
+def refresh_compacted_rollups(cursor, sensor_ids, day_from, day_to):
+    """
+    Rebuilds the rollups of the days in [day_from, day_to) that were moved into sensor_day_chunks
+    (see compact_readings.py). A late import into such a day leaves only the new readings in
+    sensor_readings, so the buckets are computed from the chunk's points and those readings,
+    which win on equal timestamps.
+    """
+    placeholders = ', '.join(['%s'] * len(sensor_ids))
+    # FOR UPDATE, like the compaction: a compaction committed since this transaction's snapshot is seen
+    cursor.execute(f"""
+        SELECT sensor_id, day, payload FROM sensor_day_chunks
+        WHERE sensor_id IN ({placeholders}) AND day >= %s AND day < %s
+        FOR UPDATE
+    """, (*sensor_ids, day_from.date(), day_to.date()))
+    chunks = {}
+    for sensor_id, day, payload in cursor.fetchall():
+        chunks.setdefault(sensor_id, {})[datetime.combine(day, datetime.min.time())] = payload
+
+    for sensor_id, sensor_chunks in sorted(chunks.items()):
+        first_day, last_day = min(sensor_chunks), max(sensor_chunks)
+        cursor.execute("""
+            SELECT timestamp, value FROM sensor_readings
+            WHERE sensor_id = %s AND timestamp >= %s AND timestamp < %s
+            ORDER BY timestamp
+        """, (sensor_id, first_day, last_day + timedelta(days=1)))
+        readings = split_days(cursor.fetchall())
+
+        days = []
+        for day, payload in sorted(sensor_chunks.items()):
+            timestamps, values = decode_chunk(day, payload)
+            combined = dict(zip(timestamps, values))
+            combined.update(readings.get(day, ()))
+            days.append((day, sorted(combined.items())))
+        rewrite_rollups(cursor, sensor_id, days)
+        logging.debug(f"Rebuilt the rollups of {len(days)} compacted days of sensor ID {sensor_id}.")
+
+
+# --- Bulk Insertion ---
+DEFAULT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+
+def resolve_sensor_ids(cursor, practice_id, sensor_names):
+    """
+    Resolves all sensor names of a file to their IDs with a single lookup,
+    creating the sensors that do not exist yet. Returns a {name: id} dictionary.
+    """
+    sensor_names = list(dict.fromkeys(sensor_names))
+    if not sensor_names:
+        return {}
+
+    placeholders = ', '.join(['%s'] * len(sensor_names))
+    cursor.execute(
+        f"SELECT name, id FROM sensors WHERE practice_id = %s AND name IN ({placeholders})",
+        (practice_id, *sensor_names)
+    )
+    sensor_ids = {name: sensor_id for name, sensor_id in cursor.fetchall()}
+
+    for sensor_name in sensor_names:
+        if sensor_name not in sensor_ids:
+            sensor_ids[sensor_name] = get_or_create_sensor(cursor, practice_id, sensor_name)
+    return sensor_ids
+
+def build_reading_rows(readings, sensor_ids):
+    """
+    Converts the parsed rows into (sensor_id, timestamp, value) tuples, skipping
+    rows with an invalid date and cells that are empty or not numeric.
+    """
+    rows = []
+    for row in readings:
+        try:
+            timestamp_dt = datetime.strptime(row[DATE_COLUMN], DATE_FORMAT)
+        except (ValueError, KeyError) as e:
+            logging.warning(f"Skipping row due to invalid date format or missing DATE field: {row}. Error: {e}")
+            continue
+
+        for sensor_name, value_str in row.items():
+            if sensor_name == DATE_COLUMN or not value_str:
+                continue # Skip the date field itself and any empty values
+            try:
+                rows.append((sensor_ids[sensor_name], timestamp_dt, float(value_str)))
+            except ValueError:
+                logging.warning(f"Could not convert value '{value_str}' to float for sensor '{sensor_name}'. Skipping.")
+    return rows
+
+def build_reading_rows_from_columns(timestamps, channels, sensor_ids):
+    """
+    Columnar counterpart of build_reading_rows: converts the arrays returned by
+    parse_datalogger_columns into (sensor_id, timestamp, value) tuples, skipping NaT and NaN.
+    """
+    rows = []
+    valid_time = ~np.isnat(timestamps)
+    for sensor_name, values in channels.items():
+        mask = valid_time & ~np.isnan(values)
+        sensor_timestamps = timestamps[mask].astype('datetime64[s]').tolist()
+        rows.extend(zip([sensor_ids[sensor_name]] * len(sensor_timestamps), sensor_timestamps, values[mask].tolist()))
+    return rows
+
+def insert_reading_rows(cursor, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Writes the readings with multi-row INSERT statements of at most batch_size rows each.
+    Readings that already exist for the same sensor and timestamp are overwritten.
+    """
+    insert_query = """
+        INSERT INTO sensor_readings (sensor_id, timestamp, value) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE value = VALUES(value)
+    """
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset:offset + batch_size]
+        cursor.executemany(insert_query, batch)
+        logging.debug(f"Inserted batch of {len(batch)} readings ({offset + len(batch)}/{len(rows)}).")
+
+def load_reading_rows(cursor, rows):
+    """
+    Writes the readings through LOAD DATA LOCAL INFILE using a temporary tab-separated file,
+    replacing readings that already exist. Requires local_infile to be enabled on the server.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as tmp:
+        for sensor_id, timestamp_dt, value in rows:
+            tmp.write(f"{sensor_id}\t{timestamp_dt:%Y-%m-%d %H:%M:%S}\t{value!r}\n")
+        tmp_path = tmp.name
+    try:
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE sensor_readings "
+            "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' (sensor_id, timestamp, value)",
+            (tmp_path.replace(os.sep, '/'),)
+        )
+        logging.debug(f"Loaded {cursor.rowcount} readings from {tmp_path}.")
+    finally:
+        os.remove(tmp_path)
+
+# --- Data Versions ---
+def bump_data_version(cursor, practice_ids):
+    """
+    Increments the data version of the given practices (to be committed with the data),
+    which invalidates the ETags and cached responses served for them by the REST server.
+    """
+    for practice_id in sorted(set(practice_ids)):
+        cursor.execute("""
+            INSERT INTO practice_data_versions (practice_id, version, updated_at)
+            VALUES (%s, 1, NOW())
+            ON DUPLICATE KEY UPDATE version = version + 1, updated_at = NOW()
+        """, (practice_id,))
+
+
+# Import events older than this are pruned by the importer; subscribers that were
+# disconnected for longer reload their data instead of replaying missed events.
+IMPORT_EVENT_RETENTION_DAYS = int(os.environ.get('IMPORT_EVENT_RETENTION_DAYS', 7))
+
+
+def publish_import_event(cursor, practice_id, reading_count, first_timestamp, last_timestamp):
+    """
+    Appends a row to the import_events change feed (to be committed with the data and after
+    bump_data_version), which the REST server pushes to the dashboards subscribed to /events.
+    """
+    cursor.execute("""
+        INSERT INTO import_events (practice_id, version, reading_count, first_timestamp, last_timestamp)
+        SELECT practice_id, version, %s, %s, %s
+        FROM practice_data_versions
+        WHERE practice_id = %s
+    """, (reading_count, first_timestamp, last_timestamp, practice_id))
+    cursor.execute(
+        "DELETE FROM import_events WHERE created_at < NOW() - INTERVAL %s DAY",
+        (IMPORT_EVENT_RETENTION_DAYS,)
+    )
+
+
+# --- Import Manifest ---
+def file_content_hash(filepath):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_imported_hashes(content_hashes=None):
+    """
+    Returns the set of content hashes already recorded in the imported_files manifest,
+    optionally restricted to the given hashes. Returns None if the database is unreachable.
     """
     conn = get_db_connection()
     if not conn:
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if content_hashes is None:
+            cursor.execute("SELECT content_hash FROM imported_files")
+            return {row[0] for row in cursor.fetchall()}
+
+        imported = set()
+        content_hashes = list(content_hashes)
+        for offset in range(0, len(content_hashes), 1000):
+            chunk = content_hashes[offset:offset + 1000]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"SELECT content_hash FROM imported_files WHERE content_hash IN ({placeholders})", tuple(chunk))
+            imported.update(row[0] for row in cursor.fetchall())
+        return imported
+    except Error as e:
+        logging.error(f"Could not read the import manifest: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def record_imported_file(cursor, content_hash, filename, practice_id, reading_count):
+    """Adds a file to the imported_files manifest (to be committed with its readings)."""
+    cursor.execute("""
+        INSERT INTO imported_files (content_hash, filename, practice_id, reading_count)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE filename = VALUES(filename), practice_id = VALUES(practice_id),
+                                reading_count = VALUES(reading_count), imported_at = CURRENT_TIMESTAMP
+    """, (content_hash, filename, practice_id, reading_count))
+
+
+# --- Import Metrics ---
+# Every import logs the time spent in each phase and its throughput. If IMPORT_METRICS_DIR
+# is set (e.g. to the directory of node_exporter's textfile collector), the same figures
+# are written there as Prometheus gauges, in one file per practice replaced after each import.
+IMPORT_METRICS_DIR = os.environ.get('IMPORT_METRICS_DIR')
+
+class ImportTimer:
+    """Accumulates the seconds an import spends in each phase (parse, connect, resolve, build, write, ...)."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def total(self):
+        return sum(self.phases.values())
+
+
+def publish_import_metrics(timer, practice_name, reading_count, succeeded):
+    """Logs the phase timings of an import and, if IMPORT_METRICS_DIR is set, writes them as Prometheus metrics."""
+    total = timer.total()
+    rate = reading_count / total if total else 0.0
+    breakdown = ', '.join(f"{name} {seconds:.3f}s" for name, seconds in timer.phases.items())
+    logging.info(f"Import timings for '{practice_name}': {breakdown}; "
+                 f"{reading_count} readings in {total:.3f}s ({rate:.0f} readings/s).")
+
+    if not IMPORT_METRICS_DIR:
         return
+    practice_label = practice_name.replace('\\', '\\\\').replace('"', '\\"')
+    labels = f'practice="{practice_label}"'
+    lines = [
+        "# HELP sonde_import_phase_seconds Seconds spent in each phase of the last import.",
+        "# TYPE sonde_import_phase_seconds gauge",
+        *(f'sonde_import_phase_seconds{{{labels},phase="{name}"}} {seconds:.6f}' for name, seconds in timer.phases.items()),
+        "# HELP sonde_import_duration_seconds Total duration of the last import.",
+        "# TYPE sonde_import_duration_seconds gauge",
+        f"sonde_import_duration_seconds{{{labels}}} {total:.6f}",
+        "# HELP sonde_import_readings Readings written by the last import.",
+        "# TYPE sonde_import_readings gauge",
+        f"sonde_import_readings{{{labels}}} {reading_count}",
+        "# HELP sonde_import_readings_per_second Throughput of the last import.",
+        "# TYPE sonde_import_readings_per_second gauge",
+        f"sonde_import_readings_per_second{{{labels}}} {rate:.1f}",
+        "# HELP sonde_import_success Whether the last import was committed.",
+        "# TYPE sonde_import_success gauge",
+        f"sonde_import_success{{{labels}}} {int(succeeded)}",
+        "# HELP sonde_import_last_run_timestamp_seconds Unix time of the last import.",
+        "# TYPE sonde_import_last_run_timestamp_seconds gauge",
+        f"sonde_import_last_run_timestamp_seconds{{{labels}}} {time.time():.0f}",
+    ]
+    write_metrics_file(f"sonde_import_{re.sub(r'[^A-Za-z0-9_-]', '_', practice_name)}.prom", lines)
+
+
+def write_metrics_file(filename, lines):
+    """
+    Replaces filename in IMPORT_METRICS_DIR with the given Prometheus text lines. The file is
+    written under a temporary name first, so the collector never reads a partial file.
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=IMPORT_METRICS_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, os.path.join(IMPORT_METRICS_DIR, filename))
+    except OSError as e:
+        logging.warning(f"Could not write metrics to {IMPORT_METRICS_DIR}: {e}")
+
+
+def insert_data_into_db(data, practice_name, batch_size=DEFAULT_BATCH_SIZE, use_load_data=False, source_file=None,
+                        timer=None):
+    """
+    Inserts the parsed data, including VBATT, into the database.
+    Accepts the output of either parse_datalogger_file or parse_datalogger_columns.
+    Sensor IDs are resolved once per file and readings are written in batches
+    (or with LOAD DATA LOCAL INFILE); the whole file is a single transaction.
+    If source_file is a (filepath, content_hash) tuple, the file is recorded in the
+    import manifest within the same transaction.
+    Each phase is timed on timer (an ImportTimer, which may already hold the parse time)
+    and the timings are published with publish_import_metrics.
+    Returns True if the data was committed, False otherwise.
+    """
+    timer = timer or ImportTimer()
+    with timer.phase('connect'):
+        conn = get_db_connection(allow_local_infile=use_load_data)
+    if not conn:
+        return False
         
-    readings = data.get('readings', [])
+    columnar = 'channels' in data
+    if columnar:
+        timestamps = data['timestamps']
+        channels = data['channels']
+        row_count = len(timestamps)
+    else:
+        readings = data.get('readings', [])
+        row_count = len(readings)
     vbatt = data.get('vbatt')
 
-    if not readings:
+    if not row_count:
         logging.warning("No readings to insert. Aborting database operation.")
-        return
+        conn.close()
+        return False
 
+    rows = []
+    committed = False
     try:
         cursor = conn.cursor()
         
-        # 1. Get the ID of the practice from its name
-        cursor.execute("SELECT id FROM practices WHERE name = %s", (practice_name,))
-        practice_result = cursor.fetchone()
-        if not practice_result:
-            logging.error(f"Practice '{practice_name}' not found in the database. Aborting.")
-            return
-        practice_id = practice_result[0]
-        logging.info(f"Found practice '{practice_name}' with ID: {practice_id}.")
+        with timer.phase('resolve'):
+            # 1. Get the ID of the practice from its name
+            cursor.execute("SELECT id FROM practices WHERE name = %s", (practice_name,))
+            practice_result = cursor.fetchone()
+            if not practice_result:
+                logging.error(f"Practice '{practice_name}' not found in the database. Aborting.")
+                return False
+            practice_id = practice_result[0]
+            logging.info(f"Found practice '{practice_name}' with ID: {practice_id}.")
 
-        # 2. Handle VBATT insertion
-        # We use the timestamp of the first reading for the VBATT value.
-        first_timestamp_dt = None
-        try:
-            first_timestamp_str = readings[0]['DATE']
-            first_timestamp_dt = datetime.strptime(first_timestamp_str, '%d/%m/%Y %H.%M')
-        except (ValueError, KeyError, IndexError) as e:
-            logging.error(f"Could not determine a valid timestamp for VBATT from the first data row. Error: {e}")
+            # 2. Resolve every column of the file (and VBATT) to a sensor ID once
+            if columnar:
+                sensor_names = list(channels)
+            else:
+                sensor_names = [name for name in dict.fromkeys(k for row in readings for k in row) if name != DATE_COLUMN]
+            if vbatt is not None:
+                sensor_names.append("VBATT")
+            sensor_ids = resolve_sensor_ids(cursor, practice_id, sensor_names)
 
-        if vbatt is not None and first_timestamp_dt is not None:
-            try:
-                vbatt_sensor_id = get_or_create_sensor(cursor, practice_id, "VBATT")
-                cursor.execute(
-                    "INSERT INTO sensor_readings (sensor_id, timestamp, value) VALUES (%s, %s, %s)",
-                    (vbatt_sensor_id, first_timestamp_dt, vbatt)
-                )
-                logging.info(f"Inserted VBATT reading with timestamp {first_timestamp_dt}.")
-            except Error as e:
-                logging.error(f"Database error inserting VBATT data: {e}")
-
-
-        # 3. Iterate over each row of data from the file
-        for row in readings:
-            try:
-                timestamp_str = row['DATE']
-                timestamp_dt = datetime.strptime(timestamp_str, '%d/%m/%Y %H.%M')
-            except (ValueError, KeyError) as e:
-                logging.warning(f"Skipping row due to invalid date format or missing DATE field: {row}. Error: {e}")
-                continue
+        with timer.phase('build'):
+            # 3. Build all readings in memory
+            if columnar:
+                rows = build_reading_rows_from_columns(timestamps, channels, sensor_ids)
+            else:
+                rows = build_reading_rows(readings, sensor_ids)
 
-            # 4. For each sensor in the row, get/create its ID and insert the reading
-            for sensor_name, value_str in row.items():
-                if sensor_name == 'DATE' or not value_str:
-                    continue # Skip the date field itself and any empty values
-                
+            # We use the timestamp of the first reading for the VBATT value.
+            first_timestamp_dt = None
+            if columnar:
+                if not np.isnat(timestamps[0]):
+                    first_timestamp_dt = timestamps[0].astype('datetime64[s]').item()
+                else:
+                    logging.error("Could not determine a valid timestamp for VBATT from the first data row.")
+            else:
                 try:
-                    sensor_id = get_or_create_sensor(cursor, practice_id, sensor_name)
-                    value_float = float(value_str)
+                    first_timestamp_str = readings[0][DATE_COLUMN]
+                    first_timestamp_dt = datetime.strptime(first_timestamp_str, DATE_FORMAT)
+                except (ValueError, KeyError, IndexError) as e:
+                    logging.error(f"Could not determine a valid timestamp for VBATT from the first data row. Error: {e}")
 
-                    insert_query = """
-                        INSERT INTO sensor_readings (sensor_id, timestamp, value)
-                        VALUES (%s, %s, %s)
-                    """
-                    cursor.execute(insert_query, (sensor_id, timestamp_dt, value_float))
-                    logging.debug(f"Inserted reading for {sensor_name} at {timestamp_dt} with value {value_float}")
+            if vbatt is not None and first_timestamp_dt is not None:
+                rows.append((sensor_ids["VBATT"], first_timestamp_dt, vbatt))
+                logging.info(f"Queued VBATT reading with timestamp {first_timestamp_dt}.")
+
+        if not rows:
+            logging.warning("No valid readings found in the file. Nothing to insert.")
+            return False
+
+        # 4. Write the readings in bulk
+        with timer.phase('write'):
+            if use_load_data:
+                load_reading_rows(cursor, rows)
+            else:
+                insert_reading_rows(cursor, rows, batch_size)
+        logging.info(f"Wrote {len(rows)} readings for {len(sensor_ids)} sensors.")
+
+        # 5. Bring the hourly/daily rollups up to date for the imported span
+        with timer.phase('rollups'):
+            touched_sensor_ids = {row[0] for row in rows}
+            min_timestamp_dt = min(row[1] for row in rows)
+            max_timestamp_dt = max(row[1] for row in rows)
+            refresh_rollups(cursor, touched_sensor_ids, min_timestamp_dt, max_timestamp_dt)
+        logging.info(f"Refreshed rollups for {len(touched_sensor_ids)} sensors from {min_timestamp_dt} to {max_timestamp_dt}.")
+
+        with timer.phase('publish'):
+            # 6. Publish the new data version of the practice and notify subscribed dashboards
+            bump_data_version(cursor, [practice_id])
+            publish_import_event(cursor, practice_id, len(rows), min_timestamp_dt, max_timestamp_dt)
+
+            # 7. Record the file in the import manifest
+            if source_file:
+                filepath, content_hash = source_file
+                record_imported_file(cursor, content_hash, os.path.basename(filepath), practice_id, len(rows))
 
-                except ValueError:
-                    logging.warning(f"Could not convert value '{value_str}' to float for sensor '{sensor_name}'. Skipping.")
-                except Error as e:
-                    logging.error(f"Database error inserting data for {sensor_name}: {e}")
-        
         # Commit all changes to the database
-        conn.commit()
+        with timer.phase('commit'):
+            conn.commit()
+        committed = True
         logging.info("Data import completed successfully.")
+        return True
 
     except Error as e:
         logging.error(f"A database error occurred: {e}")
         conn.rollback() # Roll back changes in case of error
+        return False
     finally:
         if conn and conn.is_connected():
             cursor.close()
             conn.close()
             logging.info("Database connection closed.")
+        publish_import_metrics(timer, practice_name, len(rows) if committed else 0, committed)
 
 
 if __name__ == '__main__':
@@ -185,13 +761,29 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Import datalogger files into the sensor database.")
     parser.add_argument("filepath", type=str, help="The full path to the datalogger TXT file.")
     parser.add_argument("practice_name", type=str, help="The name of the practice (e.g., 'Sonda-LU-01') to associate this data with.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Number of readings per multi-row INSERT statement.")
+    parser.add_argument("--load-data", action="store_true", help="Write readings with LOAD DATA LOCAL INFILE instead of batched INSERTs.")
+    parser.add_argument("--force", action="store_true", help="Import the file even if the manifest says it was already imported.")
     
     args = parser.parse_args()
+
+    # 1. Skip files whose content has already been imported
+    try:
+        content_hash = file_content_hash(args.filepath)
+    except FileNotFoundError:
+        logging.error(f"File not found: {args.filepath}")
+        raise SystemExit(1)
+
+    if not args.force and content_hash in (get_imported_hashes([content_hash]) or set()):
+        logging.info(f"File {args.filepath} was already imported (SHA-256 {content_hash}). Use --force to import it again.")
+        raise SystemExit(0)
     
-    # 1. Parse the file
-    parsed_data = parse_datalogger_file(args.filepath)
+    # 2. Parse the file
+    timer = ImportTimer()
+    with timer.phase('parse'):
+        parsed_data = parse_datalogger_columns(args.filepath)
     
-    # 2. If parsing was successful, insert the data
+    # 3. If parsing was successful, insert the data
     if parsed_data:
-        insert_data_into_db(parsed_data, args.practice_name)
-
+        insert_data_into_db(parsed_data, args.practice_name, batch_size=args.batch_size, use_load_data=args.load_data,
+                            source_file=(args.filepath, content_hash), timer=timer)
@@ -0,0 +1,167 @@
+import argparse
+import logging
+from datetime import date, datetime
+
+from mysql.connector import Error
+
+from otr import get_db_connection
+
+# sensor_readings can be RANGE-partitioned by month on its timestamp. Queries for a date
+# range then only touch the months it covers, and old months can be dropped instantly
+# instead of with a huge DELETE. Partitions are named pYYYYMM and hold the readings
+# before the first day of the following month; pmax catches anything beyond the last one.
+TABLE = 'sensor_readings'
+MAXVALUE_PARTITION = 'pmax'
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _partition_name(month):
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def _partition_definition(month):
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{_next_month(month).isoformat()}')"
+
+
+def _months(first, last):
+    """Returns the first day of every month from first to last, inclusive."""
+    months = []
+    month = _month_start(first)
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def get_partitions(cursor):
+    """Returns [(name, upper_bound_or_None, table_rows), ...] of sensor_readings, in order; empty if not partitioned."""
+    cursor.execute("""
+        SELECT partition_name, partition_description, table_rows
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (TABLE,))
+    partitions = []
+    for name, description, rows in cursor.fetchall():
+        bound = None if description == 'MAXVALUE' else datetime.strptime(description.strip("'")[:10], '%Y-%m-%d').date()
+        partitions.append((name, bound, rows))
+    return partitions
+
+
+def enable_partitioning(cursor, first_month, months_ahead):
+    """Partitions sensor_readings by month, from first_month (or its oldest reading) to months_ahead after today."""
+    if get_partitions(cursor):
+        logging.info(f"{TABLE} is already partitioned.")
+        return
+
+    if first_month is None:
+        cursor.execute(f"SELECT MIN(timestamp) FROM {TABLE}")
+        oldest = cursor.fetchone()[0]
+        first_month = oldest.date() if oldest else date.today()
+
+    last_month = _month_start(date.today())
+    for _ in range(months_ahead):
+        last_month = _next_month(last_month)
+
+    definitions = [_partition_definition(month) for month in _months(first_month, last_month)]
+    definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    logging.info(f"Partitioning {TABLE} into {len(definitions)} partitions (this rewrites the table)...")
+    cursor.execute(f"ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS (timestamp) ({', '.join(definitions)})")
+
+
+def add_partitions(cursor, months_ahead):
+    """Splits pmax so that monthly partitions exist up to months_ahead after today."""
+    partitions = get_partitions(cursor)
+    if not partitions:
+        logging.error(f"{TABLE} is not partitioned. Run the 'enable' command first.")
+        return False
+
+    bounds = [bound for _name, bound, _rows in partitions if bound]
+    target = _month_start(date.today())
+    for _ in range(months_ahead):
+        target = _next_month(target)
+
+    next_month = bounds[-1] if bounds else _month_start(date.today())
+    new_months = _months(next_month, target)
+    if not new_months:
+        logging.info("All partitions already exist.")
+        return True
+
+    definitions = [_partition_definition(month) for month in new_months]
+    definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    cursor.execute(f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ({', '.join(definitions)})")
+    logging.info(f"Added partitions {', '.join(_partition_name(month) for month in new_months)}.")
+    return True
+
+
+def drop_partitions(cursor, before_month, execute=False):
+    """
+    Drops the monthly partitions that end on or before before_month, deleting their readings.
+    The hourly and daily rollups are separate tables and keep the aggregated history.
+    Without execute, only lists what would be dropped.
+    """
+    doomed = [name for name, bound, _rows in get_partitions(cursor) if bound and bound <= before_month]
+    if not doomed:
+        logging.info("No partitions to drop.")
+        return
+    if not execute:
+        logging.info(f"Would drop {', '.join(doomed)}. Re-run with --yes to delete their readings.")
+        return
+    cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(doomed)}")
+    logging.info(f"Dropped partitions {', '.join(doomed)}.")
+
+
+def _parse_month(value):
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of sensor_readings.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("status", help="List the partitions and their approximate row counts.")
+
+    enable_parser = subparsers.add_parser("enable", help="Partition sensor_readings by month (rewrites the table).")
+    enable_parser.add_argument("--from", dest="first_month", type=_parse_month, help="First month (YYYY-MM, default: month of the oldest reading).")
+    enable_parser.add_argument("--months-ahead", type=int, default=3, help="Months to create after the current one.")
+
+    add_parser = subparsers.add_parser("add", help="Create the partitions of the coming months (run e.g. monthly from cron).")
+    add_parser.add_argument("--months-ahead", type=int, default=3, help="Months to create after the current one.")
+
+    drop_parser = subparsers.add_parser("drop", help="Drop the readings of old months.")
+    drop_parser.add_argument("--before", type=_parse_month, required=True, help="Drop the months before this one (YYYY-MM).")
+    drop_parser.add_argument("--yes", action="store_true", help="Actually drop the partitions; without it they are only listed.")
+
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+
+    succeeded = True
+    try:
+        cursor = conn.cursor()
+        if args.command == "status":
+            for name, bound, rows in get_partitions(cursor):
+                print(f"{name:<10} < {bound.isoformat() if bound else 'MAXVALUE':<12} ~{rows} rows")
+        elif args.command == "enable":
+            enable_partitioning(cursor, args.first_month, args.months_ahead)
+        elif args.command == "add":
+            succeeded = add_partitions(cursor, args.months_ahead)
+        elif args.command == "drop":
+            drop_partitions(cursor, args.before, execute=args.yes)
+        cursor.close()
+    except Error as e:
+        logging.error(f"Partition maintenance failed: {e}")
+        succeeded = False
+    finally:
+        conn.close()
+
+    raise SystemExit(0 if succeeded else 1)
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ('cookie', 'sqlite', 'filesystem')
+
+
+class SqliteSession(CallbackDict, SessionMixin):
+    """Server-side session whose data lives in the SQLite store under a random session ID."""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.rotate = False
+
+    def clear(self):
+        # A cleared session (login/logout) gets a new ID, which prevents session fixation
+        super().clear()
+        self.rotate = True
+
+
+class SqliteSessionInterface(SessionInterface):
+    """
+    Stores sessions in a local SQLite database, which all worker processes on the host can share.
+
+    Only sessions that changed (or are past half their lifetime) are written back, so ordinary
+    authenticated requests cost a single indexed read. Expired rows are deleted by a background
+    garbage-collection thread every `gc_interval` seconds.
+    """
+
+    session_class = SqliteSession
+
+    def __init__(self, path, gc_interval=300, logger=None):
+        self.path = path
+        self.gc_interval = gc_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+        conn.commit()
+
+        if gc_interval:
+            threading.Thread(target=self._gc_loop, name='session-gc', daemon=True).start()
+
+    # --- SessionInterface ---
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self._conn().execute(
+                "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+            ).fetchone()
+            if row:
+                return self.session_class(json.loads(row[0]), sid=sid, expires_at=row[1])
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        conn = self._conn()
+
+        if session.rotate and not session.new:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+            conn.commit()
+            session.sid = secrets.token_urlsafe(32)
+
+        if not session:
+            if session.modified:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not (session.modified or session.rotate or stale):
+            return
+
+        expires_at = now + lifetime
+        conn.execute(
+            "INSERT INTO sessions (sid, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+            (session.sid, json.dumps(dict(session)), expires_at)
+        )
+        conn.commit()
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    # --- Internals ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        """Returns this thread's connection to the store (SQLite connections are not shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _gc_loop(self):
+        conn = self._connect()
+        while True:
+            time.sleep(self.gc_interval)
+            try:
+                deleted = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+                conn.commit()
+                if deleted:
+                    self.logger.info(f"Session GC removed {deleted} expired sessions.")
+            except sqlite3.Error as err:
+                self.logger.warning(f"Session GC failed: {err}")
+
+
+def init_session_backend(app, backend):
+    """
+    Configures how sessions are stored:
+      cookie      stateless sessions signed with SECRET_KEY, carried entirely by the client (default)
+      sqlite      server-side sessions in a local SQLite store shared by all workers, with background GC
+      filesystem  the legacy Flask-Session file store
+    """
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend '{backend}'. Use one of: {', '.join(SESSION_BACKENDS)}.")
+
+    if backend == 'sqlite':
+        path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.sqlite3')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        app.session_interface = SqliteSessionInterface(
+            path,
+            gc_interval=app.config.get('SESSION_GC_INTERVAL', 300),
+            logger=app.logger
+        )
+    elif backend == 'filesystem':
+        from flask_session import Session
+        app.config["SESSION_TYPE"] = "filesystem"
+        Session(app)
+    else:
+        # Flask's built-in signed-cookie session. Not re-signing the cookie on every request
+        # makes the lifetime absolute (counted from login) and keeps reads free of any writes.
+        app.config["SESSION_REFRESH_EACH_REQUEST"] = False
+
+    app.logger.info(f"Session backend: {backend}")
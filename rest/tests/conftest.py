@@ -0,0 +1,205 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# The server modules are imported as top-level modules, as gunicorn and the scripts do
+REST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REST_DIR, 'script'))
+sys.path.insert(0, REST_DIR)
+
+
+class FakeCursor:
+    """A DB-API cursor whose results come from the first handler of its connection matching the query."""
+
+    def __init__(self, conn, dictionary=False):
+        self.conn = conn
+        self.dictionary = dictionary
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, params=()):
+        self.conn.queries.append((query, tuple(params or ())))
+        for fragment, handler in self.conn.handlers:
+            if fragment in query:
+                self._rows = list(handler(tuple(params or ())) or [])
+                break
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+        self.rowcount = len(self._rows)
+
+    def executemany(self, query, rows):
+        for params in rows:
+            self.execute(query, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Stands in for a MySQL connection. handlers is a list of (query fragment, function(params)
+    returning the rows); the executed queries are recorded in `queries`.
+    """
+
+    unread_result = False
+
+    def __init__(self, handlers=None):
+        self.handlers = list(handlers or [])
+        self.queries = []
+        self.commits = 0
+
+    def cursor(self, dictionary=False, buffered=None):
+        return FakeCursor(self, dictionary)
+
+    def on(self, fragment, handler):
+        """Registers a handler; later registrations take precedence."""
+        self.handlers.insert(0, (fragment, handler))
+        return self
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    """Hands out a single FakeConnection, in place of db_pool.ConnectionPool."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        return self.conn
+
+    def release(self, conn):
+        pass
+
+    def stats(self):
+        return {"checkouts": 0, "wait_time_total": 0.0, "wait_time_max": 0.0, "exhausted": 0, "created": 1,
+                "recycled": 0, "failed_pings": 0, "open": 1, "idle": 1, "in_use": 0, "wait_time_avg": 0.0}
+
+
+class SensorStore:
+    """
+    In-memory practices, sensors and readings, answering the queries of the data endpoints.
+    practices maps name to (practice_id, macrogroup_id); sensors maps sensor ID to (practice_id, name);
+    readings maps sensor ID to [(timestamp, value), ...] in time order, and chunks maps
+    (sensor ID, day) to a compacted day's blob. The user can read the practices of `macrogroups`.
+    """
+
+    def __init__(self, practices, sensors, readings, macrogroups=(10,), version=1,
+                 updated_at=datetime(2026, 1, 1, 12, 0), chunks=None):
+        self.practices = practices
+        self.sensors = sensors
+        self.readings = readings
+        self.chunks = chunks or {}
+        self.macrogroups = macrogroups
+        self.version = version
+        self.updated_at = updated_at
+
+    def install(self, conn):
+        practice_ids = {practice_id for practice_id, _macrogroup_id in self.practices.values()}
+        conn.on("FROM sensor_readings", self._raw)
+        conn.on("FROM sensor_readings_hourly", lambda params: self._rollup(params, 'hour'))
+        conn.on("FROM sensor_readings_daily", lambda params: self._rollup(params, 'day'))
+        conn.on("FROM sensor_day_chunks", lambda params: self._chunks(params))
+        conn.on("SELECT 1 FROM sensor_day_chunks", lambda params: [(1,)] if self._chunks(params) else [])
+        conn.on("FROM practices WHERE name IN", lambda params: [
+            {"name": name, "id": practice_id, "macrogroup_id": macrogroup_id}
+            for name, (practice_id, macrogroup_id) in self.practices.items()
+            if name.casefold() in {param.casefold() for param in params}
+        ])
+        conn.on("SELECT version FROM permission_versions", lambda params: [(1,)])
+        conn.on("UNION ALL", lambda params: [('version', 1), *(('macrogroup', group) for group in self.macrogroups)])
+        conn.on("FROM practice_data_versions WHERE practice_id = %s", lambda params: [
+            (self.version, self.updated_at)] if params[0] in practice_ids else [])
+        conn.on("FROM practice_data_versions WHERE practice_id IN", lambda params: [
+            (practice_id, self.version, self.updated_at) for practice_id in params if practice_id in practice_ids])
+        conn.on("FROM sensors WHERE practice_id = %s", lambda params: [
+            (sensor_id, name) for sensor_id, (practice_id, name) in sorted(self.sensors.items()) if practice_id == params[0]])
+        conn.on("FROM sensors WHERE practice_id IN", lambda params: [
+            (sensor_id, practice_id, name) for sensor_id, (practice_id, name) in sorted(self.sensors.items())
+            if practice_id in params])
+        return self
+
+    def _points(self, params):
+        *sensor_ids, start, end = params
+        for sensor_id in sorted(sensor_ids):
+            for timestamp, value in self.readings.get(sensor_id, []):
+                if start <= timestamp <= end:
+                    yield sensor_id, timestamp, value
+
+    def _chunks(self, params):
+        *sensor_ids, first_day, last_day = params
+        return [(sensor_id, day, payload) for (sensor_id, day), payload in sorted(self.chunks.items())
+                if sensor_id in sensor_ids and first_day <= day <= last_day]
+
+    def _raw(self, params):
+        return list(self._points(params))
+
+    def _rollup(self, params, unit):
+        *sensor_ids, start, end = params
+        fields = {'hour': dict(minute=0, second=0, microsecond=0), 'day': dict(hour=0, minute=0, second=0, microsecond=0)}[unit]
+        buckets = {}
+        for sensor_id in sorted(sensor_ids):
+            for timestamp, value in self.readings.get(sensor_id, []):
+                buckets.setdefault((sensor_id, timestamp.replace(**fields)), []).append(value)
+        return [
+            (sensor_id, bucket, sum(values) / len(values), min(values), max(values))
+            for (sensor_id, bucket), values in sorted(buckets.items()) if start <= bucket <= end
+        ]
+
+
+def login(client, user_id=1, username='tester'):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = username
+    return client
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    """The caches are module-level: every test starts without cached practices, trees, days or permissions."""
+    import app as server
+    for cache in server.CACHES.values():
+        cache.invalidate()
+    server.permission_cache._version = None
+
+
+@pytest.fixture
+def app():
+    from app import create_app
+    app = create_app({'SECRET_KEY': 'test', 'TESTING': True})
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db(app):
+    """The FakeConnection behind every request of the app fixture."""
+    conn = FakeConnection()
+    app.extensions['db_pool'] = FakePool(conn)
+    return conn
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from auth import LoginBusyError, PasswordHasher, PermissionCache, Permissions
+from conftest import FakeConnection
+
+
+def test_hasher_checks_and_generates_hashes():
+    hasher = PasswordHasher(workers=1)
+    password_hash = hasher.generate('secret')
+
+    assert hasher.check(password_hash, 'secret')
+    assert not hasher.check(password_hash, 'wrong')
+    assert hasher.stats() == {"pending": 0, "rejected": 0}
+
+
+def test_hasher_rejects_calls_beyond_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return True
+
+    running = threading.Thread(target=hasher._run, args=(slow_hash,))
+    running.start()
+    started.wait(5)
+    try:
+        with pytest.raises(LoginBusyError):
+            hasher.check('hash', 'password')
+        assert hasher.stats() == {"pending": 1, "rejected": 1}
+    finally:
+        release.set()
+        running.join()
+    assert hasher.stats()["pending"] == 0
+
+
+def test_permissions():
+    permissions = Permissions(1, [10, 20], [7], version=3)
+    assert permissions.allows(practice_id=1, macrogroup_id=10)
+    assert permissions.allows(practice_id=7, macrogroup_id=99)
+    assert not permissions.allows(practice_id=1, macrogroup_id=99)
+    assert permissions.key == Permissions(2, [20, 10], [7], version=4).key
+    assert Permissions(1, [], [], version=0).is_empty()
+
+
+@pytest.fixture
+def tables():
+    """The permission tables behind a FakeConnection: the version counter and user 1's macrogroups."""
+    tables = {"version": 1, "macrogroups": [10]}
+    conn = FakeConnection([
+        ("SELECT version FROM permission_versions", lambda params: [(tables["version"],)]),
+        ("UNION ALL", lambda params: [('version', tables["version"]), *(('macrogroup', group) for group in tables["macrogroups"]),
+                                      ('practice', 7)]),
+    ])
+    tables["conn"] = conn
+    return tables
+
+
+def test_permission_cache_reloads_after_a_version_change(tables, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = PermissionCache(version_ttl=5)
+    conn = tables["conn"]
+
+    permissions = cache.get(1, lambda: conn)
+    assert (permissions.macrogroups, permissions.practices, permissions.version) == ({10}, {7}, 1)
+    assert cache.get(1, lambda: conn) is permissions
+    assert len(conn.queries) == 2  # One version read and one permissions read
+
+    # The version is re-read only after version_ttl
+    tables["version"], tables["macrogroups"] = 2, [10, 20]
+    assert cache.get(1, lambda: conn) is permissions
+    now[0] += 6
+    assert cache.get(1, lambda: conn).macrogroups == {10, 20}
+
+
+def test_permission_cache_without_a_database():
+    assert PermissionCache().get(1, lambda: None) is None
+
+
+@pytest.fixture
+def users(db):
+    password_hash = generate_password_hash('secret', method='pbkdf2:sha256:1000')
+    db.on("FROM users WHERE username", lambda params: [
+        {"id": 5, "username": "tester", "password_hash": password_hash}] if params == ('tester',) else [])
+    return db
+
+
+def _login(client, username='tester', password='secret'):
+    return client.post('/login', json={"username": username, "password": password})
+
+
+def test_login(app, users):
+    client = app.test_client()
+    response = _login(client)
+
+    assert response.status_code == 200
+    with client.session_transaction() as session:
+        # Permissions are read by each request, not stored in the session
+        assert dict(session) == {"_permanent": True, "user_id": 5, "username": "tester"}
+
+
+@pytest.mark.parametrize('username, password, status', [('tester', 'wrong', 401), ('nobody', 'secret', 401), ('tester', '', 400)])
+def test_rejected_logins(app, users, username, password, status):
+    client = app.test_client()
+    assert _login(client, username, password).status_code == status
+    with client.session_transaction() as session:
+        assert 'user_id' not in session
+
+
+def test_busy_login(app, users, monkeypatch):
+    def busy(password_hash, password):
+        raise LoginBusyError("Too many")
+
+    monkeypatch.setattr(app.extensions['password_hasher'], 'check', busy)
+    response = _login(app.test_client())
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
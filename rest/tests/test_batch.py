@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+PRACTICES = {'P1': (1, 10), 'P2': (2, 10), 'P3': (3, 20)}
+SENSORS = {1: (1, 'TEMP'), 2: (1, 'HUM'), 3: (2, 'TEMP'), 4: (2, 'T:1'), 5: (3, 'TEMP')}
+
+
+@pytest.fixture
+def store(db):
+    readings = {sensor_id: [(DAY + timedelta(hours=hour), sensor_id * 10.0 + hour) for hour in range(3)]
+                for sensor_id in SENSORS}
+    return SensorStore(PRACTICES, SENSORS, readings).install(db)
+
+
+def _get(app, practices, sensors=(), **args):
+    args = {'practice_id': list(practices), 'sensor': list(sensors), 'start_date': '2026-02-10',
+            'end_date': '2026-02-11', 'resolution': 'raw', **args}
+    return login(app.test_client()).get('/get_batch_data', query_string=args)
+
+
+def _series(response):
+    return [(series['practice'], series['name'], [point['value'] for point in series['values']])
+            for series in response.get_json()['data']]
+
+
+def test_series_of_every_practice_in_request_order(app, store, db):
+    db.queries.clear()
+    response = _get(app, ['P2', 'P1'])
+
+    assert response.status_code == 200
+    assert _series(response) == [
+        ('P2', 'T:1', [40.0, 41.0, 42.0]), ('P2', 'TEMP', [30.0, 31.0, 32.0]),
+        ('P1', 'HUM', [20.0, 21.0, 22.0]), ('P1', 'TEMP', [10.0, 11.0, 12.0]),
+    ]
+    assert len([query for query, _params in db.queries if 'FROM sensor_readings' in query]) == 1
+
+
+def test_sensor_filters_split_on_the_first_colon(app, store):
+    response = _get(app, ['P1', 'P2'], sensors=['P2:T:1'])
+    # P1 has no filter, so all its sensors are returned
+    assert [(practice, name) for practice, name, _values in _series(response)] == [
+        ('P1', 'HUM'), ('P1', 'TEMP'), ('P2', 'T:1')]
+
+    assert [name for _practice, name, _values in _series(_get(app, ['P1'], sensors=['P1:TEMP']))] == ['TEMP']
+
+
+@pytest.mark.parametrize('sensors', [['TEMP'], ['P3:TEMP']])
+def test_rejects_filters_of_other_practices(app, store, sensors):
+    assert _get(app, ['P1'], sensors=sensors).status_code == 400
+
+
+def test_permissions_are_checked_for_every_practice(app, store):
+    response = _get(app, ['P1', 'P3'])
+    assert response.status_code == 403
+    assert 'P3' in response.get_json()['result']
+
+
+def test_unknown_practices_and_too_many_practices(app, store, monkeypatch):
+    assert _get(app, ['P1', 'P9']).status_code == 404
+
+    monkeypatch.setattr('app.BATCH_MAX_PRACTICES', 1)
+    assert _get(app, ['P1', 'P2']).status_code == 400
+
+
+def test_binary_format_is_not_offered(app, store):
+    assert _get(app, ['P1'], format='binary').status_code == 400
+    columnar = _get(app, ['P1'], format='columnar')
+    assert columnar.get_json()['data'][0]['practice'] == 'P1'
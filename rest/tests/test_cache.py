@@ -0,0 +1,73 @@
+import time
+
+import app as server
+from cache import TTLCache
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=300)
+
+    now[0] += 61
+    assert cache.get('a', 'missing') == 'missing'
+    assert cache.get('b') == 2
+    assert len(cache) == 1
+
+
+def test_weighted_limit():
+    cache = TTLCache(maxsize=5, weigh=len)
+    cache.set('a', [1, 2, 3])
+    cache.set('b', [1, 2])
+    cache.set('too big', [1, 2, 3, 4, 5, 6])
+    assert cache.stats()["weight"] == 5
+    assert cache.get('too big') is None
+
+    cache.set('c', [1])
+    assert cache.get('a') is None
+    assert cache.stats()["weight"] == 3
+
+
+def test_invalidate_by_key():
+    cache = TTLCache(maxsize=10)
+    for key in [(1, 'x'), (1, 'y'), (2, 'x')]:
+        cache.set(key, True)
+    cache.invalidate(lambda key: key[0] == 1)
+    assert len(cache) == 1 and cache.get((2, 'x'))
+
+
+def test_practice_lookups_query_only_the_uncached_names(app, db):
+    db.on("FROM practices WHERE name IN", lambda params: [
+        {"name": name.upper(), "id": index, "macrogroup_id": 10}
+        for index, name in enumerate(params, 1) if name != 'missing'
+    ])
+
+    first = server._lookup_practices(db, ['p1', 'missing'])
+    second = server._lookup_practices(db, ['p1', 'p2'])
+
+    assert first == {'p1': {"id": 1, "macrogroup_id": 10}}
+    assert second == {'p1': {"id": 1, "macrogroup_id": 10}, 'p2': {"id": 1, "macrogroup_id": 10}}
+    assert [params for _query, params in db.queries] == [('p1', 'missing'), ('p2',)]
+
+
+def test_sensor_lists_are_cached_per_data_version(app, db):
+    db.on("FROM sensors WHERE practice_id", lambda params: [(1, 'TEMP'), (2, 'HUM')])
+
+    assert server._get_practice_sensors(db, 5, 1) == {1: 'TEMP', 2: 'HUM'}
+    assert server._get_practice_sensors(db, 5, 1) == {1: 'TEMP', 2: 'HUM'}
+    server._get_practice_sensors(db, 5, 2)
+    assert len(db.queries) == 2
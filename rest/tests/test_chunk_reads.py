@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from chunkstore import encode_chunk
+from conftest import SensorStore, login
+
+DAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=120)
+SENSORS = {1: (1, 'TEMP'), 2: (1, 'HUM')}
+
+
+def _store(db, compacted):
+    readings = {
+        1: [(DAY + timedelta(days=1, hours=3), 21.0)],
+        2: [(DAY + timedelta(hours=5), 55.0), (DAY + timedelta(days=1, hours=5), 56.0)],
+    }
+    chunks = {}
+    if compacted:
+        # TEMP's first day was compacted; a late reading at 06:00 overrides the chunk's
+        points = [(DAY + timedelta(hours=hour), 10.0 + hour) for hour in (2, 6)]
+        chunks[(1, DAY.date())] = encode_chunk(DAY, points)
+        readings[1].insert(0, (DAY + timedelta(hours=6), 99.0))
+    return SensorStore({'P1': (1, 10)}, SENSORS, readings, chunks=chunks).install(db)
+
+
+def _get(app, **args):
+    query = {'practice_id': 'P1', 'resolution': 'raw', 'start_date': f"{DAY:%Y-%m-%d}",
+             'end_date': f"{DAY + timedelta(days=2):%Y-%m-%d}", **args}
+    response = login(app.test_client()).get('/get_data', query_string=query)
+    assert response.status_code == 200
+    return {series['name']: [point['value'] for point in series['values']] for series in response.get_json()['data']}
+
+
+def test_raw_reads_include_compacted_days_without_configuration(app, db):
+    _store(db, compacted=True)
+    assert _get(app) == {'TEMP': [12.0, 99.0, 21.0], 'HUM': [55.0, 56.0]}
+
+
+def test_streamed_reads_include_compacted_days(app, db):
+    _store(db, compacted=True)
+    assert _get(app, stream=1) == {'TEMP': [12.0, 99.0, 21.0], 'HUM': [55.0, 56.0]}
+
+
+def test_streamed_reads_without_chunks_use_a_single_query(app, db):
+    _store(db, compacted=False)
+    assert _get(app, stream=1) == {'TEMP': [21.0], 'HUM': [55.0, 56.0]}
+    readings_queries = [params for query, params in db.queries if 'FROM sensor_readings' in query]
+    assert [params[:-2] for params in readings_queries] == [(1, 2)]
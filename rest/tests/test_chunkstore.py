@@ -0,0 +1,60 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from chunkstore import ChunkError, decode_chunk, encode_chunk, split_days
+
+DAY = datetime(2026, 3, 29)
+
+
+def _points(values, step=timedelta(minutes=10), first=timedelta(0)):
+    return [(DAY + first + step * i, value) for i, value in enumerate(values)]
+
+
+def test_xor_round_trip_is_lossless():
+    points = _points([12.5, 12.5, 12.75, -3.0, 0.0, 1e-300, 123456789.123456789, -0.0])
+    points.append((DAY + timedelta(hours=23, minutes=59, seconds=59), 7.1))
+
+    timestamps, values = decode_chunk(DAY, encode_chunk(DAY, points))
+
+    assert timestamps == [timestamp for timestamp, _value in points]
+    assert values == [value for _timestamp, value in points]
+    assert math.copysign(1, values[7]) == -1
+
+
+def test_float32_round_trip_keeps_about_seven_digits():
+    points = _points([21.123456789, 0.001234567, 98765.4321], first=timedelta(seconds=37))
+
+    timestamps, values = decode_chunk(DAY, encode_chunk(DAY, points, 'float32'))
+
+    assert timestamps == [timestamp for timestamp, _value in points]
+    assert values == pytest.approx([value for _timestamp, value in points], rel=1e-7)
+
+
+def test_empty_chunk():
+    assert decode_chunk(DAY, encode_chunk(DAY, [])) == ([], [])
+
+
+@pytest.mark.parametrize('points', [
+    [(DAY - timedelta(seconds=1), 1.0)],
+    [(DAY + timedelta(days=1), 1.0)],
+    [(DAY + timedelta(hours=2), 1.0), (DAY + timedelta(hours=1), 2.0)],
+    [(DAY + timedelta(hours=1), 1.0), (DAY + timedelta(hours=1), 2.0)],
+])
+def test_rejects_points_that_do_not_fit_the_day(points):
+    with pytest.raises(ChunkError):
+        encode_chunk(DAY, points)
+
+
+def test_rejects_corrupt_chunks():
+    blob = encode_chunk(DAY, _points([1.0, 2.0, 3.0]))
+    with pytest.raises(ChunkError):
+        decode_chunk(DAY, blob[:-4])
+    with pytest.raises(ChunkError):
+        decode_chunk(DAY, b'\x09' + blob[1:])
+
+
+def test_split_days():
+    points = [(DAY + timedelta(hours=23), 1.0), (DAY + timedelta(days=1, hours=1), 2.0)]
+    assert split_days(points) == {DAY: points[:1], DAY + timedelta(days=1): points[1:]}
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from chunkstore import decode_chunk
+from compact_readings import compact_window
+from otr import refresh_rollups
+
+DAY = datetime(2025, 11, 3)
+SENSOR_ID = 7
+
+
+class FakeCursor:
+    """Just enough of a MySQL cursor over in-memory readings, chunks and rollups of one sensor."""
+
+    def __init__(self, readings=(), chunks=None):
+        self.readings = dict(readings)
+        self.chunks = dict(chunks or {})
+        self.rollups = {"sensor_readings_hourly": {}, "sensor_readings_daily": {}}
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, query, params=()):
+        if 'FROM sensor_day_chunks' in query:
+            first, last = params[-2:]
+            self._result = [(SENSOR_ID, day, payload) for day, payload in sorted(self.chunks.items()) if first <= day < last]
+            if not query.lstrip().startswith('SELECT sensor_id'):
+                self._result = [row[1:] for row in self._result]
+        elif query.lstrip().startswith('SELECT') and 'FROM sensor_readings' in query:
+            first, last = params[-2:]
+            self._result = [(timestamp, value) for timestamp, value in sorted(self.readings.items()) if first <= timestamp < last]
+        elif query.lstrip().startswith('DELETE'):
+            first, last = params[-2:]
+            self.readings = {timestamp: value for timestamp, value in self.readings.items() if not first <= timestamp < last}
+        else:
+            self._result = []  # The SQL refresh of the rollups from sensor_readings, covered by rewrite_rollups here
+
+    def executemany(self, query, rows):
+        if 'INTO sensor_day_chunks' in query:
+            self.chunks.update({day: payload for _sensor_id, day, _count, payload in rows})
+            return
+        table = next(table for table in self.rollups if table in query)
+        self.rollups[table].update({row[1]: row[2:] for row in rows})
+
+    def fetchall(self):
+        return self._result
+
+
+def _points(start, values, step=timedelta(minutes=30)):
+    return [(start + step * i, value) for i, value in enumerate(values)]
+
+
+def test_compaction_moves_readings_into_a_lossless_chunk():
+    readings = _points(DAY, [10.0, 10.5, 11.25, 9.0]) + _points(DAY + timedelta(days=1), [3.0])
+    cursor = FakeCursor(readings)
+
+    moved, written, merged = compact_window(cursor, SENSOR_ID, DAY, DAY + timedelta(days=2), 'xor')
+
+    assert (moved, merged) == (5, 0)
+    assert written == sum(len(payload) for payload in cursor.chunks.values())
+    assert cursor.readings == {}
+    timestamps, values = decode_chunk(DAY, cursor.chunks[DAY.date()])
+    assert list(zip(timestamps, values)) == readings[:4]
+
+
+def test_late_import_rebuilds_rollups_from_chunk_and_readings():
+    cursor = FakeCursor(_points(DAY, [10.0, 20.0, 30.0, 40.0]))
+    compact_window(cursor, SENSOR_ID, DAY, DAY + timedelta(days=1), 'xor')
+
+    # A late file replaces the 00:30 reading and adds one at 05:00
+    late = [(DAY + timedelta(minutes=30), 50.0), (DAY + timedelta(hours=5), -10.0)]
+    cursor.readings.update(late)
+    refresh_rollups(cursor, {SENSOR_ID}, late[0][0], late[-1][0])
+
+    assert cursor.rollups["sensor_readings_daily"][DAY] == (-10.0, 50.0, 24.0, 5)
+    assert cursor.rollups["sensor_readings_hourly"][DAY] == (10.0, 50.0, 30.0, 2)
+    assert cursor.rollups["sensor_readings_hourly"][DAY + timedelta(hours=1)] == (30.0, 40.0, 35.0, 2)
+    assert cursor.rollups["sensor_readings_hourly"][DAY + timedelta(hours=5)] == (-10.0, -10.0, -10.0, 1)
+
+
+def test_recompaction_merges_late_readings_into_the_chunk():
+    cursor = FakeCursor(_points(DAY, [1.0, 2.0, 3.0]))
+    compact_window(cursor, SENSOR_ID, DAY, DAY + timedelta(days=1), 'xor')
+    cursor.readings[DAY + timedelta(minutes=30)] = 20.0
+
+    moved, _written, merged = compact_window(cursor, SENSOR_ID, DAY, DAY + timedelta(days=1), 'xor')
+
+    assert (moved, merged) == (1, 1)
+    assert decode_chunk(DAY, cursor.chunks[DAY.date()])[1] == [1.0, 20.0, 3.0]
+    assert cursor.rollups["sensor_readings_daily"][DAY] == (1.0, 20.0, 8.0, 3)
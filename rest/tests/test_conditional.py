@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from werkzeug.http import http_date
+
+import app as server
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+FAR_FUTURE = 'Fri, 01 Jan 2100 00:00:00 GMT'
+
+
+@pytest.fixture
+def store(db):
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    readings = {1: [(DAY + timedelta(hours=hour), 20.0 + hour) for hour in range(3)] + [(now, 30.0)]}
+    return SensorStore({'P1': (1, 10)}, {1: (1, 'TEMP')}, readings).install(db)
+
+
+def _get(client, path='/get_data', headers=None, **args):
+    args = {'practice_id': 'P1', 'resolution': 'raw', **args}
+    if path == '/get_data':
+        args = {'start_date': '2026-02-10', 'end_date': '2026-02-11', **args}
+    args = {name: value for name, value in args.items() if value is not None}
+    return client.get(path, query_string=args, headers=headers or {})
+
+
+def _readings_queries(db):
+    return [query for query, _params in db.queries if 'FROM sensor_readings' in query]
+
+
+def test_matching_etag_is_answered_without_reading_the_data(app, store, db):
+    client = login(app.test_client())
+    first = _get(client)
+    assert first.status_code == 200 and first.headers['ETag'].startswith('W/')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    db.queries.clear()
+    second = _get(client, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304 and second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert _readings_queries(db) == []
+
+
+def test_etag_changes_with_the_data_version_and_the_request(app, store):
+    client = login(app.test_client())
+    etag = _get(client).headers['ETag']
+
+    assert _get(client, end_date='2026-02-12').headers['ETag'] != etag
+    assert _get(client, format='columnar').headers['ETag'] != etag
+
+    store.version += 1
+    response = _get(client, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+
+def test_if_modified_since_applies_to_explicit_windows(app, store):
+    client = login(app.test_client())
+    response = _get(client)
+    # updated_at is a naive server-local time
+    assert response.headers['Last-Modified'] == http_date(store.updated_at.astimezone(timezone.utc))
+
+    assert _get(client, headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    store.updated_at += timedelta(minutes=5)
+    assert _get(client, headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 200
+
+
+def test_server_computed_windows_only_revalidate_by_etag(app, store, monkeypatch):
+    client = login(app.test_client())
+    latest = _get(client, '/get_latest_data')
+    assert latest.status_code == 200 and 'Last-Modified' not in latest.headers
+    assert _get(client, '/get_latest_data', headers={'If-Modified-Since': FAR_FUTURE}).status_code == 200
+    assert _get(client, '/get_latest_data', headers={'If-None-Match': latest.headers['ETag']}).status_code == 304
+
+    # A day later the window has moved: the same data version no longer matches
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(days=1)
+
+    monkeypatch.setattr(server, 'datetime', Tomorrow)
+    assert _get(client, '/get_latest_data', headers={'If-None-Match': latest.headers['ETag']}).status_code == 200
+
+
+def test_deltas_without_end_date_ignore_if_modified_since(app, store):
+    client = login(app.test_client())
+    response = _get(client, since=int(DAY.timestamp()), end_date=None, headers={'If-Modified-Since': FAR_FUTURE})
+    assert response.status_code == 200 and 'Last-Modified' not in response.headers
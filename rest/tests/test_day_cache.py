@@ -0,0 +1,80 @@
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as server
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+SENSORS = {1: 'TEMP', 2: 'HUM'}
+READINGS = sorted([
+    (1, TODAY - timedelta(days=3, hours=-6), 10.0),
+    (1, TODAY - timedelta(days=1, hours=-12), 11.0),
+    (1, TODAY + timedelta(minutes=1), 12.0),
+    (2, TODAY - timedelta(days=1, hours=-12), 60.0),
+    (2, TODAY + timedelta(minutes=2), 61.0),
+])
+_versions = itertools.count(1)
+
+
+@pytest.fixture
+def queries(app, monkeypatch):
+    """Serves the readings query from READINGS, recording the ranges that were read."""
+    ranges = []
+
+    def query_rows(conn, query, params):
+        start, end = params[-2:]
+        ranges.append((start, end))
+        return [row for row in READINGS if start <= row[1] <= end]
+
+    monkeypatch.setattr(server, '_query_rows', query_rows)
+    monkeypatch.setattr(server, '_query_chunks', lambda conn, sensor_ids, start, end: [])
+    return ranges
+
+
+def _prepared(start_date, end_date, version=None):
+    return {
+        "conn": None,
+        "practice_id": 1,
+        # A fresh version by default, so that the day cache starts empty
+        "version": next(_versions) if version is None else version,
+        "query": "SELECT ...",
+        "start_date": start_date,
+        "end_date": end_date,
+        "resolution": 'raw',
+        "sensor_ids": sorted(SENSORS),
+        "sensors": SENSORS,
+        "since": None,
+    }
+
+
+def _fetch(start_date, end_date):
+    series = server._fetch_raw_with_day_cache(_prepared(start_date, end_date))
+    return {name: [point["value"] for point in points] for name, points in series.items()}
+
+
+def test_range_across_today(queries):
+    assert _fetch(TODAY - timedelta(days=1), datetime.now() + timedelta(minutes=5)) == {
+        'TEMP': [11.0, 12.0], 'HUM': [60.0, 61.0]
+    }
+
+
+def test_future_range_returns_nothing(queries):
+    assert _fetch(TODAY + timedelta(days=1), TODAY + timedelta(days=3)) == {}
+    assert all(start >= TODAY + timedelta(days=1) for start, _end in queries)
+
+
+def test_past_range_only_reads_its_days(queries):
+    assert _fetch(TODAY - timedelta(days=3), TODAY - timedelta(days=2)) == {'TEMP': [10.0]}
+    assert all(end <= TODAY - timedelta(days=2) for _start, end in queries)
+
+
+def test_past_days_are_served_from_the_cache(queries):
+    start, end = TODAY - timedelta(days=3), datetime.now() + timedelta(minutes=5)
+    version = next(_versions)
+    first = server._fetch_raw_with_day_cache(_prepared(start, end, version))
+    queries.clear()
+
+    assert server._fetch_raw_with_day_cache(_prepared(start, end, version)) == first
+    assert queries == [(TODAY, end)]
+
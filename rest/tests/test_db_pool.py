@@ -0,0 +1,113 @@
+import threading
+
+import mysql.connector
+import pytest
+
+import db_pool
+from conftest import FakeConnection
+from db_pool import ConnectionPool, PoolExhaustedError
+
+
+class PooledConnection(FakeConnection):
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+        self.failing_ping = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if self.failing_ping:
+            raise mysql.connector.OperationalError("Server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """The connections opened by the pool, in order."""
+    opened = []
+
+    def connect(**connect_args):
+        opened.append(PooledConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(mysql.connector, 'connect', connect)
+    return opened
+
+
+def test_idle_connections_are_reused(opened):
+    pool = ConnectionPool({}, size=2, max_overflow=0)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert pool.acquire() is conn
+    assert conn.rollbacks == 1
+    assert len(opened) == 1
+    assert pool.stats()["checkouts"] == 2 and pool.stats()["in_use"] == 1
+
+
+def test_overflow_connections_are_closed_on_release(opened):
+    pool = ConnectionPool({}, size=1, max_overflow=1)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+
+    assert not first.closed and second.closed
+    assert pool.stats()["open"] == 1 and pool.stats()["idle"] == 1
+
+
+def test_checkout_waits_for_a_release_then_times_out(opened):
+    pool = ConnectionPool({}, size=1, max_overflow=0, timeout=0.5)
+    conn = pool.acquire()
+
+    threading.Timer(0.05, pool.release, (conn,)).start()
+    assert pool.acquire() is conn
+    assert pool.stats()["wait_time_max"] > 0
+
+    pool.timeout = 0.05
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+    assert pool.stats()["exhausted"] == 1
+
+
+def test_failed_pings_and_old_connections_are_replaced(opened, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_pool.time, 'monotonic', lambda: now[0])
+    pool = ConnectionPool({}, size=1, max_overflow=0, recycle=60)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.failing_ping = True
+    replaced = pool.acquire()
+    assert replaced is not conn and conn.closed
+    pool.release(replaced)
+
+    now[0] += 61
+    assert pool.acquire() is not replaced and replaced.closed
+    assert (pool.stats()["failed_pings"], pool.stats()["recycled"], pool.stats()["open"]) == (1, 1, 1)
+
+
+def test_a_failed_connect_gives_the_slot_back(monkeypatch):
+    def connect(**connect_args):
+        raise mysql.connector.InterfaceError("Can't connect")
+
+    monkeypatch.setattr(mysql.connector, 'connect', connect)
+    pool = ConnectionPool({}, size=1, max_overflow=0, timeout=0.01)
+    for _ in range(2):
+        with pytest.raises(mysql.connector.Error):
+            pool.acquire()
+    assert pool.stats()["open"] == 0
+
+
+def test_close_all_closes_the_idle_connections(opened):
+    pool = ConnectionPool({}, size=2, max_overflow=0)
+    connections = [pool.acquire(), pool.acquire()]
+    pool.release(connections[0])
+    pool.close_all()
+
+    assert connections[0].closed and not connections[1].closed
+    assert pool.stats()["open"] == 1
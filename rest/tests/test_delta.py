@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import _series_cursor
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+SENSORS = {1: (1, 'TEMP'), 2: (1, 'HUM'), 3: (1, 'VBATT')}
+
+
+def _epoch(hours):
+    return int((DAY + timedelta(hours=hours)).timestamp())
+
+
+def _series(name, *hours):
+    return {"name": name, "values": [{"timestamp": _epoch(hour), "value": 1.0} for hour in hours]}
+
+
+def _prepared(since=None, positions=None):
+    return {
+        "since": since,
+        "positions": positions or {},
+        "sensor_ids": sorted(SENSORS),
+        "sensors": {sensor_id: name for sensor_id, (_practice_id, name) in SENSORS.items()},
+    }
+
+
+def test_cursor_lists_the_series_behind_the_newest_point():
+    series = [_series('TEMP', 1, 2, 3), _series('HUM', 1, 2), _series('VBATT', 0)]
+    assert _series_cursor(series, _prepared()) == f"{_epoch(3)},2:{_epoch(2)},3:{_epoch(0)}"
+
+
+def test_cursor_of_series_at_the_same_point_is_a_plain_timestamp():
+    assert _series_cursor([_series('TEMP', 1, 2), _series('HUM', 2), _series('VBATT')], _prepared()) == str(_epoch(2))
+    assert _series_cursor([_series('TEMP')], _prepared()) is None
+
+
+def test_series_without_new_points_keep_their_position():
+    since = DAY + timedelta(hours=3)
+    prepared = _prepared(since, {3: DAY})
+
+    # HUM had nothing new: it stays at the incoming newest point instead of jumping to TEMP's
+    assert _series_cursor([_series('TEMP', 4, 5)], prepared) == f"{_epoch(5)},2:{_epoch(3)},3:{_epoch(0)}"
+    assert _series_cursor([], prepared) == f"{_epoch(3)},3:{_epoch(0)}"
+
+
+@pytest.fixture
+def store(db):
+    readings = {
+        1: [(DAY + timedelta(hours=hour), 20.0 + hour) for hour in range(6)],
+        2: [(DAY + timedelta(hours=hour), 50.0 + hour) for hour in range(4)],
+        3: [(DAY, 12.5)],
+    }
+    return SensorStore({'P1': (1, 10)}, SENSORS, readings).install(db)
+
+
+def _get(app, **args):
+    return login(app.test_client()).get('/get_data', query_string={'practice_id': 'P1', 'resolution': 'raw', **args})
+
+
+def _values(response):
+    return {series['name']: [point['value'] for point in series['values']] for series in response.get_json()['data']}
+
+
+def test_delta_sends_each_series_from_its_own_position(app, store):
+    first = _get(app, start_date='2026-02-10', end_date='2026-02-11')
+    cursor = first.get_json()['cursor']
+    assert cursor == f"{_epoch(5)},2:{_epoch(3)},3:{_epoch(0)}"
+    assert first.headers['X-Cursor'] == cursor
+
+    # New readings for every sensor: the sparse VBATT series does not make TEMP's be sent again
+    store.readings[1].append((DAY + timedelta(hours=6), 26.0))
+    store.readings[2].append((DAY + timedelta(hours=4), 54.0))
+    store.readings[3].append((DAY + timedelta(hours=6), 12.4))
+    delta = _get(app, since=cursor, start_date='2026-02-10')
+
+    assert _values(delta) == {'TEMP': [26.0], 'HUM': [54.0], 'VBATT': [12.4]}
+    assert delta.get_json()['cursor'] == f"{_epoch(6)},2:{_epoch(4)}"
+
+
+def test_delta_reads_series_at_the_same_position_together(app, store, db):
+    db.queries.clear()
+    response = _get(app, since=f"{_epoch(3)},3:{_epoch(0)}", start_date='2026-02-10')
+
+    assert _values(response) == {'TEMP': [24.0, 25.0]}
+    readings_queries = [params for query, params in db.queries if 'FROM sensor_readings' in query]
+    assert readings_queries == [
+        (1, 2, DAY + timedelta(hours=3, seconds=1), readings_queries[0][-1]),
+        (3, DAY + timedelta(seconds=1), readings_queries[1][-1]),
+    ]
+
+
+def test_plain_cursor_puts_every_series_at_that_point(app, store):
+    response = _get(app, since=str(_epoch(2)), start_date='2026-02-10')
+    assert _values(response) == {'TEMP': [23.0, 24.0, 25.0], 'HUM': [53.0]}
+
+
+def test_since_requires_the_window(app, store):
+    response = login(app.test_client()).get('/get_data', query_string={'practice_id': 'P1', 'since': _epoch(3)})
+    assert response.status_code == 400
+    assert 'start_date' in response.get_json()['result']
+
+
+@pytest.mark.parametrize('since', ['yesterday', '123,4', '123,x:5', '123,4:y'])
+def test_rejects_malformed_cursors(app, store, since):
+    assert _get(app, since=since, start_date='2026-02-10').status_code == 400
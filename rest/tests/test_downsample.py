@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import _downsample
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+
+
+def _points(values):
+    return [{"timestamp": 1000 + 60 * index, "value": float(value)} for index, value in enumerate(values)]
+
+
+def test_short_series_are_kept():
+    points = _points(range(5))
+    assert _downsample(points, 5) is points
+    assert _downsample(points, None) is points
+
+
+def test_lttb_keeps_the_ends_and_the_spike():
+    values = [0.0] * 100
+    values[37] = 50.0
+    sampled = _downsample(_points(values), 10)
+
+    assert len(sampled) == 10
+    assert sampled[0]["timestamp"] == 1000 and sampled[-1]["timestamp"] == 1000 + 60 * 99
+    assert 50.0 in [point["value"] for point in sampled]
+    assert [point["timestamp"] for point in sampled] == sorted(point["timestamp"] for point in sampled)
+
+
+def test_minmax_keeps_both_extremes_of_each_bucket_in_time_order():
+    values = [0, 5, -3, 1, 9, 2, -7, 4]
+    sampled = _downsample(_points(values), 4, method='minmax')
+
+    # Two buckets of four points: (5, -3) and (9, -7), each in time order
+    assert [point["value"] for point in sampled] == [5.0, -3.0, 9.0, -7.0]
+
+
+def test_minmax_of_a_flat_bucket_keeps_one_point():
+    sampled = _downsample(_points([1, 1, 1, 1, 2, 3]), 4, method='minmax')
+    assert [point["value"] for point in sampled] == [1.0, 1.0, 3.0]
+
+
+@pytest.fixture
+def store(db):
+    readings = {1: [(DAY + timedelta(minutes=10 * index), float(index % 7)) for index in range(100)]}
+    return SensorStore({'P1': (1, 10)}, {1: (1, 'TEMP')}, readings).install(db)
+
+
+def _get(app, **args):
+    args = {'practice_id': 'P1', 'start_date': '2026-02-10', 'end_date': '2026-02-11', 'resolution': 'raw', **args}
+    return login(app.test_client()).get('/get_data', query_string=args)
+
+
+@pytest.mark.parametrize('args, points', [({}, 100), ({'max_points': 20}, 20), ({'width': 30, 'downsample': 'minmax'}, 30)])
+def test_endpoint_reduces_each_series(app, store, args, points):
+    series = _get(app, **args).get_json()['data']
+    assert len(series[0]['values']) <= points and len(series[0]['values']) >= points - 2
+
+
+@pytest.mark.parametrize('args', [{'max_points': 2}, {'max_points': 'many'}, {'downsample': 'average'}])
+def test_endpoint_rejects_invalid_arguments(app, store, args):
+    assert _get(app, **args).status_code == 400
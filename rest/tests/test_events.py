@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import FakeConnection, FakePool
+from events import CLOSED, ImportEventBroadcaster, Subscription
+
+
+@pytest.fixture
+def broadcaster():
+    conn = FakeConnection([("MAX(id)", lambda params: [(0,)]), ("FROM import_events", lambda params: [])])
+    # The polling thread reads the last ID once, then sleeps: the tests publish directly
+    return ImportEventBroadcaster(FakePool(conn), poll_interval=3600, history=3)
+
+
+def _event(event_id, practice='P1'):
+    return {"id": event_id, "practice": practice, "version": event_id}
+
+
+def test_subscribers_receive_the_events_they_accept(broadcaster):
+    p1 = broadcaster.subscribe(lambda event: event['practice'] == 'P1')
+    p2 = broadcaster.subscribe(lambda event: event['practice'] == 'P2')
+
+    broadcaster._publish([_event(1), _event(2, 'P2')])
+
+    assert p1.get(timeout=0) == _event(1) and p1.get(timeout=0) is None
+    assert p2.get(timeout=0) == _event(2, 'P2')
+    assert broadcaster.subscriber_count() == 2
+    broadcaster.unsubscribe(p1)
+    assert broadcaster.subscriber_count() == 1
+
+
+def test_reconnecting_clients_catch_up_from_the_history(broadcaster):
+    broadcaster._publish([_event(event_id) for event_id in range(1, 5)])
+
+    # Only the last 3 events are kept
+    subscription = broadcaster.subscribe(lambda event: True, last_event_id=1)
+    assert [subscription.get(timeout=0)['id'] for _ in range(3)] == [2, 3, 4]
+
+
+def test_a_full_queue_closes_the_subscription():
+    subscription = Subscription(lambda event: True, maxsize=1)
+    subscription._offer(_event(1))
+    subscription._offer(_event(2))
+
+    assert subscription.closed
+    assert subscription.get(timeout=0) is CLOSED
@@ -0,0 +1,70 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as server
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+
+
+@pytest.fixture
+def store(db):
+    readings = {
+        1: [(DAY + timedelta(minutes=30 * index), 20.0 + index) for index in range(4)],
+        2: [(DAY, 55.5)],
+    }
+    return SensorStore({'P1': (1, 10)}, {1: (1, 'TEMP'), 2: (1, 'UMIDITÀ, "aria"')}, readings).install(db)
+
+
+def _get(app, **args):
+    args = {'practice_id': 'P1', 'start_date': '2026-02-10', 'end_date': '2026-02-11', **args}
+    args = {name: value for name, value in args.items() if value is not None}
+    return login(app.test_client()).get('/export', query_string=args)
+
+
+def test_csv_export(app, store):
+    response = _get(app)
+
+    assert response.mimetype == 'text/csv' and response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="P1_2026-02-10_2026-02-11.csv"'
+    assert response.get_data(as_text=True).split('\r\n') == [
+        'practice,sensor,timestamp,value',
+        'P1,TEMP,2026-02-10 00:00:00,20.0',
+        'P1,TEMP,2026-02-10 00:30:00,21.0',
+        'P1,TEMP,2026-02-10 01:00:00,22.0',
+        'P1,TEMP,2026-02-10 01:30:00,23.0',
+        'P1,"UMIDITÀ, ""aria""",2026-02-10 00:00:00,55.5',
+        '',
+    ]
+
+
+def test_csv_export_of_rollups_has_the_bounds(app, store):
+    lines = _get(app, resolution='hourly', sensor='P1:TEMP').get_data(as_text=True).split('\r\n')
+    assert lines[:3] == [
+        'practice,sensor,timestamp,value,min,max',
+        'P1,TEMP,2026-02-10 00:00:00,20.5,20.0,21.0',
+        'P1,TEMP,2026-02-10 01:00:00,22.5,22.0,23.0',
+    ]
+
+
+def test_parquet_export(app, store, monkeypatch):
+    pq = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(server, 'EXPORT_ROW_GROUP_SIZE', 2)
+    response = _get(app, format='parquet')
+
+    assert response.mimetype == 'application/vnd.apache.parquet'
+    parquet = pq.ParquetFile(io.BytesIO(response.data))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read().to_pydict()
+    assert table['sensor'] == ['TEMP'] * 4 + ['UMIDITÀ, "aria"']
+    assert table['timestamp'][1] == DAY + timedelta(minutes=30)
+    assert table['value'] == [20.0, 21.0, 22.0, 23.0, 55.5]
+
+
+def test_invalid_export_requests(app, store, monkeypatch):
+    assert _get(app, format='xlsx').status_code == 400
+    assert _get(app, end_date=None).status_code == 400
+    monkeypatch.setattr(server, 'pq', None)
+    assert _get(app, format='parquet').status_code == 406
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import import_batch
+import otr
+from bench.datagen import write_datalogger_file
+from conftest import FakeConnection
+
+
+def test_mapping_keeps_the_file_order(tmp_path):
+    path = tmp_path / 'mapping.json'
+    path.write_text(json.dumps({'stazione1_*.TXT': 'Sonda-01', '*.TXT': 'Other'}))
+    mapping = import_batch.load_practice_mapping(str(path))
+
+    assert import_batch.match_practice('/data/stazione1_2024.TXT', mapping) == 'Sonda-01'
+    assert import_batch.match_practice('/data/stazione2_2024.TXT', mapping) == 'Other'
+    assert import_batch.match_practice('/data/notes.csv', mapping) is None
+
+    path.write_text('["stazione1_*.TXT"]')
+    with pytest.raises(ValueError):
+        import_batch.load_practice_mapping(str(path))
+
+
+def test_collects_txt_files_of_a_directory_or_a_glob(tmp_path):
+    for name in ['b.TXT', 'a.txt', 'notes.csv', os.path.join('sub', 'c.TXT')]:
+        os.makedirs(os.path.dirname(tmp_path / name), exist_ok=True)
+        (tmp_path / name).write_text('')
+
+    names = lambda paths: [os.path.relpath(path, tmp_path) for path in paths]
+    assert names(import_batch.collect_files(str(tmp_path))) == ['a.txt', 'b.TXT']
+    assert names(import_batch.collect_files(str(tmp_path), recursive=True)) == ['a.txt', 'b.TXT', os.path.join('sub', 'c.TXT')]
+    assert names(import_batch.collect_files(str(tmp_path / '*.csv'))) == ['notes.csv']
+
+
+def test_unreadable_files_are_skipped(tmp_path):
+    assert import_batch._hash_job(str(tmp_path / 'gone.TXT')) == (str(tmp_path / 'gone.TXT'), None)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    written = []
+    monkeypatch.setattr(import_batch, 'insert_data_into_db',
+                        lambda data, practice_name, **kwargs: written.append((kwargs['source_file'][0], practice_name)) or True)
+    return written
+
+
+def test_a_vanished_file_does_not_abort_the_batch(tmp_path, monkeypatch, written):
+    files = [write_datalogger_file(str(tmp_path / f'stazione{index}.TXT'), 10, ['TEMP'], seed=index) for index in range(2)]
+    gone = str(tmp_path / 'gone.TXT')
+    monkeypatch.setattr(import_batch, 'collect_files', lambda source, recursive=False: [*files, gone])
+
+    summary = import_batch.import_directory(str(tmp_path), [('*.TXT', 'Sonda-01')], parse_workers=1, force=True)
+
+    assert summary == {"imported": 2, "skipped": 0, "unmapped": 0, "failed": 1}
+    assert sorted(written) == [(path, 'Sonda-01') for path in files]
+
+
+def test_files_in_the_manifest_or_repeated_are_skipped(tmp_path, monkeypatch, written):
+    first = write_datalogger_file(str(tmp_path / 'a.TXT'), 10, ['TEMP'], seed=1)
+    copy = tmp_path / 'b.TXT'
+    copy.write_bytes(open(first, 'rb').read())
+    imported = write_datalogger_file(str(tmp_path / 'c.TXT'), 10, ['TEMP'], seed=2)
+    monkeypatch.setattr(import_batch, 'get_imported_hashes', lambda hashes: {otr.file_content_hash(imported)})
+
+    summary = import_batch.import_directory(str(tmp_path), [('*.TXT', 'Sonda-01')], parse_workers=1)
+
+    assert summary == {"imported": 1, "skipped": 2, "unmapped": 0, "failed": 0}
+    assert written == [(first, 'Sonda-01')]
+
+
+def test_manifest_lookup_closes_the_connection_when_the_cursor_fails(monkeypatch):
+    class BrokenConnection(FakeConnection):
+        closed = False
+
+        def cursor(self, dictionary=False, buffered=None):
+            raise otr.Error("Lost connection")
+
+        def close(self):
+            self.closed = True
+
+    conn = BrokenConnection()
+    monkeypatch.setattr(otr, 'get_db_connection', lambda: conn)
+
+    assert otr.get_imported_hashes(['abc']) is None
+    assert conn.closed
@@ -0,0 +1,102 @@
+import math
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from bench.datagen import write_datalogger_file
+from otr import build_reading_rows, build_reading_rows_from_columns, parse_datalogger_columns, parse_datalogger_file
+
+SAMPLE = """Stazione 12
+[INIZIO VBATT]1,2.75[FINE VBATT]
+[INIZIO DATI]
+DATE, FESS1 ,TEMP,
+17/07/2018 10.25,1.5,20.25
+17/07/2018 10.35,,20.5
+
+17/07/2018 10.45,abc,20.75,99
+17/07/2018 10.55,2.5
+31/02/2018 11.05,3.5,21
+7/7/2018 1.05,4.5,21.25
+garbage,5.5,21.5
+[FINE DATI]
+"""
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / 'stazione.TXT'
+    path.write_text(SAMPLE)
+    return str(path)
+
+
+def _nan_list(values):
+    return [None if math.isnan(value) else value for value in values]
+
+
+def test_columns(sample):
+    data = parse_datalogger_columns(sample)
+
+    assert data["vbatt"] == 12.75
+    assert list(data["channels"]) == ['FESS1', 'TEMP']
+    assert _nan_list(data["channels"]['FESS1']) == [1.5, None, None, 2.5, 3.5, 4.5, 5.5]
+    assert _nan_list(data["channels"]['TEMP']) == [20.25, 20.5, 20.75, None, 21.0, 21.25, 21.5]
+    assert data["timestamps"].dtype == np.dtype('datetime64[m]')
+    assert [str(timestamp) for timestamp in data["timestamps"]] == [
+        '2018-07-17T10:25', '2018-07-17T10:35', '2018-07-17T10:45', '2018-07-17T10:55', 'NaT', '2018-07-07T01:05', 'NaT'
+    ]
+
+
+def test_rows_match_the_row_parser(sample):
+    sensor_ids = {'FESS1': 1, 'TEMP': 2}
+    data = parse_datalogger_columns(sample)
+    columnar = build_reading_rows_from_columns(data["timestamps"], data["channels"], sensor_ids)
+
+    assert sorted(columnar) == sorted(build_reading_rows(parse_datalogger_file(sample)["readings"], sensor_ids))
+    assert (1, datetime(2018, 7, 17, 10, 25), 1.5) in columnar
+
+
+def test_row_parser_keeps_the_cells_as_text(sample):
+    readings = parse_datalogger_file(sample)["readings"]
+    assert readings[0] == {'DATE': '17/07/2018 10.25', 'FESS1': '1.5', 'TEMP': '20.25'}
+    assert readings[3] == {'DATE': '17/07/2018 10.55', 'FESS1': '2.5'}
+
+
+def test_file_without_vbatt_or_data(tmp_path):
+    no_vbatt = tmp_path / 'no_vbatt.TXT'
+    no_vbatt.write_text("[INIZIO DATI]\nDATE,TEMP\n01/01/2020 00.00,1\n[FINE DATI]\n")
+    no_data = tmp_path / 'no_data.TXT'
+    no_data.write_text("[INIZIO VBATT]12[FINE VBATT]\n")
+    no_date = tmp_path / 'no_date.TXT'
+    no_date.write_text("[INIZIO DATI]\nTEMP\n1\n[FINE DATI]\n")
+
+    assert parse_datalogger_columns(str(no_vbatt))["vbatt"] is None
+    assert parse_datalogger_columns(str(no_data)) is None
+    assert parse_datalogger_columns(str(no_date)) is None
+    assert parse_datalogger_columns(str(tmp_path / 'missing.TXT')) is None
+    assert parse_datalogger_file(str(no_data)) is None
+
+
+def test_empty_data_section(tmp_path):
+    path = tmp_path / 'empty.TXT'
+    path.write_text("[INIZIO DATI]\nDATE,TEMP\n[FINE DATI]\n")
+    data = parse_datalogger_columns(str(path))
+    assert len(data["timestamps"]) == 0 and len(data["channels"]['TEMP']) == 0
+
+
+def test_peak_memory_stays_close_to_the_parsed_arrays(tmp_path):
+    rows, sensors = 20000, ['FESS1', 'FESS2', 'FESS3', 'FESS4', 'TEMP']
+    path = write_datalogger_file(str(tmp_path / 'big.TXT'), rows, sensors)
+
+    tracemalloc.start()
+    try:
+        data = parse_datalogger_columns(path)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # The result itself: 8 bytes per cell and per timestamp
+    result = data["timestamps"].nbytes + sum(values.nbytes for values in data["channels"].values())
+    assert result == rows * 8 * (len(sensors) + 1)
+    assert peak < 4 * result
@@ -0,0 +1,101 @@
+import sqlite3
+import time
+from datetime import timedelta
+
+import pytest
+from flask import Flask, jsonify, session
+
+from sessions import init_session_backend
+
+
+def _make_app(backend, **config):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', **config)
+    init_session_backend(app, backend)
+
+    @app.route('/login/<name>')
+    def login(name):
+        session.clear()
+        session.permanent = True
+        session['username'] = name
+        return ''
+
+    @app.route('/whoami')
+    def whoami():
+        return jsonify(session.get('username'))
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return ''
+
+    return app
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / 'sessions.sqlite3')
+
+
+@pytest.fixture
+def client(store_path):
+    return _make_app('sqlite', SESSION_SQLITE_PATH=store_path, SESSION_GC_INTERVAL=0,
+                     PERMANENT_SESSION_LIFETIME=timedelta(hours=12)).test_client()
+
+
+def _rows(store_path):
+    with sqlite3.connect(store_path) as conn:
+        return conn.execute("SELECT sid, data, expires_at FROM sessions").fetchall()
+
+
+def test_sqlite_session_keeps_only_an_id_in_the_cookie(client, store_path):
+    client.get('/login/alice')
+    sid = client.get_cookie('session').value
+
+    assert _rows(store_path) == [(sid, '{"_permanent": true, "username": "alice"}', pytest.approx(time.time() + 12 * 3600, abs=60))]
+    assert client.get('/whoami').get_json() == 'alice'
+
+
+def test_unchanged_sessions_are_not_written_back(client):
+    client.get('/login/alice')
+    assert 'Set-Cookie' not in client.get('/whoami').headers
+
+
+def test_login_rotates_the_session_id(client, store_path):
+    client.get('/login/alice')
+    first = client.get_cookie('session').value
+    client.get('/login/bob')
+    second = client.get_cookie('session').value
+
+    assert second != first
+    assert [sid for sid, _data, _expires_at in _rows(store_path)] == [second]
+    assert client.get('/whoami').get_json() == 'bob'
+
+
+def test_logout_deletes_the_session(client, store_path):
+    client.get('/login/alice')
+    client.get('/logout')
+
+    assert client.get_cookie('session') is None
+    assert _rows(store_path) == []
+
+
+def test_expired_sessions_are_ignored(client, store_path):
+    client.get('/login/alice')
+    with sqlite3.connect(store_path) as conn:
+        conn.execute("UPDATE sessions SET expires_at = ?", (time.time() - 1,))
+
+    assert client.get('/whoami').get_json() is None
+
+
+def test_cookie_sessions_are_not_re_signed_on_reads():
+    client = _make_app('cookie').test_client()
+    client.get('/login/alice')
+
+    response = client.get('/whoami')
+    assert response.get_json() == 'alice' and 'Set-Cookie' not in response.headers
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        _make_app('redis')
@@ -0,0 +1,136 @@
+import math
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import _stats_from_rows, _stats_query
+from chunkstore import encode_chunk
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 9)  # A Monday
+
+
+class _StddevSamp:
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        self.values.append(value)
+
+    def finalize(self):
+        if len(self.values) < 2:
+            return None
+        mean = math.fsum(self.values) / len(self.values)
+        return math.sqrt(math.fsum((value - mean) ** 2 for value in self.values) / (len(self.values) - 1))
+
+
+def _run_in_sqlite(readings, query, params):
+    """Runs the MySQL statistics query on SQLite, with the MySQL functions it uses defined in Python."""
+    conn = sqlite3.connect(':memory:')
+    conn.create_function('GREATEST', 2, max)
+    conn.create_function('CEIL', 1, math.ceil)
+    conn.create_function('HOUR', 1, lambda timestamp: int(timestamp[11:13]))
+    conn.create_function('MAKETIME', 3, lambda hour, minute, second: f"{hour:02d}:{minute:02d}:{second:02d}")
+    conn.create_function('TIMESTAMP', -1, lambda date, time='00:00:00': f"{date} {time}")
+    conn.create_aggregate('STDDEV_SAMP', 1, _StddevSamp)
+    conn.execute("CREATE TABLE sensor_readings (sensor_id INTEGER, timestamp TEXT, value REAL)")
+    conn.executemany("INSERT INTO sensor_readings VALUES (?, ?, ?)",
+                     [(sensor_id, str(timestamp), value) for sensor_id, timestamp, value in readings])
+    params = [str(param) if isinstance(param, datetime) else param for param in params]
+
+    def to_datetime(value):
+        return None if value is None else datetime.fromisoformat(value)
+
+    return [
+        (row[0], to_datetime(row[1]), *row[2:8], to_datetime(row[8]), *row[9:])
+        for row in conn.execute(query.replace('%s', '?'), params)
+    ]
+
+
+def _readings(seed=0):
+    rng = random.Random(seed)
+    readings = [(1, DAY + timedelta(minutes=7 * index), round(rng.uniform(-5, 30), 2)) for index in range(500)]
+    readings.append((2, DAY + timedelta(hours=3), 12.5))
+    return sorted(readings)
+
+
+def _rounded(rows):
+    return [tuple(round(value, 9) if isinstance(value, float) else value for value in row) for row in rows]
+
+
+@pytest.mark.parametrize('bucket', [None, 'hour', 'day'])
+def test_sql_and_python_statistics_agree(bucket):
+    readings = _readings()
+    percentiles = [5, 50, 95, 100]
+    query = _stats_query(2, bucket, percentiles)
+    params = (1, 2, DAY, DAY + timedelta(days=7), *(p / 100 for p in percentiles))
+
+    sql_rows = _run_in_sqlite(readings, query, params)
+    # TEMP's readings span 59 hours over 3 days; HUM has one reading
+    assert len(sql_rows) == {None: 2, 'hour': 60, 'day': 4}[bucket]
+    assert _rounded(sql_rows) == _rounded(_stats_from_rows(readings, bucket, percentiles))
+
+
+def test_python_statistics():
+    readings = [(1, DAY + timedelta(hours=hour), float(value)) for hour, value in enumerate([4, 1, 3, 2])]
+    readings += [(1, DAY + timedelta(days=7), 10.0)]
+
+    (_sensor, _start, count, minimum, maximum, mean, stddev, last, last_timestamp, p25, p50, p100), = \
+        _stats_from_rows(readings, None, [25, 50, 100])
+    assert (count, minimum, maximum, mean, last, last_timestamp) == (5, 1.0, 10.0, 4.0, 10.0, DAY + timedelta(days=7))
+    assert stddev == pytest.approx(math.sqrt(12.5))
+    assert (p25, p50, p100) == (2.0, 3.0, 10.0)
+
+    # Weeks start on Monday
+    weeks = _stats_from_rows(readings, 'week', [50])
+    assert [(start, count) for _sensor, start, count, *_rest in weeks] == [(DAY, 4), (DAY + timedelta(days=7), 1)]
+    assert weeks[1][6] is None  # No deviation for a single reading
+
+
+@pytest.fixture
+def store(db):
+    readings = {}
+    for sensor_id, timestamp, value in _readings():
+        readings.setdefault(sensor_id, []).append((timestamp, value))
+    store = SensorStore({'P1': (1, 10)}, {1: (1, 'TEMP'), 2: (1, 'HUM'), 3: (1, 'VBATT')}, readings).install(db)
+    db.on("WITH ranked", lambda params: _run_in_sqlite(_readings(), _stats_query(3, None, [5, 50, 95]), params))
+    return store
+
+
+def _get(app, **args):
+    args = {'practice_id': 'P1', 'start_date': '2026-02-09', 'end_date': '2026-02-16', **args}
+    return login(app.test_client()).get('/get_stats', query_string=args)
+
+
+def test_endpoint(app, store):
+    response = _get(app)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+
+    assert (data['bucket'], data['percentiles']) == (None, [5, 50, 95])
+    # VBATT has no readings in the range
+    assert [sensor['name'] for sensor in data['sensors']] == ['HUM', 'TEMP']
+    hum = data['sensors'][0]
+    assert hum == {"name": "HUM", "count": 1, "min": 12.5, "max": 12.5, "mean": 12.5, "stddev": None, "last": 12.5,
+                   "lastTimestamp": int((DAY + timedelta(hours=3)).timestamp()), "p5": 12.5, "p50": 12.5, "p95": 12.5}
+    assert data['sensors'][1]['count'] == 500
+
+
+def test_compacted_days_give_the_same_statistics(app, store):
+    expected = _get(app).get_json()['data']['sensors']
+
+    # Compact TEMP's first day: its statistics are then computed by the server
+    first_day = [point for point in store.readings[1] if point[0] < DAY + timedelta(days=1)]
+    store.chunks[(1, DAY.date())] = encode_chunk(DAY, first_day)
+    store.readings[1] = store.readings[1][len(first_day):]
+
+    compacted = _get(app).get_json()['data']['sensors']
+    assert compacted == [pytest.approx(sensor) for sensor in expected]
+
+
+@pytest.mark.parametrize('args', [{'bucket': 'month'}, {'percentiles': '50,abc'}, {'percentiles': '0'},
+                                  {'percentiles': ','.join(str(p) for p in range(1, 12))}, {'end_date': ''}])
+def test_invalid_requests(app, store, args):
+    assert _get(app, **args).status_code == 400
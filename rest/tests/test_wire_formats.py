@@ -0,0 +1,104 @@
+import gzip
+import json
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as server
+from app import _encode_binary, _to_columnar
+from conftest import SensorStore, login
+
+DAY = datetime(2026, 2, 10)
+SERIES = {"name": "TEMP", "values": [{"timestamp": 1000, "value": 1.5}, {"timestamp": 1600, "value": 2.0},
+                                     {"timestamp": 1900, "value": -0.25}]}
+
+
+def test_columnar_delta_encodes_the_timestamps():
+    assert _to_columnar(SERIES) == {"name": "TEMP", "t": [1000, 600, 300], "v": [1.5, 2.0, -0.25]}
+    assert _to_columnar({"name": "EMPTY", "values": []}) == {"name": "EMPTY", "t": [], "v": []}
+
+
+def test_columnar_keeps_the_practice_and_the_rollup_bounds():
+    rollup = {"practice": "P1", "name": "TEMP", "values": [{"timestamp": 3600, "value": 2.0, "min": 1.0, "max": 3.0}]}
+    assert _to_columnar(rollup) == {"practice": "P1", "name": "TEMP", "t": [3600], "v": [2.0], "min": [1.0], "max": [3.0]}
+
+
+def _decode_binary(data):
+    assert data[:4] == b'SND1'
+    (count,), offset, series = struct.unpack_from('<I', data, 4), 8, []
+    for _ in range(count):
+        (name_length,) = struct.unpack_from('<H', data, offset)
+        name = data[offset + 2:offset + 2 + name_length].decode('utf-8')
+        offset += 2 + name_length
+        (points,) = struct.unpack_from('<I', data, offset)
+        timestamps = struct.unpack_from(f'<{points}i', data, offset + 4)
+        values = struct.unpack_from(f'<{points}f', data, offset + 4 + 4 * points)
+        offset += 4 + 8 * points
+        series.append((name, list(timestamps), list(values)))
+    assert offset == len(data)
+    return series
+
+
+def test_binary_round_trip():
+    data = _encode_binary([SERIES, {"name": "UMIDITÀ", "values": []}])
+    assert _decode_binary(data) == [("TEMP", [1000, 1600, 1900], [1.5, 2.0, -0.25]), ("UMIDITÀ", [], [])]
+
+
+@pytest.fixture
+def store(db):
+    readings = {1: [(DAY + timedelta(minutes=10 * index), 20.0 + index / 4) for index in range(100)]}
+    return SensorStore({'P1': (1, 10)}, {1: (1, 'TEMP')}, readings).install(db)
+
+
+def _get(app, headers=None, **args):
+    args = {'practice_id': 'P1', 'start_date': '2026-02-10', 'end_date': '2026-02-11', 'resolution': 'raw', **args}
+    return login(app.test_client()).get('/get_data', query_string=args, headers=headers or {})
+
+
+def test_format_is_negotiated_from_the_query_or_the_accept_header(app, store):
+    assert _get(app).mimetype == 'application/json'
+    assert _get(app, format='columnar').mimetype == 'application/vnd.sonde.columnar+json'
+    binary = _get(app, headers={'Accept': 'application/vnd.sonde.series'})
+    assert binary.mimetype == 'application/vnd.sonde.series'
+    assert {'Accept', 'Accept-Encoding'} <= {value.strip() for value in binary.headers['Vary'].split(',')}
+
+    name, timestamps, values = _decode_binary(binary.data)[0]
+    assert name == 'TEMP' and len(timestamps) == 100 and values[:2] == [20.0, 20.25]
+    assert _get(app, format='xml').status_code == 400
+
+
+def test_columnar_response_matches_the_json_one(app, store):
+    points = _get(app).get_json()['data'][0]['values']
+    columnar = json.loads(_get(app, format='columnar').data)
+
+    assert columnar['status'] == 'ok'
+    series = columnar['data'][0]
+    timestamps = [sum(series['t'][:index + 1]) for index in range(len(series['t']))]
+    assert timestamps == [point['timestamp'] for point in points]
+    assert series['v'] == [point['value'] for point in points]
+
+
+def test_msgpack_needs_the_package(app, store, monkeypatch):
+    monkeypatch.setattr(server, 'msgpack', None)
+    assert _get(app, format='msgpack').status_code == 406
+
+
+def test_msgpack_encodes_the_columnar_document(app, store):
+    msgpack = pytest.importorskip('msgpack')
+    response = _get(app, format='msgpack')
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data) == json.loads(_get(app, format='columnar').data)
+
+
+def test_large_responses_are_compressed(app, store, monkeypatch):
+    monkeypatch.setattr(server, 'brotli', None)
+    plain = _get(app)
+    compressed = _get(app, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+
+    small = _get(app, headers={'Accept-Encoding': 'gzip'}, start_date='2026-02-08', end_date='2026-02-09')
+    assert len(small.data) < server.COMPRESSION_MIN_SIZE and 'Content-Encoding' not in small.headers
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker imports this module after the fork and builds its own application.
+"""
+from app import create_app
+
+app = create_app()
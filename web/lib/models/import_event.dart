@@ -0,0 +1,30 @@
+/// Notification pushed by the server's `/events` stream when new readings
+/// of a practice have been imported.
+class ImportEvent {
+  final String practice;
+  final int version;
+  final int readings;
+  final DateTime firstTimestamp;
+  final DateTime lastTimestamp;
+
+  ImportEvent({
+    required this.practice,
+    required this.version,
+    required this.readings,
+    required this.firstTimestamp,
+    required this.lastTimestamp,
+  });
+
+  /// Creates an instance from a JSON object (timestamps in epoch seconds).
+  factory ImportEvent.fromJson(Map<String, dynamic> json) {
+    return ImportEvent(
+      practice: json['practice'],
+      version: json['version'],
+      readings: json['readings'],
+      firstTimestamp:
+          DateTime.fromMillisecondsSinceEpoch(json['firstTimestamp'] * 1000),
+      lastTimestamp:
+          DateTime.fromMillisecondsSinceEpoch(json['lastTimestamp'] * 1000),
+    );
+  }
+}
@@ -7,15 +7,19 @@ class InitialSensorData {
   final DateTime endDate;
   final List<SensorSeries> series;
 
+  /// Opaque cursor of the points held for each series, to poll for newer data with ApiService.getSensorDelta.
+  final String? cursor;
+
   InitialSensorData({
     required this.startDate,
     required this.endDate,
     required this.series,
+    this.cursor,
   });
 
   /// Creates an instance from a JSON object.
   /// Assumes the server sends dates in 'YYYY-MM-DD' format.
-  factory InitialSensorData.fromJson(Map<String, dynamic> json) {
+  factory InitialSensorData.fromJson(Map<String, dynamic> json, {String? cursor}) {
     var seriesList = json['series'] as List;
     List<SensorSeries> sensorSeries =
         seriesList.map((i) => SensorSeries.fromJson(i)).toList();
@@ -24,6 +28,7 @@ class InitialSensorData {
       startDate: DateTime.parse(json['startDate']),
       endDate: DateTime.parse(json['endDate']),
       series: sensorSeries,
+      cursor: cursor,
     );
   }
 }
@@ -1,3 +1,6 @@
+import 'dart:convert';
+import 'dart:typed_data';
+
 /// Modello per una serie di dati di un sensore (es. "Temperatura").
 class SensorSeries {
   final String name;
@@ -6,7 +9,12 @@ class SensorSeries {
   SensorSeries({required this.name, required this.values});
 
   /// Crea un'istanza di SensorSeries da un oggetto JSON.
+  /// Supporta sia il formato classico ({"name", "values": [...]}) sia quello
+  /// colonnare ({"name", "t": [...], "v": [...]}) con timestamp delta-codificati.
   factory SensorSeries.fromJson(Map<String, dynamic> json) {
+    if (json.containsKey('t')) {
+      return SensorSeries.fromColumnarJson(json);
+    }
     var valuesList = json['values'] as List;
     List<SensorValue> sensorValues =
         valuesList.map((i) => SensorValue.fromJson(i)).toList();
@@ -15,6 +23,90 @@ class SensorSeries {
       values: sensorValues,
     );
   }
+
+  /// Crea un'istanza di SensorSeries dal formato colonnare.
+  /// Il primo elemento di 't' è un timestamp assoluto (in secondi),
+  /// i successivi sono differenze rispetto al precedente.
+  factory SensorSeries.fromColumnarJson(Map<String, dynamic> json) {
+    final deltas = json['t'] as List;
+    final rawValues = json['v'] as List;
+    final sensorValues = <SensorValue>[];
+    int seconds = 0;
+    for (int i = 0; i < deltas.length; i++) {
+      seconds += (deltas[i] as num).toInt();
+      sensorValues.add(SensorValue(
+        timestamp: DateTime.fromMillisecondsSinceEpoch(seconds * 1000),
+        value: (rawValues[i] as num).toDouble(),
+      ));
+    }
+    return SensorSeries(name: json['name'], values: sensorValues);
+  }
+
+  /// Restituisce una nuova serie con i punti di [delta] uniti a quelli esistenti.
+  /// Il delta contiene tutto ciò che segue il cursore, quindi i punti esistenti
+  /// a partire dal primo timestamp del delta vengono sostituiti (ad es. l'ultimo
+  /// bucket di un rollup, che il server rinvia aggiornato).
+  SensorSeries merge(SensorSeries delta) {
+    if (delta.values.isEmpty) {
+      return this;
+    }
+    final firstNew = delta.values.first.timestamp;
+    // I delta arrivano in coda: si cerca il punto di taglio partendo dalla fine
+    int keep = values.length;
+    while (keep > 0 && !values[keep - 1].timestamp.isBefore(firstNew)) {
+      keep--;
+    }
+    return SensorSeries(
+      name: name,
+      values: [...values.sublist(0, keep), ...delta.values],
+    );
+  }
+
+  /// Unisce i delta alle serie già presenti (per nome); le serie che
+  /// compaiono solo nel delta vengono aggiunte in fondo.
+  static List<SensorSeries> mergeAll(
+      List<SensorSeries> current, List<SensorSeries> deltas) {
+    final byName = {for (final delta in deltas) delta.name: delta};
+    final merged = current.map((series) {
+      final delta = byName.remove(series.name);
+      return delta == null ? series : series.merge(delta);
+    }).toList();
+    merged.addAll(byName.values);
+    return merged;
+  }
+
+  /// Decodifica il formato binario del server (tutti gli interi little-endian):
+  /// 'SND1', uint32 numero di serie, poi per ogni serie:
+  /// uint16 lunghezza del nome, nome UTF-8, uint32 numero di punti,
+  /// int32[n] timestamp in secondi, float32[n] valori.
+  static List<SensorSeries> listFromBinary(Uint8List bytes) {
+    final data = ByteData.sublistView(bytes);
+    if (bytes.length < 8 || ascii.decode(bytes.sublist(0, 4)) != 'SND1') {
+      throw const FormatException('Formato binario delle serie non valido');
+    }
+    final seriesCount = data.getUint32(4, Endian.little);
+    int offset = 8;
+    final series = <SensorSeries>[];
+    for (int s = 0; s < seriesCount; s++) {
+      final nameLength = data.getUint16(offset, Endian.little);
+      offset += 2;
+      final name = utf8.decode(bytes.sublist(offset, offset + nameLength));
+      offset += nameLength;
+      final count = data.getUint32(offset, Endian.little);
+      offset += 4;
+      final valuesOffset = offset + count * 4;
+      final sensorValues = List<SensorValue>.generate(count, (i) {
+        return SensorValue(
+          timestamp: DateTime.fromMillisecondsSinceEpoch(
+              data.getInt32(offset + i * 4, Endian.little) * 1000),
+          value: data.getFloat32(valuesOffset + i * 4, Endian.little),
+        );
+      });
+      offset = valuesOffset + count * 4;
+      series.add(SensorSeries(name: name, values: sensorValues));
+    }
+    return series;
+  }
 }
 
 /// Modello per un singolo punto dati (valore e timestamp).
@@ -34,4 +126,3 @@ class SensorValue {
     );
   }
 }
-
@@ -0,0 +1,15 @@
+import 'package:sensor_dashboard/models/sensor_data.dart';
+
+/// The readings newer than a cursor, as returned by `/get_data?since=`,
+/// together with the cursor to use for the next poll.
+class SensorDelta {
+  final List<SensorSeries> series;
+  final String? cursor;
+
+  SensorDelta({required this.series, this.cursor});
+
+  /// Merges the delta into the series the client already holds.
+  List<SensorSeries> mergeInto(List<SensorSeries> current) {
+    return SensorSeries.mergeAll(current, series);
+  }
+}
@@ -0,0 +1,67 @@
+/// Summary statistics of one sensor over a period (or one bucket of it),
+/// as computed by the server's `/get_stats` endpoint.
+class SensorStats {
+  /// Start of the bucket, or null for statistics over the whole period.
+  final DateTime? start;
+  final int count;
+  final double min;
+  final double max;
+  final double mean;
+
+  /// Sample standard deviation; null when there is a single reading.
+  final double? stddev;
+  final double last;
+  final DateTime lastTimestamp;
+
+  /// Percentile values keyed by percentile (e.g. 5, 50, 95).
+  final Map<num, double?> percentiles;
+
+  SensorStats({
+    this.start,
+    required this.count,
+    required this.min,
+    required this.max,
+    required this.mean,
+    this.stddev,
+    required this.last,
+    required this.lastTimestamp,
+    required this.percentiles,
+  });
+
+  /// Creates an instance from a JSON object (timestamps in epoch seconds,
+  /// percentiles as "p<percentile>" keys).
+  factory SensorStats.fromJson(Map<String, dynamic> json, List<num> percentiles) {
+    return SensorStats(
+      start: json['start'] != null
+          ? DateTime.fromMillisecondsSinceEpoch(json['start'] * 1000)
+          : null,
+      count: json['count'],
+      min: (json['min'] as num).toDouble(),
+      max: (json['max'] as num).toDouble(),
+      mean: (json['mean'] as num).toDouble(),
+      stddev: (json['stddev'] as num?)?.toDouble(),
+      last: (json['last'] as num).toDouble(),
+      lastTimestamp:
+          DateTime.fromMillisecondsSinceEpoch(json['lastTimestamp'] * 1000),
+      percentiles: {
+        for (final p in percentiles) p: (json['p$p'] as num?)?.toDouble(),
+      },
+    );
+  }
+
+  /// Parses the `sensors` list of a `/get_stats` response into a map from
+  /// sensor name to its statistics: one entry per bucket when the request was
+  /// bucketed, a single entry otherwise.
+  static Map<String, List<SensorStats>> mapFromJson(Map<String, dynamic> data) {
+    final percentiles = (data['percentiles'] as List<dynamic>).cast<num>();
+    return {
+      for (final sensor in data['sensors'] as List<dynamic>)
+        sensor['name'] as String: sensor['buckets'] != null
+            ? [
+                for (final bucket in sensor['buckets'] as List<dynamic>)
+                  SensorStats.fromJson(bucket, percentiles)
+              ]
+            : [SensorStats.fromJson(sensor, percentiles)],
+    };
+  }
+}
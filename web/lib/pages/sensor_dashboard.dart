@@ -7,6 +7,7 @@ import 'package:sensor_dashboard/models/probe.dart';
 import 'package:sensor_dashboard/models/sensor_data.dart';
 import 'package:sensor_dashboard/services/api_exception.dart';
 import 'package:sensor_dashboard/services/api_service.dart';
+import 'package:sensor_dashboard/utils/constants.dart';
 
 /// A dashboard that displays charts for a specific probe.
 class SensorDashboard extends StatefulWidget {
@@ -231,7 +232,7 @@ class _SensorDashboardState extends State<SensorDashboard> {
   }
   
   /// Reduces the number of data points if there are too many to display efficiently.
-  List<SensorValue> _downsampleData(List<SensorValue> data, {int maxPoints = 500}) {
+  List<SensorValue> _downsampleData(List<SensorValue> data, {int maxPoints = maxChartPoints}) {
     if (data.length <= maxPoints) {
       return data;
     }
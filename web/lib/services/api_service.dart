@@ -1,16 +1,42 @@
+import 'dart:async';
 import 'dart:convert';
+import 'dart:html' as html;
 import 'package:http/http.dart' as http;
 import 'package:http/browser_client.dart';
+import 'package:sensor_dashboard/models/import_event.dart';
 import 'package:sensor_dashboard/models/initial_sensor_data.dart';
 import 'package:sensor_dashboard/models/macrogroup.dart';
 import 'package:sensor_dashboard/models/probe.dart';
 import 'package:sensor_dashboard/models/sensor_data.dart';
+import 'package:sensor_dashboard/models/sensor_delta.dart';
+import 'package:sensor_dashboard/models/sensor_stats.dart';
 import 'package:sensor_dashboard/services/api_exception.dart';
 import 'package:sensor_dashboard/utils/constants.dart';
 
 class ApiService {
   final http.Client _client = BrowserClient()..withCredentials = true;
 
+  /// Headers for the data endpoints: prefer the compact columnar/binary
+  /// formats, falling back to plain JSON on servers that do not know them.
+  static const Map<String, String> _dataHeaders = {
+    'Accept': '$columnarMimeType, $binaryMimeType;q=0.9, application/json;q=0.5',
+  };
+
+  /// Decodes the sensor series of a data response according to its Content-Type.
+  /// [unwrap] extracts the series list from the decoded JSON payload.
+  List<SensorSeries> _decodeSeries(
+      http.Response response, List<dynamic> Function(dynamic data) unwrap) {
+    final contentType = response.headers['content-type'] ?? '';
+    if (contentType.startsWith(binaryMimeType)) {
+      return SensorSeries.listFromBinary(response.bodyBytes);
+    }
+    final data = json.decode(response.body);
+    if (data['status'] != 'ok') {
+      throw ApiException(message: data['result']);
+    }
+    return unwrap(data).map((json) => SensorSeries.fromJson(json)).toList();
+  }
+
   /// Performs user login.
   Future<void> login(String username, String password) async {
     final response = await _client.post(
@@ -62,20 +88,33 @@ class ApiService {
 
   /// Fetches the latest 15 days of data for a specific probe.
   /// Assumes a new endpoint '/get_latest_data'.
+  /// Each series is downsampled by the server to at most [maxPoints] points.
   Future<InitialSensorData> getLatestSensorData({
     required String practiceId,
+    int? maxPoints = maxChartPoints,
   }) async {
     final uri = Uri.parse('$baseUrl/get_latest_data').replace(queryParameters: {
       'practice_id': practiceId,
+      if (maxPoints != null) 'max_points': maxPoints.toString(),
     });
 
-    final response = await _client.get(uri);
+    final response = await _client.get(uri, headers: _dataHeaders);
 
     if (response.statusCode == 200) {
+      final contentType = response.headers['content-type'] ?? '';
+      if (contentType.startsWith(binaryMimeType)) {
+        // The binary format carries the date range in response headers
+        return InitialSensorData(
+          startDate: DateTime.parse(response.headers['x-start-date']!),
+          endDate: DateTime.parse(response.headers['x-end-date']!),
+          series: SensorSeries.listFromBinary(response.bodyBytes),
+          cursor: response.headers['x-cursor'],
+        );
+      }
       final data = json.decode(response.body);
       if (data['status'] == 'ok') {
         // The actual data is nested under a 'data' key in the response
-        return InitialSensorData.fromJson(data['data']);
+        return InitialSensorData.fromJson(data['data'], cursor: data['cursor']);
       } else {
         throw ApiException(message: data['result']);
       }
@@ -91,27 +130,116 @@ class ApiService {
   }
 
   /// Fetches sensor data for a specific probe within a given date range.
+  /// Each series is downsampled by the server to at most [maxPoints] points.
   Future<List<SensorSeries>> getSensorData({
     required String practiceId,
     required DateTime startDate,
     required DateTime endDate,
+    int? maxPoints = maxChartPoints,
   }) async {
     final uri = Uri.parse('$baseUrl/get_data').replace(queryParameters: {
       'practice_id': practiceId,
       'start_date': startDate.toIso8601String().split('T').first,
       'end_date': endDate.toIso8601String().split('T').first,
+      if (maxPoints != null) 'max_points': maxPoints.toString(),
+    });
+
+    final response = await _client.get(uri, headers: _dataHeaders);
+
+    if (response.statusCode == 200) {
+      return _decodeSeries(response, (data) => data['data'] as List<dynamic>);
+    } else if (response.statusCode == 401) {
+      throw ApiException(
+          message: 'Session expired. Please log in again.',
+          statusCode: 401);
+    } else if (response.statusCode == 403) {
+      throw ApiException(
+          message: 'You do not have permission to view data for this probe.',
+          statusCode: 403);
+    } else {
+      throw ApiException(
+          message: 'Error fetching sensor data',
+          statusCode: response.statusCode);
+    }
+  }
+
+  /// Fetches the series of several probes in a single request, keyed by
+  /// probe name. [sensors] optionally restricts a probe to some of its
+  /// sensors; probes without an entry return all of them.
+  Future<Map<String, List<SensorSeries>>> getBatchSensorData({
+    required List<String> practiceIds,
+    required DateTime startDate,
+    required DateTime endDate,
+    Map<String, List<String>> sensors = const {},
+    int? maxPoints = maxChartPoints,
+  }) async {
+    final uri = Uri.parse('$baseUrl/get_batch_data').replace(queryParameters: {
+      'practice_id': practiceIds,
+      'sensor': [
+        for (final entry in sensors.entries)
+          for (final sensor in entry.value) '${entry.key}:$sensor',
+      ],
+      'start_date': startDate.toIso8601String().split('T').first,
+      'end_date': endDate.toIso8601String().split('T').first,
+      if (maxPoints != null) 'max_points': maxPoints.toString(),
+    });
+
+    final response = await _client.get(uri, headers: _dataHeaders);
+
+    if (response.statusCode == 200) {
+      final data = json.decode(response.body);
+      if (data['status'] != 'ok') {
+        throw ApiException(message: data['result']);
+      }
+      final result = {for (final id in practiceIds) id: <SensorSeries>[]};
+      for (final json in data['data'] as List<dynamic>) {
+        result
+            .putIfAbsent(json['practice'], () => [])
+            .add(SensorSeries.fromJson(json));
+      }
+      return result;
+    } else if (response.statusCode == 401) {
+      throw ApiException(
+          message: 'Session expired. Please log in again.',
+          statusCode: 401);
+    } else if (response.statusCode == 403) {
+      throw ApiException(
+          message: 'You do not have permission to view data for these probes.',
+          statusCode: 403);
+    } else {
+      throw ApiException(
+          message: 'Error fetching sensor data',
+          statusCode: response.statusCode);
+    }
+  }
+
+  /// Fetches per-sensor statistics (count, min, max, mean, stddev, last value
+  /// and [percentiles]) computed by the server over a date range, so panels
+  /// showing summaries do not download the readings. With [bucket] ('hour',
+  /// 'day' or 'week') every sensor gets one entry per bucket.
+  Future<Map<String, List<SensorStats>>> getSensorStats({
+    required String practiceId,
+    required DateTime startDate,
+    required DateTime endDate,
+    String? bucket,
+    List<num>? percentiles,
+  }) async {
+    final uri = Uri.parse('$baseUrl/get_stats').replace(queryParameters: {
+      'practice_id': practiceId,
+      'start_date': startDate.toIso8601String().split('T').first,
+      'end_date': endDate.toIso8601String().split('T').first,
+      if (bucket != null) 'bucket': bucket,
+      if (percentiles != null) 'percentiles': percentiles.join(','),
     });
 
     final response = await _client.get(uri);
 
     if (response.statusCode == 200) {
       final data = json.decode(response.body);
-      if (data['status'] == 'ok') {
-        final List<dynamic> dataList = data['data'];
-        return dataList.map((json) => SensorSeries.fromJson(json)).toList();
-      } else {
+      if (data['status'] != 'ok') {
         throw ApiException(message: data['result']);
       }
+      return SensorStats.mapFromJson(data['data']);
     } else if (response.statusCode == 401) {
       throw ApiException(
           message: 'Session expired. Please log in again.',
@@ -122,9 +250,77 @@ class ApiService {
           statusCode: 403);
     } else {
       throw ApiException(
-          message: 'Error fetching sensor data',
+          message: 'Error fetching sensor statistics',
           statusCode: response.statusCode);
     }
   }
-}
 
+  /// Fetches only the readings newer than [cursor] (from a previous response),
+  /// for polling. [startDate] is the start of the window the chart shows, so the
+  /// server picks the same resolution as for the series already held.
+  /// Merge the result with [SensorDelta.mergeInto].
+  Future<SensorDelta> getSensorDelta({
+    required String practiceId,
+    required String cursor,
+    required DateTime startDate,
+  }) async {
+    final uri = Uri.parse('$baseUrl/get_data').replace(queryParameters: {
+      'practice_id': practiceId,
+      'since': cursor,
+      'start_date': startDate.toIso8601String().split('T').first,
+    });
+
+    final response = await _client.get(uri, headers: _dataHeaders);
+
+    if (response.statusCode == 200) {
+      final contentType = response.headers['content-type'] ?? '';
+      if (contentType.startsWith(binaryMimeType)) {
+        return SensorDelta(
+          series: SensorSeries.listFromBinary(response.bodyBytes),
+          cursor: response.headers['x-cursor'] ?? cursor,
+        );
+      }
+      final data = json.decode(response.body);
+      if (data['status'] != 'ok') {
+        throw ApiException(message: data['result']);
+      }
+      return SensorDelta(
+        series: (data['data'] as List<dynamic>)
+            .map((json) => SensorSeries.fromJson(json))
+            .toList(),
+        cursor: data['cursor'] ?? cursor,
+      );
+    } else if (response.statusCode == 401) {
+      throw ApiException(
+          message: 'Session expired. Please log in again.',
+          statusCode: 401);
+    } else {
+      throw ApiException(
+          message: 'Error fetching new sensor data',
+          statusCode: response.statusCode);
+    }
+  }
+
+  /// Subscribes to the server's notifications of new imports for the probes
+  /// the user can see (or only [practiceIds]). The browser reconnects on its
+  /// own and resumes from the last received event; cancelling the
+  /// subscription closes the connection.
+  Stream<ImportEvent> importEvents({List<String>? practiceIds}) {
+    final uri = Uri.parse('$baseUrl/events').replace(queryParameters: {
+      if (practiceIds != null) 'practice_id': practiceIds,
+    });
+    late html.EventSource source;
+    late StreamController<ImportEvent> controller;
+    controller = StreamController<ImportEvent>(
+      onListen: () {
+        source = html.EventSource(uri.toString(), withCredentials: true);
+        source.addEventListener('import', (event) {
+          final data = (event as html.MessageEvent).data as String;
+          controller.add(ImportEvent.fromJson(json.decode(data)));
+        });
+      },
+      onCancel: () => source.close(),
+    );
+    return controller.stream;
+  }
+}
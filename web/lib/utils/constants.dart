@@ -1 +1,9 @@
 const String baseUrl = 'http://localhost:5000';
+
+/// Maximum number of points per series requested from the server.
+/// Longer series are downsampled server-side before being sent.
+const int maxChartPoints = 500;
+
+/// Wire formats understood by the data endpoints besides plain JSON.
+const String columnarMimeType = 'application/vnd.sonde.columnar+json';
+const String binaryMimeType = 'application/vnd.sonde.series';